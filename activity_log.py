@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+from collections import deque
+from itertools import islice
+from datetime import datetime
+from typing import Dict, List
+
+
+class ActivityLog:
+    """
+    Append-only activity feed backed by the activity_log table, with an
+    in-memory ring buffer holding the newest entries.
+
+    record() inserts inside the caller's transaction; once that transaction has
+    committed, remember() adds the entry to the ring. recent() serves from the
+    ring when it is known to hold the newest rows (its newest id matches
+    MAX(id), which SQLite answers from the end of the rowid b-tree) and
+    reloads it otherwise, e.g. after another worker process wrote an entry.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._ring = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._last_id = 0
+
+    def record(self, cursor: sqlite3.Cursor, activity_type: str, description: str) -> Dict:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cursor.execute('''
+            INSERT INTO activity_log (type, description, created_at)
+            VALUES (?, ?, ?)
+        ''', (activity_type, description, timestamp))
+        return {
+            'id': cursor.lastrowid,
+            'type': activity_type,
+            'description': description,
+            'timestamp': timestamp
+        }
+
+    def remember(self, entry: Dict) -> None:
+        with self._lock:
+            # Ids are contiguous in an append-only table; a gap means another
+            # process wrote in between, so the ring must be reloaded
+            if self._loaded and entry['id'] == self._last_id + 1:
+                self._ring.append(entry)
+                self._last_id = entry['id']
+            else:
+                self._loaded = False
+
+    def recent(self, conn: sqlite3.Connection, limit: int = 5) -> List[Dict]:
+        limit = max(1, min(limit, self.capacity))
+        newest_id = conn.execute('SELECT MAX(id) FROM activity_log').fetchone()[0]
+        with self._lock:
+            if newest_id is None:
+                self._ring.clear()
+                self._last_id = 0
+                self._loaded = True
+                return []
+            if self._loaded and self._last_id == newest_id:
+                return [dict(entry) for entry in islice(reversed(self._ring), limit)]
+
+        rows = conn.execute('''
+            SELECT id, type, description, created_at AS timestamp
+            FROM activity_log
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (self.capacity,)).fetchall()
+        entries = [{'id': row[0], 'type': row[1], 'description': row[2], 'timestamp': row[3]}
+                   for row in rows]
+        with self._lock:
+            self._ring.clear()
+            self._ring.extend(reversed(entries))
+            self._last_id = entries[0]['id'] if entries else 0
+            self._loaded = True
+        return [dict(entry) for entry in entries[:limit]]
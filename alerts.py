@@ -0,0 +1,161 @@
+import json
+import queue
+import sqlite3
+import threading
+import urllib.request
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BELOW_THRESHOLD = 'below_threshold'
+RECOVERED = 'recovered'
+
+
+def create_alert_tables(cursor: sqlite3.Cursor) -> None:
+    """Create the table of threshold-crossing events and its lookup indexes."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            USN TEXT NOT NULL,
+            subject_code TEXT NOT NULL,
+            department TEXT NOT NULL,
+            semester TEXT NOT NULL,
+            section TEXT NOT NULL,
+            alert_type TEXT NOT NULL,
+            attendance_percentage REAL NOT NULL,
+            classes_held INTEGER NOT NULL,
+            classes_attended INTEGER NOT NULL,
+            threshold REAL NOT NULL,
+            Date TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_alerts_section
+        ON attendance_alerts (department, semester, section, subject_code, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_alerts_usn
+        ON attendance_alerts (USN, id)
+    ''')
+
+
+def _is_short(held: int, attended: int, threshold: float, min_classes: int) -> bool:
+    # A student is only evaluated once enough classes have been held
+    return held >= min_classes and attended * 100.0 / held < threshold
+
+
+def evaluate_changes(cursor: sqlite3.Cursor, key: Tuple[str, str, str, str], date: str,
+                     changes: Iterable[Tuple[str, int, int, int, int]],
+                     threshold: float, min_classes: int = 1) -> List[Dict]:
+    """
+    Compare each student's percentage before and after a marking and record an
+    alert when it crosses the threshold in either direction. changes are the
+    (USN, old_held, old_attended, new_held, new_attended) tuples produced by
+    attendance_summary.apply_marks. Returns the alerts written.
+    """
+    subject_code, department, semester, section = key
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    alerts = []
+    for usn, held, attended, new_held, new_attended in changes:
+        was_short = _is_short(held, attended, threshold, min_classes)
+        now_short = _is_short(new_held, new_attended, threshold, min_classes)
+        if was_short == now_short:
+            continue
+        alert = {
+            'USN': usn,
+            'subject_code': subject_code,
+            'department': department,
+            'semester': semester,
+            'section': section,
+            'alert_type': BELOW_THRESHOLD if now_short else RECOVERED,
+            'attendance_percentage': round(new_attended * 100.0 / new_held, 2),
+            'classes_held': new_held,
+            'classes_attended': new_attended,
+            'threshold': threshold,
+            'Date': date,
+            'created_at': created_at
+        }
+        cursor.execute('''
+            INSERT INTO attendance_alerts
+            (USN, subject_code, department, semester, section, alert_type,
+             attendance_percentage, classes_held, classes_attended, threshold, Date, created_at)
+            VALUES (:USN, :subject_code, :department, :semester, :section, :alert_type,
+                    :attendance_percentage, :classes_held, :classes_attended, :threshold, :Date, :created_at)
+        ''', alert)
+        alert['id'] = cursor.lastrowid
+        alerts.append(alert)
+    return alerts
+
+
+def list_alerts(conn, filters: Dict[str, Optional[str]], since_id: int = 0, limit: int = 100) -> List[Dict]:
+    """Return alerts matching the given section filters, newest first."""
+    clauses = ['id > ?']
+    params = [since_id]
+    for column in ('department', 'semester', 'section', 'subject_code', 'USN', 'alert_type'):
+        if filters.get(column):
+            clauses.append(f'{column} = ?')
+            params.append(filters[column])
+    rows = conn.execute(f'''
+        SELECT id, USN, subject_code, department, semester, section, alert_type,
+               attendance_percentage, classes_held, classes_attended, threshold, Date, created_at
+        FROM attendance_alerts
+        WHERE {' AND '.join(clauses)}
+        ORDER BY id DESC
+        LIMIT ?
+    ''', params + [limit]).fetchall()
+    return [dict(row) for row in rows]
+
+
+class AlertNotifier:
+    """
+    Delivers committed alerts off the request path. Stand-in sinks: alerts are
+    appended as JSON lines to a local file and/or POSTed to a webhook URL.
+    """
+
+    def __init__(self, file_path: Optional[str] = None, webhook_url: Optional[str] = None,
+                 webhook_timeout: float = 5.0, max_pending: int = 1000):
+        self.file_path = file_path
+        self.webhook_url = webhook_url
+        self.webhook_timeout = webhook_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file_path or self.webhook_url)
+
+    def notify(self, alerts: List[Dict]) -> None:
+        if not alerts or not self.enabled:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(list(alerts))
+        except queue.Full:
+            print(f"Alert notification queue full, dropped {len(alerts)} alerts")
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='alert-notifier', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            alerts = self._queue.get()
+            try:
+                self._deliver(alerts)
+            except Exception as e:
+                print(f"Error delivering attendance alerts: {str(e)}")
+
+    def _deliver(self, alerts: List[Dict]) -> None:
+        if self.file_path:
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                for alert in alerts:
+                    f.write(json.dumps(alert) + '\n')
+        if self.webhook_url:
+            body = json.dumps({'alerts': alerts}).encode('utf-8')
+            req = urllib.request.Request(self.webhook_url, data=body,
+                                         headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(req, timeout=self.webhook_timeout) as response:
+                response.read()
@@ -0,0 +1,314 @@
+import json
+import os
+import re
+import shutil
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import pandas as pd
+
+from file_lock import file_lock
+from sync import current_seq, pruned_seq
+
+# Tables snapshotted by the export and the columns they are partitioned by
+# (academic year / department / semester, in that order)
+PARTITION_COLUMNS = {
+    'attendance': ['AcademicYear', 'department', 'semester'],
+    'students': ['AcademicYear', 'Department', 'Semester'],
+    'section_mapping': ['academic_year', 'department', 'semester'],
+}
+
+FILE_EXTENSIONS = {
+    'parquet': 'parquet',
+    'arrow': 'arrow',
+}
+
+STATE_FILE = '_export_state.json'
+
+# Columns identifying one attendance mark; a later part file's copy of a mark (or its
+# deletion, a row with deleted set) supersedes earlier ones
+ATTENDANCE_KEY = ['USN', 'Date', 'subject_code', 'section']
+
+# Attendance part files, named after the change-log sequence range they hold
+PART_FILE = re.compile(r'part-(\d+)-(\d+)\.')
+
+# Version of the attendance part layout recorded in the state file; directories
+# written with another layout are exported afresh
+EXPORT_LAYOUT = 2
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Columnar export requires pyarrow. Install it with: pip install pyarrow")
+
+
+def _load_state(out_dir: str) -> Dict:
+    state_path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(state_path):
+        return {'last_seq': 0, 'runs': 0}
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+
+def _save_state(out_dir: str, state: Dict) -> None:
+    # Write to a temporary file first so a crash never leaves a truncated state file
+    state_path = os.path.join(out_dir, STATE_FILE)
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _partition_dir(out_dir: str, table: str, keys) -> str:
+    """
+    Build a Hive-style partition path, e.g.
+    attendance/AcademicYear=2024-25/department=cse/semester=5
+    """
+    parts = [f"{column}={quote(str(value), safe='')}"
+             for column, value in zip(PARTITION_COLUMNS[table], keys)]
+    return os.path.join(out_dir, table, *parts)
+
+
+def _write_frame(df: pd.DataFrame, path: str, file_format: str) -> None:
+    tmp_path = path + '.tmp'
+    df = df.reset_index(drop=True)
+    if file_format == 'arrow':
+        df.to_feather(tmp_path)
+    else:
+        df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _write_partitions(df: pd.DataFrame, out_dir: str, table: str, file_name: str,
+                      file_format: str) -> List[str]:
+    """
+    Split a frame by its partition columns and write one file per partition.
+    Partition columns are encoded in the directory names, not in the files.
+    """
+    written = []
+    if df.empty:
+        return written
+
+    columns = PARTITION_COLUMNS[table]
+    for keys, group in df.groupby(columns, sort=True):
+        partition = _partition_dir(out_dir, table, keys)
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, file_name)
+        _write_frame(group.drop(columns=columns), path, file_format)
+        written.append(path)
+    return written
+
+
+def _clear_stale_partitions(out_dir: str, table: str, keep: List[str]) -> None:
+    # Remove snapshot files left over from earlier runs, including partitions
+    # that no longer exist in the source table
+    table_dir = os.path.join(out_dir, table)
+    keep = set(os.path.abspath(path) for path in keep)
+    for root, _, files in os.walk(table_dir):
+        for name in files:
+            path = os.path.abspath(os.path.join(root, name))
+            if path not in keep:
+                os.remove(path)
+
+
+def _clear_unrecorded_parts(out_dir: str, last_seq: int) -> None:
+    # Part files starting after the saved watermark were written by a run that
+    # crashed before saving its state; the rerun exports their range again
+    table_dir = os.path.join(out_dir, 'attendance')
+    for root, _, files in os.walk(table_dir):
+        for name in files:
+            match = PART_FILE.match(name)
+            if name.endswith('.tmp') or (match and int(match.group(1)) > last_seq):
+                os.remove(os.path.join(root, name))
+
+
+def export_attendance(db_path: str, out_dir: str, file_format: str = 'parquet') -> Dict:
+    """
+    Snapshot attendance, students and section_mapping into partitioned columnar files.
+
+    Attendance is exported incrementally from the sync change log: the rows inserted
+    or edited since the previous run (tracked by the sequence watermark in
+    _export_state.json) are written, as they are now, to a new part file per
+    partition. Each row carries the seq of its latest change, deleted marks are
+    written as rows with deleted set, and load_export keeps only the latest copy of
+    a mark. The first run, and a run whose watermark falls before the pruned part
+    of the log, exports all of attendance afresh. Students and section mappings are
+    small and are rewritten as a full snapshot on every run.
+    Runs on one directory (the API endpoint, the command line) take turns.
+    Returns a summary of what was written.
+    """
+    if file_format not in FILE_EXTENSIONS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    _require_pyarrow()
+
+    os.makedirs(out_dir, exist_ok=True)
+    with file_lock(os.path.join(out_dir, STATE_FILE + '.lock')):
+        return _export(db_path, out_dir, file_format)
+
+
+def _export(db_path: str, out_dir: str, file_format: str) -> Dict:
+    state = _load_state(out_dir)
+    if state.get('runs') and state.get('format', file_format) != file_format:
+        raise ValueError(f"Export directory already holds {state['format']} files; use a new directory to change format")
+    if state.get('runs') and state.get('layout') != EXPORT_LAYOUT:
+        # Parts from an earlier layout (id ranges, or seq ranges without deleted marks)
+        # cannot be continued, so start over
+        print("Export directory uses an earlier layout; exporting all attendance afresh")
+        shutil.rmtree(os.path.join(out_dir, 'attendance'), ignore_errors=True)
+        state.pop('last_attendance_id', None)
+        state['last_seq'] = 0
+        _save_state(out_dir, state)
+    last_seq = state.get('last_seq', 0)
+    extension = FILE_EXTENSIONS[file_format]
+
+    # Read all three tables inside one read transaction so the snapshot is consistent
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        conn.execute('BEGIN')
+        new_seq = max(current_seq(conn), last_seq)
+        full = last_seq == 0 or pruned_seq(conn) > last_seq
+        if not full:
+            # Marks changed in (last_seq, new_seq], as they are at new_seq. A mark missing from
+            # attendance was deleted (its latest change is the delete): a row with deleted set,
+            # placed by the academic year the delete recorded
+            attendance = pd.read_sql_query('''
+                SELECT a.id,
+                       substr(changed.row_key, 1, instr(changed.row_key, '|') - 1) AS USN,
+                       substr(changed.row_key, instr(changed.row_key, '|') + 1) AS Date,
+                       changed.subject_code, a.Present, changed.department, changed.semester, changed.section,
+                       COALESCE(a.AcademicYear, changed.value) AS AcademicYear, changed.seq,
+                       a.id IS NULL AS deleted
+                FROM (
+                    -- The bare columns come from the row holding MAX(seq)
+                    SELECT subject_code, department, semester, section, row_key, value, MAX(seq) AS seq
+                    FROM sync_log
+                    WHERE entity = 'attendance' AND seq > ? AND seq <= ?
+                    GROUP BY subject_code, section, row_key
+                ) AS changed
+                LEFT JOIN attendance a
+                ON a.USN = substr(changed.row_key, 1, instr(changed.row_key, '|') - 1)
+                AND a.Date = substr(changed.row_key, instr(changed.row_key, '|') + 1)
+                AND a.subject_code = changed.subject_code
+                AND a.section = changed.section
+                ORDER BY changed.seq
+            ''', conn, params=(last_seq, new_seq))
+            # Deletes logged before the academic year was recorded cannot be placed
+            full = bool((attendance['deleted'].astype(bool) & attendance['AcademicYear'].isna()).any())
+        if full:
+            attendance = pd.read_sql_query('''
+                SELECT id, USN, Date, subject_code, Present, department, semester, section, AcademicYear,
+                       ? AS seq, 0 AS deleted
+                FROM attendance
+                ORDER BY id
+            ''', conn, params=(new_seq,))
+        students = pd.read_sql_query('''
+            SELECT USN, Name, Department, Semester, Section, AcademicYear
+            FROM students
+        ''', conn)
+        section_mapping = pd.read_sql_query('''
+            SELECT id, faculty_id, department, semester, section, subject_code, subject_name, academic_year
+            FROM section_mapping
+        ''', conn)
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+
+    # Deleted marks have no id or Present value
+    attendance['id'] = attendance['id'].astype('Int64')
+    attendance['Present'] = attendance['Present'].fillna(0).astype(bool)
+    attendance['deleted'] = attendance['deleted'].astype(bool)
+
+    if full and last_seq:
+        # The log cannot bring the watermark up to date (pruned past it, or holding deletes
+        # that cannot be placed): drop the old parts before exporting afresh, recording
+        # that first so a crash in between starts over again
+        print(f"Change log cannot update export watermark {last_seq}; exporting all attendance")
+        last_seq = 0
+        state['last_seq'] = 0
+        _save_state(out_dir, state)
+    _clear_unrecorded_parts(out_dir, last_seq)
+
+    attendance_files = []
+    if not attendance.empty:
+        part_name = f"part-{last_seq + 1:012d}-{new_seq:012d}.{extension}"
+        attendance_files = _write_partitions(attendance, out_dir, 'attendance', part_name, file_format)
+
+    snapshot_name = f"snapshot.{extension}"
+    student_files = _write_partitions(students, out_dir, 'students', snapshot_name, file_format)
+    _clear_stale_partitions(out_dir, 'students', student_files)
+    mapping_files = _write_partitions(section_mapping, out_dir, 'section_mapping', snapshot_name, file_format)
+    _clear_stale_partitions(out_dir, 'section_mapping', mapping_files)
+
+    state.update({
+        'last_seq': new_seq,
+        'runs': state.get('runs', 0) + 1,
+        'last_run': datetime.now().isoformat(timespec='seconds'),
+        'format': file_format,
+        'layout': EXPORT_LAYOUT,
+    })
+    _save_state(out_dir, state)
+
+    return {
+        'attendance_rows': len(attendance),
+        'attendance_files': len(attendance_files),
+        'student_rows': len(students),
+        'section_mapping_rows': len(section_mapping),
+        'last_seq': new_seq,
+        'output_dir': out_dir,
+    }
+
+
+def load_export(out_dir: str, table: str, filters: Optional[List] = None) -> pd.DataFrame:
+    """
+    Load one exported table back into a DataFrame, restoring the partition columns.
+    Attendance marks edited after being exported appear once, as last exported,
+    and deleted ones not at all.
+    filters follows the pyarrow dataset filter syntax, e.g. [('department', '=', 'cse')]
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    file_format = _load_state(out_dir).get('format', 'parquet')
+    # Keep partition values as strings, the way they are stored in SQLite
+    partitioning = ds.partitioning(
+        pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS[table]]),
+        flavor='hive'
+    )
+    dataset = ds.dataset(
+        os.path.join(out_dir, table),
+        format='ipc' if file_format == 'arrow' else 'parquet',
+        partitioning=partitioning
+    )
+    expression = None
+    for column, op, value in filters or []:
+        if op != '=':
+            raise ValueError(f"Unsupported filter operator: {op}")
+        condition = ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+    df = dataset.to_table(filter=expression).to_pandas()
+    if table == 'attendance':
+        df = df.sort_values('seq', kind='stable').drop_duplicates(ATTENDANCE_KEY, keep='last')
+        df = df[~df['deleted']].drop(columns='deleted')
+        df = df.astype({'id': 'int64'}).sort_values('id').reset_index(drop=True)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export attendance data to partitioned columnar files')
+    parser.add_argument('--db', default='attendance.db', help='Path to the SQLite database')
+    parser.add_argument('--out', default='analytics_export', help='Output directory')
+    parser.add_argument('--format', default='parquet', choices=sorted(FILE_EXTENSIONS))
+    args = parser.parse_args()
+
+    summary = export_attendance(args.db, args.out, args.format)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
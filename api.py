@@ -1,15 +1,53 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, g, has_request_context
 from flask_cors import CORS
 import pandas as pd
 from datetime import date, datetime
+import gzip
 import io
+import json
 import os
 import sqlite3
-from contextlib import contextmanager
-import hashlib
-import re
-import xlsxwriter  
-from subject_codes import parse_subject_codes, get_subjects_for_semester
+import threading
+from contextlib import closing, contextmanager
+from subject_codes import index_subjects, parse_subject_codes, subject_group_key
+from analytics_export import export_attendance
+from attendance_analytics import compute_shortage_report
+from file_lock import file_lock
+from db_writer import WriteQueue, WriteQueueFull
+from events import EventBus, stream_events
+from activity_log import ActivityLog
+from attendance_summary import (
+    apply_marks, create_summary_tables, range_counts, rebuild_all, rebuild_prefix, recompute_keys,
+    stream_counters
+)
+from passwords import HasherBusy, HashingPool, VerificationCache, default_hasher
+from alerts import AlertNotifier, create_alert_tables, evaluate_changes, list_alerts
+from auth import SessionTokens, TokenError, bearer_token, in_scope, shared_secret
+from idempotency import IdempotencyCache, Replay, create_idempotency_table, idempotent, prune_idempotency_keys
+from report_encoding import REPORT_FORMATS, encode_marks
+from sync import attendance_changes, create_sync_schema, current_seq, prune_sync_log, pull_changes
+from upload_staging import UploadStaging
+from student_import import read_student_upload
+from report_export import BundleBusy, ReportBundles, render_report, section_report_frame
+from roster import create_roster_tables, rollover_roster
+from metrics import Metrics
+from singleflight import SingleFlight, coalesced
+from rows import ROW_SHAPES, encode_json, fetch_rows, stream_rows
+import query_budget
+from query_budget import QueryBudget
+from db_pool import ConnectionPool
+from snapshot import SnapshotReplica
+import queries
+from queries import json_list
+from bulk_import import (
+    FACULTY_COLUMNS, MAPPING_COLUMNS, check_faculty_conflicts, check_mapping_conflicts, insert_faculty,
+    insert_mappings, read_csv_frame, sort_errors, validate_faculty, validate_mappings
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
@@ -26,14 +64,145 @@ DEPARTMENT_SUBJECTS = {
 
 DATABASE_FILE = 'attendance.db'
 
+# Lock file serializing schema setup when several worker processes start together
+DATABASE_LOCK_FILE = DATABASE_FILE + '.lock'
+
+# Set once the database and in-memory caches are ready to serve requests
+APP_READY = False
+
+# Group-commit settings for the per-process SQLite writer thread
+WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', 64))
+WRITE_BATCH_DELAY = float(os.environ.get('WRITE_BATCH_DELAY_MS', 5)) / 1000
+WRITE_QUEUE_SIZE = int(os.environ.get('WRITE_QUEUE_SIZE', 1024))
+WRITE_TIMEOUT = float(os.environ.get('WRITE_TIMEOUT', 30))
+
+# Read connections kept open per process for reuse across requests, and the
+# compiled statements each connection (and the writer's) keeps cached
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+STATEMENT_CACHE_SIZE = int(os.environ.get('STATEMENT_CACHE_SIZE', 512))
+
+# In-process bus feeding the /api/events/stream push channel
+EVENT_BUS = EventBus(replay_size=int(os.environ.get('EVENT_REPLAY_SIZE', 500)))
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', 15))
+
+# Activity feed; the newest entries are also kept in memory
+ACTIVITY_LOG = ActivityLog(capacity=int(os.environ.get('ACTIVITY_BUFFER_SIZE', 100)))
+
+# Minimum attendance percentage before a student is listed in shortage reports
+ATTENDANCE_THRESHOLD = float(os.environ.get('ATTENDANCE_THRESHOLD', 75))
+
+# Shortage alerts are raised when marking attendance moves a student across the
+# threshold, once at least ALERT_MIN_CLASSES classes have been held
+ALERT_MIN_CLASSES = int(os.environ.get('ALERT_MIN_CLASSES', 5))
+ALERT_NOTIFIER = AlertNotifier(
+    file_path=os.environ.get('ALERT_LOG_FILE'),
+    webhook_url=os.environ.get('ALERT_WEBHOOK_URL')
+)
+
+# Password hashing runs in a per-process pool of worker processes; by default the
+# cores are shared out between the web workers
+PASSWORD_HASH_WORKERS = int(os.environ.get(
+    'PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', 1)))
+))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+PASSWORD_CACHE_SIZE = int(os.environ.get('PASSWORD_CACHE_SIZE', 1024))
+PASSWORD_CACHE_TTL = float(os.environ.get('PASSWORD_CACHE_TTL', 300))
+
+# Signed session tokens issued at login. Without SECRET_KEY a random key is
+# generated once into SECRET_KEY_FILE and read by every server process, so
+# tokens verify on any worker
+SECRET_KEY = os.environ.get('SECRET_KEY')
+SECRET_KEY_FILE = os.environ.get('SECRET_KEY_FILE', DATABASE_FILE + '.secret')
+if not SECRET_KEY:
+    print(f"Warning: SECRET_KEY is not set, using the generated key in {SECRET_KEY_FILE} for session tokens")
+SESSION_TOKENS = SessionTokens(
+    SECRET_KEY.encode('utf-8') if SECRET_KEY else shared_secret(SECRET_KEY_FILE, DATABASE_LOCK_FILE),
+    ttl=float(os.environ.get('SESSION_TTL', 8 * 3600))
+)
+# Reject faculty routes without a session token (off until the frontend sends them)
+AUTH_REQUIRED = os.environ.get('AUTH_REQUIRED', '0') == '1'
+
+# Per-process counters served by /api/metrics
+METRICS = Metrics()
+
+# Database work allowed per request: a wall-clock deadline counted from the start
+# of the request (running statements are interrupted past it; time outside
+# queries counts too) and a number of statements.
+# 0 disables a limit; ROUTE_QUERY_BUDGETS overrides them per endpoint.
+QUERY_TIME_BUDGET = float(os.environ.get('QUERY_TIME_BUDGET', 10))
+QUERY_COUNT_BUDGET = int(os.environ.get('QUERY_COUNT_BUDGET', 200))
+REPORT_QUERY_TIME_BUDGET = float(os.environ.get('REPORT_QUERY_TIME_BUDGET', 30))
+ROUTE_QUERY_BUDGETS = {
+    'view_attendance': (REPORT_QUERY_TIME_BUDGET, QUERY_COUNT_BUDGET),
+    'get_admin_attendance_report': (REPORT_QUERY_TIME_BUDGET, QUERY_COUNT_BUDGET),
+    'get_attendance_report': (REPORT_QUERY_TIME_BUDGET, QUERY_COUNT_BUDGET),
+    'download_attendance_report': (REPORT_QUERY_TIME_BUDGET, QUERY_COUNT_BUDGET),
+    'get_shortage_report': (REPORT_QUERY_TIME_BUDGET, QUERY_COUNT_BUDGET),
+    'event_stream': (0, 0),
+}
+
+# Identical report requests in flight at the same time share one computation
+REPORT_FLIGHT = SingleFlight(METRICS)
+
+# Responses of write requests sent with an Idempotency-Key, replayed on retries.
+# Kept in the idempotency_keys table, with this process's recent ones in memory
+IDEMPOTENCY_CACHE = IdempotencyCache(
+    max_size=int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('IDEMPOTENCY_TTL', 24 * 3600)),
+    connect=lambda: get_db()
+)
+
+# Offline sync: days of attendance in a full snapshot, and how long the change
+# log is kept before older clients fall back to a full snapshot
+SYNC_ATTENDANCE_DAYS = int(os.environ.get('SYNC_ATTENDANCE_DAYS', 30))
+SYNC_LOG_RETENTION_DAYS = int(os.environ.get('SYNC_LOG_RETENTION_DAYS', 90))
+
+# Buffered text responses at least this large are compressed (br if the brotli
+# package is installed, otherwise gzip) when the client accepts it
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/csv', 'text/plain', 'text/html'}
+
+# Student uploads validated by the preview step, committed later by token
+UPLOAD_STAGING = UploadStaging(
+    directory=os.environ.get('UPLOAD_STAGING_DIR'),
+    max_entries=int(os.environ.get('UPLOAD_STAGING_SIZE', 64)),
+    ttl=float(os.environ.get('UPLOAD_STAGING_TTL', 1800))
+)
+
+# Directory holding the partitioned columnar snapshots used for offline analytics
+ANALYTICS_EXPORT_DIR = os.environ.get('ANALYTICS_EXPORT_DIR', 'analytics_export')
+
+# Multi-section report bundles: rendered by a pool of REPORT_BUNDLE_WORKERS
+# processes (default: all cores), one export at a time per server process
+REPORT_BUNDLES = ReportBundles(
+    out_dir=os.environ.get('REPORT_BUNDLE_DIR', 'report_bundles'),
+    max_workers=int(os.environ.get('REPORT_BUNDLE_WORKERS', 0)) or None,
+    keep_hours=float(os.environ.get('REPORT_BUNDLE_KEEP_HOURS', 24))
+)
+
+# Read-only replica of the database for heavy reports and exports, remade with
+# the online backup API every REPLICA_REFRESH_INTERVAL seconds (0 disables it).
+# They read the live database whenever the replica is older than REPLICA_MAX_AGE.
+REPLICA_FILE = os.environ.get('REPLICA_FILE', 'attendance.replica.db')
+REPLICA_REFRESH_INTERVAL = float(os.environ.get('REPLICA_REFRESH_INTERVAL', 60))
+REPLICA_MAX_AGE = float(os.environ.get('REPLICA_MAX_AGE', 300))
+
 # Load subject codes from file
 SUBJECT_CODES_FILE = os.path.join(os.path.dirname(__file__), 'subcodes.md')
 with open(SUBJECT_CODES_FILE, 'r') as f:
     SUBJECTS_DATA = parse_subject_codes(f.read())
 
+# Subject lists per (semester group key, scheme), filled by warmup(); the subject
+# route answers with a dict lookup instead of filtering the catalogue per request
+SUBJECT_LISTS = {}
+
 def migrate_database():
     try:
-        with get_db() as conn:
+        # A plain connection, like init_db(): bootstrap() runs in the preloaded gunicorn
+        # master, and no pooled connection may be left open across the fork
+        with closing(sqlite3.connect(DATABASE_FILE)) as conn:
+            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
             # Check if subject_name column exists in section_mapping
@@ -120,6 +289,9 @@ def init_db():
     with sqlite3.connect(DATABASE_FILE) as conn:
         cursor = conn.cursor()
         
+        # WAL lets report reads proceed while the writer thread commits
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Create students table with all required columns
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS students (
@@ -162,6 +334,18 @@ def init_db():
             )
         ''')
         
+        # Create append-only activity log feeding the recent activity feed
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activity_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,
+                description TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        # The feed reads by id; an index on created_at served no query and only slowed inserts
+        cursor.execute('DROP INDEX IF EXISTS idx_activity_log_created_at')
+        
         # Create attendance table with Section field and updated unique constraint
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS attendance (
@@ -179,11 +363,71 @@ def init_db():
             )
         ''')
         
+        # Serves the per-section lookups of reports and summary recomputation
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attendance_section_date
+            ON attendance (subject_code, department, semester, section, Date)
+        ''')
+        
+        # Cached per-student percentages, kept current by every attendance write
+        create_summary_tables(cursor)
+        create_alert_tables(cursor)
+        create_roster_tables(cursor)
+        create_idempotency_table(cursor)
+        pruned = prune_idempotency_keys(cursor, IDEMPOTENCY_CACHE.ttl)
+        if pruned:
+            print(f"Pruned {pruned} expired idempotency keys")
+        cursor.execute('SELECT 1 FROM attendance_summary LIMIT 1')
+        if not cursor.fetchone():
+            cursor.execute('SELECT 1 FROM attendance LIMIT 1')
+            if cursor.fetchone():
+                print(f"Built attendance summaries for {rebuild_all(cursor)} class streams")
+        else:
+            cursor.execute('SELECT 1 FROM attendance_prefix LIMIT 1')
+            if not cursor.fetchone():
+                # Databases summarised before running totals existed
+                rebuild_prefix(cursor)
+                print("Built attendance running totals")
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'summary_dirty'")
+        if cursor.fetchone():
+            # Sections flagged by versions that recomputed summaries lazily
+            cursor.execute('SELECT subject_code, department, semester, section FROM summary_dirty')
+            recompute_keys(cursor, [tuple(row) for row in cursor.fetchall()])
+            cursor.execute('DROP TABLE summary_dirty')
+        
         conn.commit()
         print("Database initialized successfully with all required tables and columns.")
         
     # Run migration after initialization
     migrate_database()
+    
+    # Change-log triggers are created after migrations, which may rebuild tables
+    with sqlite3.connect(DATABASE_FILE) as conn:
+        cursor = conn.cursor()
+        create_sync_schema(cursor)
+        pruned = prune_sync_log(cursor, SYNC_LOG_RETENTION_DAYS)
+        if pruned:
+            print(f"Pruned {pruned} sync log entries older than {SYNC_LOG_RETENTION_DAYS} days")
+        conn.commit()
+
+def bootstrap():
+    """
+    Prepare the process for serving: create/migrate the schema and warm the caches.
+    Schema setup runs under an inter-process file lock, so when several workers
+    start at once only one of them runs init_db()/migrate_database() at a time.
+    Under gunicorn with preload_app this runs once in the master before forking.
+    """
+    global APP_READY
+    with file_lock(DATABASE_LOCK_FILE):
+        init_db()
+    warmup()
+    APP_READY = True
+
+def warmup():
+    # Built in the preloaded master, the lists are shared by the forked workers
+    SUBJECT_LISTS.update(index_subjects(SUBJECTS_DATA))
+    print(f"Warmup completed: {len(SUBJECT_LISTS)} subject lists of "
+          f"{sum(len(v) for v in SUBJECTS_DATA.values())} subjects cached")
 
 def verify_database():
     try:
@@ -224,15 +468,235 @@ def verify_database():
         print(f"Database verification failed: {e}")
         init_db()  # Initialize only on complete database failure
 
+_connection_pool = None
+_connection_pool_pid = None
+_connection_pool_lock = threading.Lock()
+
+def get_connection_pool():
+    # Created lazily (and per pid) like the write queue
+    global _connection_pool, _connection_pool_pid
+    if _connection_pool is None or _connection_pool_pid != os.getpid():
+        with _connection_pool_lock:
+            if _connection_pool is None or _connection_pool_pid != os.getpid():
+                _connection_pool = ConnectionPool(DATABASE_FILE, max_idle=DB_POOL_SIZE,
+                                                  cached_statements=STATEMENT_CACHE_SIZE)
+                _connection_pool_pid = os.getpid()
+    return _connection_pool
+
+_replica = None
+_replica_pid = None
+_replica_lock = threading.Lock()
+
+def get_replica():
+    """
+    Return this process's replica handle, starting its refresher thread on first
+    use. Created lazily (and per pid) like the write queue.
+    """
+    global _replica, _replica_pid
+    if _replica is None or _replica_pid != os.getpid():
+        with _replica_lock:
+            if _replica is None or _replica_pid != os.getpid():
+                _replica = SnapshotReplica(DATABASE_FILE, REPLICA_FILE, interval=REPLICA_REFRESH_INTERVAL,
+                                           max_age=REPLICA_MAX_AGE)
+                _replica.start()
+                _replica_pid = os.getpid()
+    return _replica
+
+def report_database():
+    # Database file for heavy reads: the replica while it is fresh enough
+    path = get_replica().fresh_path() if REPLICA_REFRESH_INTERVAL > 0 else None
+    METRICS.incr('report_reads_total', source='replica' if path else 'primary')
+    return path or DATABASE_FILE
+
 @contextmanager
-def get_db():
-    conn = sqlite3.connect(DATABASE_FILE)
+def get_report_db():
+    """Read-only connection for heavy reports, on the replica when it is within REPLICA_MAX_AGE."""
+    path = report_database()
+    if path == DATABASE_FILE:
+        with get_db() as conn:
+            yield conn
+        return
+    budget = g.get('query_budget') if has_request_context() else None
+    conn = query_budget.connect(f'file:{path}?mode=ro', budget, uri=True)
     conn.row_factory = sqlite3.Row
     try:
         yield conn
     finally:
         conn.close()
 
+@contextmanager
+def get_db():
+    # Pooled connection; inside a request, queries count against the request's budget
+    budget = g.get('query_budget') if has_request_context() else None
+    pool = get_connection_pool()
+    conn = pool.acquire(budget)
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+_write_queue = None
+_write_queue_pid = None
+_write_queue_lock = threading.Lock()
+
+def get_write_queue():
+    """
+    Return this process's write queue, starting the writer thread on first use.
+    Created lazily (and per pid) so forked gunicorn workers each get their own thread;
+    the lock keeps concurrent first requests from starting two writers.
+    """
+    global _write_queue, _write_queue_pid
+    if _write_queue is None or _write_queue_pid != os.getpid():
+        with _write_queue_lock:
+            if _write_queue is None or _write_queue_pid != os.getpid():
+                _write_queue = WriteQueue(
+                    DATABASE_FILE,
+                    max_batch=WRITE_BATCH_SIZE,
+                    max_delay=WRITE_BATCH_DELAY,
+                    max_pending=WRITE_QUEUE_SIZE,
+                    cached_statements=STATEMENT_CACHE_SIZE
+                )
+                _write_queue_pid = os.getpid()
+    return _write_queue
+
+def run_write(job):
+    # Run a write job on the writer thread and wait for its committed result
+    return get_write_queue().execute(job, timeout=WRITE_TIMEOUT)
+
+_password_pool = None
+_password_pool_pid = None
+_password_pool_lock = threading.Lock()
+
+def get_password_pool():
+    """
+    Return this process's password hashing pool, spawning its workers on first use.
+    Created lazily (and per pid) like the write queue.
+    """
+    global _password_pool, _password_pool_pid
+    if _password_pool is None or _password_pool_pid != os.getpid():
+        with _password_pool_lock:
+            if _password_pool is None or _password_pool_pid != os.getpid():
+                _password_pool = HashingPool(
+                    default_hasher(),
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    max_pending=PASSWORD_HASH_QUEUE,
+                    cache=VerificationCache(max_size=PASSWORD_CACHE_SIZE, ttl=PASSWORD_CACHE_TTL)
+                )
+                _password_pool_pid = os.getpid()
+    return _password_pool
+
+# Routes serving one faculty member's data; the token subject must match
+FACULTY_SCOPED_ENDPOINTS = {
+    'get_faculty_subjects', 'get_faculty_reports', 'get_faculty_sections',
+    'get_attendance_report', 'get_faculty_dashboard_stats', 'faculty_sync'
+}
+
+def session_from_header(authorization):
+    # Verified token claims, or None when no token was sent; raises TokenError
+    token = bearer_token(authorization)
+    return SESSION_TOKENS.verify(token) if token else None
+
+def faculty_access_error(session, faculty_id):
+    """Return an (error, status) pair if the session may not access this faculty's data."""
+    if session is None:
+        return ('Authentication required', 401) if AUTH_REQUIRED else None
+    if session['sub'] != faculty_id:
+        return ("Not allowed to access another faculty member's data", 403)
+    return None
+
+def section_access_error(session, subject_code, department, semester, section):
+    """Return an (error, status) pair if the session's sections don't include this one."""
+    if session is None:
+        return ('Authentication required', 401) if AUTH_REQUIRED else None
+    if not in_scope(session, subject_code, department, semester, section):
+        return ('Section is not assigned to you', 403)
+    return None
+
+@app.before_request
+def authenticate_request():
+    # Token checks are HMAC + in-memory lookups only; no database access
+    g.session = None
+    if request.method == 'OPTIONS':
+        return None
+    try:
+        g.session = session_from_header(request.headers.get('Authorization'))
+    except TokenError as e:
+        return jsonify({'error': str(e)}), 401
+    if request.endpoint in FACULTY_SCOPED_ENDPOINTS:
+        error = faculty_access_error(g.session, (request.view_args or {}).get('faculty_id'))
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+    return None
+
+@app.before_request
+def start_query_budget():
+    time_limit, max_queries = ROUTE_QUERY_BUDGETS.get(request.endpoint, (QUERY_TIME_BUDGET, QUERY_COUNT_BUDGET))
+    if time_limit or max_queries:
+        g.query_budget = QueryBudget(request.endpoint, time_limit or None, max_queries or None)
+
+@app.after_request
+def compress_response(response):
+    """
+    Negotiate br/gzip for buffered text responses. Streams (the event stream,
+    file downloads) pass through untouched, as do bodies too small to gain.
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300 or response.status_code == 204
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=min(COMPRESS_LEVEL, 11)))
+    else:
+        response.set_data(gzip.compress(body, COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.after_request
+def enforce_query_budget(response):
+    # Runs before compression
+    return query_budget_response(response)
+
+def query_budget_response(response):
+    """
+    Routes turn any exception into a 500, so an overrun is recognised here and
+    reported with its own status. Coalesced views apply it before sharing their
+    response, so the waiting requests get the same 504/500.
+    """
+    budget = g.pop('query_budget', None)
+    if budget is None or budget.exceeded is None:
+        return response
+    kind, message = budget.exceeded
+    METRICS.incr('query_budget_exceeded_total', route=request.endpoint, kind=kind)
+    print(f"Query budget exceeded in {request.endpoint}: {message} ({budget.queries} queries)")
+    response = jsonify({'error': message})
+    # Too slow is a timeout; too many queries is a bug in the route
+    response.status_code = 504 if kind == 'time' else 500
+    return response
+
+def publish_event(event_type, data):
+    # Publish a delta to live dashboard subscribers; never let it fail the request
+    try:
+        EVENT_BUS.publish(event_type, data)
+    except Exception as e:
+        print(f"Error publishing {event_type} event: {str(e)}")
+
+def announce_activity(entry):
+    # Call once the transaction that recorded the entry has committed
+    ACTIVITY_LOG.remember(entry)
+    publish_event('activity', entry)
+
 def attendance_exists(department, semester, subject, date_to_check):
     with get_db() as conn:
         cursor = conn.cursor()
@@ -243,6 +707,44 @@ def attendance_exists(department, semester, subject, date_to_check):
         count = cursor.fetchone()[0]
         return count > 0
 
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({'pid': os.getpid(), 'metrics': METRICS.snapshot()})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    if not APP_READY:
+        return jsonify({'status': 'starting'}), 503
+    try:
+        with get_db() as conn:
+            conn.execute('SELECT 1').fetchone()
+        return jsonify({'status': 'ready', 'pid': os.getpid()})
+    except sqlite3.Error as e:
+        return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+
+@app.route('/api/events/stream', methods=['GET'])
+def event_stream():
+    topics = [t for t in request.args.get('topics', '').split(',') if t]
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    subscription = EVENT_BUS.subscribe(topics or None, last_event_id)
+    return Response(
+        stream_events(EVENT_BUS, subscription, heartbeat=SSE_HEARTBEAT),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/api/departments', methods=['GET'])
 def get_departments():
     return jsonify(list(DEPARTMENT_SUBJECTS.keys()))
@@ -257,7 +759,7 @@ def get_subjects(department):
         return jsonify([])
     
     try:
-        subjects = get_subjects_for_semester(semester, group, SUBJECTS_DATA, scheme)
+        subjects = SUBJECT_LISTS.get((subject_group_key(semester, group), scheme), [])
         return jsonify([{
             'code': subject['code'],
             'name': subject['name'],
@@ -269,66 +771,6 @@ def get_subjects(department):
         print(f"Error fetching subjects: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def validate_student_data(df, section_mapping=None):
-    errors = []
-    
-    print("\nValidating DataFrame:")
-    print("Shape:", df.shape)
-    print("Columns:", df.columns.tolist())
-    print("First few rows:")
-    print(df.head())
-    
-    if section_mapping:
-        print("\nSection Mapping:", section_mapping)
-    
-    # Check for empty values
-    for col in df.columns:
-        empty_rows = df[df[col].isna() | (df[col].astype(str).str.strip() == '')].index.tolist()
-        if empty_rows:
-            error_msg = f"Empty values in {col} at rows: {', '.join(map(str, [i+2 for i in empty_rows]))}"
-            print(error_msg)
-            errors.append(error_msg)
-    
-    # Validate USN format with detailed error reporting
-    invalid_usn_rows = []
-    usn_pattern = r'^\d[A-Za-z]{2}\d{2}[A-Za-z]{2}\d{3}$'  # Pattern for format like 3PG22CS107
-    for idx, usn in enumerate(df['USN']):
-        usn_str = str(usn).strip().upper()  # Convert to uppercase for validation
-        if not re.match(usn_pattern, usn_str):
-            invalid_usn_rows.append(idx)
-            print(f"Invalid USN format at row {idx+2}: '{usn_str}' - Expected format: 3PG22CS107")
-    
-    if invalid_usn_rows:
-        error_msg = f"Invalid USN format at rows: {', '.join(map(str, [i+2 for i in invalid_usn_rows]))}"
-        print(error_msg)
-        errors.append(error_msg)
-    
-    # If section mapping is provided, validate against it
-    if section_mapping:
-        # Validate Department matches
-        invalid_dept = df[df['Department'].str.lower() != section_mapping['department'].lower()].index.tolist()
-        if invalid_dept:
-            error_msg = f"Department must be {section_mapping['department']} at rows: {', '.join(map(str, [i+2 for i in invalid_dept]))}"
-            print(error_msg)
-            errors.append(error_msg)
-        
-        # Validate Semester matches
-        invalid_sem = df[df['Semester'].astype(str) != str(section_mapping['semester'])].index.tolist()
-        if invalid_sem:
-            error_msg = f"Semester must be {section_mapping['semester']} at rows: {', '.join(map(str, [i+2 for i in invalid_sem]))}"
-            print(error_msg)
-            errors.append(error_msg)
-        
-        # Validate Academic Year matches
-        invalid_year = df[df['AcademicYear'] != section_mapping['academic_year']].index.tolist()
-        if invalid_year:
-            error_msg = f"Academic Year must be {section_mapping['academic_year']} at rows: {', '.join(map(str, [i+2 for i in invalid_year]))}"
-            print(error_msg)
-            errors.append(error_msg)
-    
-    print(f"\nValidation completed with {len(errors)} errors")
-    return errors
-
 @app.route('/api/upload-students/preview', methods=['POST'])
 def preview_students():
     if 'file' not in request.files:
@@ -364,20 +806,8 @@ def preview_students():
             mapping = dict(mapping)
             print(f"Section mapping details: {mapping}")
 
-        # Read the file with headers
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(file, dtype=str)
-            print("File read as CSV with headers")
-        else:
-            df = pd.read_excel(file, engine='openpyxl', dtype=str)
-            print("File read as Excel with headers")
-        
-        print("\nInitial DataFrame:")
-        print(df.head())
-        print("\nColumns:", df.columns.tolist())
-        
-        # Validate data and check if it matches the section mapping
-        errors = validate_student_data(df, mapping)
+        # Stream the needed columns and validate them chunk by chunk against the section mapping
+        df, errors = read_student_upload(file, file.filename, mapping)
         if errors:
             print("\nValidation errors:", errors)
             return jsonify({
@@ -386,21 +816,26 @@ def preview_students():
                 'data': df.to_dict('records')  # Include the data for debugging
             }), 400
         
-        # Standardize the data
-        df['Department'] = df['Department'].str.lower()
-        df['USN'] = df['USN'].str.upper()
-        
         # Add section information
         df['Section'] = mapping['section']
         
         # Convert DataFrame to list of dictionaries
         students = df.to_dict('records')
         
+        # Park the normalized rows so the upload step can insert them without re-parsing
+        upload_token = UPLOAD_STAGING.stage({
+            'section_mapping_id': str(section_mapping_id),
+            'mapping': mapping,
+            'rows': list(df[['USN', 'Name', 'Department', 'Semester', 'Section', 'AcademicYear']]
+                         .itertuples(index=False, name=None))
+        })
+        
         print("\nProcessed successfully!")
         return jsonify({
             'students': students,
             'total_records': len(students),
-            'section_info': mapping
+            'section_info': mapping,
+            'upload_token': upload_token
         })
     except Exception as e:
         print(f"Error processing file: {str(e)}")
@@ -408,132 +843,147 @@ def preview_students():
 
 @app.route('/api/upload-students', methods=['POST'])
 def upload_students():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
-    
-    file = request.files['file']
     section_mapping_id = request.form.get('section_mapping_id')
+    upload_token = request.form.get('upload_token')
     
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
+    if not upload_token:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
     
     if not section_mapping_id:
         return jsonify({'error': 'Section mapping ID is required'}), 400
 
     try:
         print("\nProcessing student upload:")
-        print(f"File: {file.filename}")
+        print(f"Upload token: {upload_token}" if upload_token else f"File: {file.filename}")
         print(f"Section mapping ID: {section_mapping_id}")
         
-        # First get the section mapping details
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT department, semester, section, academic_year
-                FROM section_mapping
-                WHERE id = ?
-            ''', (section_mapping_id,))
+        if upload_token:
+            # The preview step already parsed, validated and normalized the file
+            batch = UPLOAD_STAGING.get(upload_token)
+            if batch is None:
+                return jsonify({'error': 'Upload expired or unknown, please preview the file again'}), 410
+            if batch['section_mapping_id'] != str(section_mapping_id):
+                return jsonify({'error': 'Upload was previewed for a different section mapping'}), 400
+            mapping = batch['mapping']
+            insert_data = [tuple(row) for row in batch['rows']]
+        else:
+            # First get the section mapping details
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute(queries.SECTION_MAPPING_BY_ID, (section_mapping_id,))
             
-            mapping = cursor.fetchone()
-            if not mapping:
-                print(f"Invalid section mapping ID: {section_mapping_id}")
-                return jsonify({'error': 'Invalid section mapping ID'}), 400
+                mapping = cursor.fetchone()
+                if not mapping:
+                    print(f"Invalid section mapping ID: {section_mapping_id}")
+                    return jsonify({'error': 'Invalid section mapping ID'}), 400
             
-            mapping = dict(mapping)
-            print(f"Section mapping details: {mapping}")
+                mapping = dict(mapping)
+                print(f"Section mapping details: {mapping}")
 
-        # Read the file with headers
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(file, dtype=str)
-            print("File read as CSV with headers")
-        else:
-            df = pd.read_excel(file, engine='openpyxl', dtype=str)
-            print("File read as Excel with headers")
+            # Stream, validate and normalize the needed columns chunk by chunk
+            df, errors = read_student_upload(file, file.filename, mapping)
+            if errors:
+                print("\nValidation errors:", errors)
+                return jsonify({
+                    'error': 'Validation failed',
+                    'errors': errors
+                }), 400
         
-        print("\nInitial DataFrame:")
-        print(df.head())
-        print("\nColumns:", df.columns.tolist())
+            df['Section'] = mapping['section']  # Add section from mapping
         
-        # Validate data
-        errors = validate_student_data(df, mapping)
-        if errors:
-            print("\nValidation errors:", errors)
-            return jsonify({
-                'error': 'Validation failed',
-                'errors': errors
-            }), 400
+            print("\nPrepared data for insertion:")
+            print(df.head())
         
-        # Standardize data
-        df['Department'] = df['Department'].str.lower()
-        df['USN'] = df['USN'].str.upper()
-        df['Section'] = mapping['section']  # Add section from mapping
+            # Prepare data for insertion
+            insert_data = list(df[['USN', 'Name', 'Department', 'Semester', 'Section', 'AcademicYear']]
+                               .itertuples(index=False, name=None))
         
-        print("\nPrepared data for insertion:")
-        print(df.head())
+        usns = json_list(row[0] for row in insert_data)
         
-        # Insert students into database
-        with get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Begin transaction
-            cursor.execute('BEGIN TRANSACTION')
+        def insert_students(cursor):
+            # Duplicate check and insert run in the same transaction on the writer thread
+            cursor.execute(queries.EXISTING_USNS, (usns,))
             
-            try:
-                # Check for duplicate USNs
-                usns = df['USN'].tolist()
-                placeholders = ','.join(['?' for _ in usns])
-                cursor.execute(f'''
-                    SELECT USN 
-                    FROM students 
-                    WHERE USN IN ({placeholders})
-                ''', usns)
-                
-                existing_usns = set(row['USN'] for row in cursor.fetchall())
-                if existing_usns:
-                    print(f"\nFound duplicate USNs: {existing_usns}")
-                    return jsonify({
-                        'error': 'Duplicate USNs found',
-                        'duplicates': list(existing_usns)
-                    }), 400
-                
-                # Prepare data for insertion
-                insert_data = []
-                for _, row in df.iterrows():
-                    insert_data.append((
-                        row['USN'],
-                        row['Name'],
-                        row['Department'],
-                        row['Semester'],
-                        row['Section'],
-                        row['AcademicYear']
-                    ))
-                
-                # Insert new students
-                cursor.executemany('''
-                    INSERT INTO students (USN, Name, Department, Semester, Section, AcademicYear)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', insert_data)
-                
-                # Commit transaction
-                conn.commit()
-                print("\nSuccessfully inserted students into database")
-                
-                return jsonify({
-                    'message': 'Students uploaded successfully',
-                    'count': len(df)
-                })
-                
-            except Exception as e:
-                # Rollback transaction on error
-                conn.rollback()
-                print(f"\nError during database insertion: {str(e)}")
-                raise e
+            existing_usns = set(row['USN'] for row in cursor.fetchall())
+            if existing_usns:
+                return existing_usns, None
+            
+            # Insert new students
+            cursor.executemany(queries.INSERT_STUDENT, insert_data)
+            activity = ACTIVITY_LOG.record(
+                cursor, 'Students Uploaded',
+                f"{len(insert_data)} students added to {mapping['department']} {mapping['semester']} sem section {mapping['section']}"
+            )
+            return set(), activity
+        
+        existing_usns, activity = run_write(insert_students)
+        if existing_usns:
+            print(f"\nFound duplicate USNs: {existing_usns}")
+            return jsonify({
+                'error': 'Duplicate USNs found',
+                'duplicates': list(existing_usns)
+            }), 400
+        
+        print("\nSuccessfully inserted students into database")
+        if upload_token:
+            UPLOAD_STAGING.discard(upload_token)
+        announce_activity(activity)
+        publish_event('students_uploaded', {
+            'department': mapping['department'],
+            'semester': mapping['semester'],
+            'section': mapping['section'],
+            'academic_year': mapping['academic_year'],
+            'count': len(insert_data)
+        })
+        return jsonify({
+            'message': 'Students uploaded successfully',
+            'count': len(insert_data)
+        })
             
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         print(f"\nError in upload_students: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+def write_attendance_marks(cursor, summary_key, attendance_date, academic_year, marks, mode='insert'):
+    """
+    Write one class's (USN, present) marks for a date, keep its cached summary
+    current and record threshold-crossing alerts. Runs on the writer thread.
+    mode 'insert' fails on marks that already exist; 'edit' replaces them.
+    Returns the alerts raised.
+    """
+    subject_code, department, semester, section = summary_key
+    rows = [(usn, attendance_date, subject_code, present, department, semester, section, academic_year)
+            for usn, present in marks]
+
+    if mode == 'edit':
+        # Corrections replace marks in place, so the stream is recomputed rather than incremented
+        before = stream_counters(cursor, summary_key)
+        cursor.executemany(queries.UPSERT_ATTENDANCE, rows)
+        recompute_keys(cursor, [summary_key])
+        after = stream_counters(cursor, summary_key)
+        changes = [(usn, *before.get(usn, (0, 0)), *after[usn]) for usn, _ in marks]
+    else:
+        cursor.executemany(queries.INSERT_ATTENDANCE, rows)
+        changes = apply_marks(cursor, summary_key, attendance_date, marks)
+    return evaluate_changes(cursor, summary_key, attendance_date, changes,
+                            ATTENDANCE_THRESHOLD, ALERT_MIN_CLASSES)
+
+def notify_alerts(alerts):
+    # Call once the transaction that recorded the alerts has committed
+    if alerts:
+        print(f"Raised {len(alerts)} attendance alerts")
+        ALERT_NOTIFIER.notify(alerts)
+        publish_event('attendance_alerts', {'alerts': alerts})
+
 @app.route('/api/mark-attendance', methods=['POST'])
+@idempotent(IDEMPOTENCY_CACHE)
 def mark_attendance():
     try:
         data = request.json
@@ -552,6 +1002,14 @@ def mark_attendance():
         section = data['section']
         attendance_date = data['date']
         records = data['records']
+        # 'insert' (default) rejects an already marked class; 'edit' corrects it in place
+        mode = data.get('mode', 'insert')
+        if mode not in ('insert', 'edit'):
+            return jsonify({'error': "Mode must be 'insert' or 'edit'"}), 400
+
+        error = section_access_error(g.session, subject_code, department, semester, section)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
 
         # Enhanced debugging output
         print("\n=== ATTENDANCE MARKING DEBUG ===")
@@ -561,6 +1019,7 @@ def mark_attendance():
         print(f"Subject Code: {subject_code}")
         print(f"Section: {section}")
         print(f"Date: {attendance_date}")
+        print(f"Mode: {mode}")
         print(f"Number of records: {len(records)}")
         print("Sample records:", records[:2] if records else "No records")
 
@@ -569,46 +1028,13 @@ def mark_attendance():
             print("Error: Invalid or empty records")
             return jsonify({'error': 'Invalid or empty records'}), 400
 
-        # Check if attendance already exists for this section
+        # Duplicates are rejected by the UNIQUE(USN, Date, subject_code, section)
+        # constraint when inserting, so there is no separate existence check
         with get_db() as conn:
             cursor = conn.cursor()
-            
-            # Debug: Check existing attendance
-            cursor.execute('''
-                SELECT COUNT(*) as count
-                FROM attendance
-                WHERE department = ?
-                AND semester = ?
-                AND subject_code = ?
-                AND section = ?
-                AND Date = ?
-            ''', (department, semester, subject_code, section, attendance_date))
-            
-            existing_count = cursor.fetchone()['count']
-            print(f"Existing attendance records for this section: {existing_count}")
-            
-            if existing_count > 0:
-                print("Error: Attendance already exists for this section and date")
-                return jsonify({'error': 'Attendance already marked for this section and date'}), 400
 
             # Get academic year from section mapping
-            cursor.execute('''
-                SELECT academic_year
-                FROM section_mapping
-                WHERE department = ?
-                AND semester = ?
-                AND subject_code = ?
-                AND section = ?
-                AND academic_year = (
-                    SELECT MAX(academic_year)
-                    FROM section_mapping
-                    WHERE department = ?
-                    AND semester = ?
-                    AND subject_code = ?
-                    AND section = ?
-                )
-            ''', (department, semester, subject_code, section,
-                 department, semester, subject_code, section))
+            cursor.execute(queries.CLASS_SECTION_MAPPING, (department, semester, subject_code, section))
             
             result = cursor.fetchone()
             if not result:
@@ -616,6 +1042,7 @@ def mark_attendance():
                 return jsonify({'error': 'Section mapping not found. Please contact admin to map this section.'}), 400
             
             academic_year = result['academic_year']
+            subject_name = result['subject_name']
             print(f"Academic year from mapping: {academic_year}")
 
             # Validate each record and prepare data for insertion
@@ -648,8 +1075,7 @@ def mark_attendance():
 
             # First verify all USNs exist in students table
             usns = [record['USN'] for record in attendance_records]
-            placeholders = ','.join(['?' for _ in usns])
-            cursor.execute(f'SELECT USN FROM students WHERE USN IN ({placeholders})', usns)
+            cursor.execute(queries.EXISTING_USNS, (json_list(usns),))
             existing_usns = set(row['USN'] for row in cursor.fetchall())
             
             missing_usns = set(usns) - existing_usns
@@ -657,36 +1083,54 @@ def mark_attendance():
                 print(f"Error: Invalid USNs found: {missing_usns}")
                 return jsonify({'error': f'Invalid USNs: {", ".join(missing_usns)}'}), 400
 
-            try:
-                # Begin transaction
-                cursor.execute('BEGIN TRANSACTION')
-                
-                # Insert attendance records
-                cursor.executemany('''
-                    INSERT INTO attendance (USN, Date, subject_code, Present, department, semester, section, AcademicYear)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', [(r['USN'], r['Date'], r['subject_code'], r['Present'], 
-                      r['department'], r['semester'], r['section'], r['AcademicYear']) 
-                     for r in attendance_records])
-                
-                # Commit transaction
-                conn.commit()
-                print(f"Successfully inserted {len(attendance_records)} attendance records")
-                
-                return jsonify({
-                    'message': 'Attendance marked successfully',
-                    'records_processed': len(attendance_records)
-                })
-                
-            except Exception as e:
-                # Rollback transaction on error
-                conn.rollback()
-                print(f"Error during attendance insertion: {str(e)}")
-                raise e
+        summary_key = (subject_code, department, semester, section)
+        marks = [(r['USN'], r['Present']) for r in attendance_records]
+        present_count = sum(1 for r in attendance_records if r['Present'])
+        result = {
+            'message': 'Attendance updated successfully' if mode == 'edit' else 'Attendance marked successfully',
+            'mode': mode,
+            'records_processed': len(attendance_records)
+        }
+        # Committed with the marks, so a retry on any worker replays it
+        pending_response = IDEMPOTENCY_CACHE.pending(result)
+
+        def write_attendance(cursor):
+            IDEMPOTENCY_CACHE.save(cursor, pending_response)
+            alerts = write_attendance_marks(cursor, summary_key, attendance_date, academic_year, marks, mode)
+            activity = ACTIVITY_LOG.record(
+                cursor, 'Attendance Updated' if mode == 'edit' else 'Attendance Marked',
+                f"{subject_name} for {department} {semester} sem section {section} on {attendance_date}"
+            )
+            return activity, alerts
+        
+        # Write attendance records through the writer thread (grouped with concurrent submissions)
+        activity, alerts = run_write(write_attendance)
+        print(f"Successfully wrote {len(attendance_records)} attendance records ({mode})")
+        announce_activity(activity)
+        notify_alerts(alerts)
+        
+        publish_event('attendance_marked', {
+            'department': department,
+            'semester': semester,
+            'subject_code': subject_code,
+            'section': section,
+            'date': attendance_date,
+            'academic_year': academic_year,
+            'mode': mode,
+            'present': present_count,
+            'absent': len(attendance_records) - present_count
+        })
+        
+        return jsonify(result)
 
+    except Replay:
+        raise
+    except WriteQueueFull as e:
+        print(f"Write queue full: {str(e)}")
+        return jsonify({'error': str(e)}), 503
     except sqlite3.IntegrityError as e:
         print(f"Database integrity error: {str(e)}")
-        return jsonify({'error': 'Database integrity error. Possible duplicate entry.'}), 400
+        return jsonify({'error': 'Attendance already marked for this section and date. Use mode "edit" to correct it.'}), 400
     except Exception as e:
         print(f"Error marking attendance: {str(e)}")
         return jsonify({'error': 'Failed to mark attendance. Please try again.'}), 500
@@ -701,9 +1145,8 @@ def view_attendance():
     to_date = request.args.get('toDate')
 
     try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+        with get_report_db() as conn:
+            records = fetch_rows(conn, '''
                 SELECT a.USN, s.Name, a.Date, a.Present
                 FROM attendance a
                 JOIN students s ON a.USN = s.USN
@@ -714,13 +1157,11 @@ def view_attendance():
                 AND a.Date BETWEEN ? AND ?
                 ORDER BY a.Date, a.USN
             ''', (department, academic_year, semester, subject, from_date, to_date))
-            
-            records = [dict(row) for row in cursor.fetchall()]
 
         if not records:
             return jsonify({'message': 'No records found'}), 404
 
-        df = pd.DataFrame(records)
+        df = pd.DataFrame(records.rows, columns=records.columns)
         
         # Create pivot table
         pivot_df = pd.pivot_table(
@@ -802,23 +1243,20 @@ def get_students():
     
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+            students = stream_rows(conn, '''
                 SELECT * FROM students
                 WHERE LOWER(Department) = LOWER(?)
                 AND AcademicYear = ?
                 AND Semester = ?
             ''', (department, academic_year, semester))
             
-            students = [dict(row) for row in cursor.fetchall()]
-            
             if not students:
                 return jsonify({
                     'students': [],
                     'message': f'No students found for department: {department}, academic year: {academic_year}, semester: {semester}'
                 }), 404
             
-            return jsonify({'students': students})
+            return rows_response({'students': students})
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -831,16 +1269,13 @@ def get_faculty_reports_old():
     
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+            reports = fetch_rows(conn, '''
                 SELECT DISTINCT Subject, Semester, AcademicYear
                 FROM attendance
                 WHERE LOWER(Department) = LOWER(?)
                 ORDER BY Subject, Semester, AcademicYear
             ''', (department,))
-            
-            reports = [dict(row) for row in cursor.fetchall()]
-            return jsonify({'reports': reports})
+            return rows_response({'reports': reports})
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -849,11 +1284,10 @@ def get_faculty_reports_old():
 def debug_view_students():
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM students ORDER BY Department, USN')
-            students = [dict(row) for row in cursor.fetchall()]
-            return jsonify({
-                'total_students': len(students),
+            total = conn.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+            students = stream_rows(conn, 'SELECT * FROM students ORDER BY Department, USN')
+            return rows_response({
+                'total_students': total,
                 'students': students
             })
     except Exception as e:
@@ -863,16 +1297,14 @@ def debug_view_students():
 def debug_view_attendance():
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+            records = fetch_rows(conn, '''
                 SELECT a.*, s.Name 
                 FROM attendance a
                 JOIN students s ON a.USN = s.USN
                 ORDER BY a.Date DESC, a.Department, a.USN
                 LIMIT 100
             ''')
-            records = [dict(row) for row in cursor.fetchall()]
-            return jsonify({
+            return rows_response({
                 'total_records': len(records),
                 'latest_records': records
             })
@@ -893,7 +1325,7 @@ def manage_faculty():
 
         try:
             # Hash the password before storing
-            password_hash = hashlib.sha256(data['password'].encode()).hexdigest()
+            password_hash = get_password_pool().hash(data['password'])
             
             with get_db() as conn:
                 cursor = conn.cursor()
@@ -902,10 +1334,22 @@ def manage_faculty():
                     VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (data['faculty_id'], data['name'], data['email'], data['department'],
                      data['designation'], data['joining_date'], password_hash))
+                activity = ACTIVITY_LOG.record(
+                    cursor, 'Faculty Added', f"{data['name']} added to {data['department']}"
+                )
                 conn.commit()
+                announce_activity(activity)
+                publish_event('faculty_added', {
+                    'faculty_id': data['faculty_id'],
+                    'name': data['name'],
+                    'department': data['department'],
+                    'designation': data['designation']
+                })
                 return jsonify({'message': 'Faculty added successfully'})
         except sqlite3.IntegrityError as e:
             return jsonify({'error': 'Faculty ID or email already exists'}), 400
+        except HasherBusy as e:
+            return jsonify({'error': str(e)}), 503
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     else:
@@ -913,33 +1357,99 @@ def manage_faculty():
         try:
             with get_db() as conn:
                 cursor = conn.cursor()
+                # Every column but password_hash
+                query = '''
+                    SELECT id, faculty_id, name, email, department, designation, joining_date
+                    FROM faculty
+                '''
                 if department:
-                    cursor.execute('SELECT * FROM faculty WHERE department = ?', (department,))
+                    faculty = stream_rows(conn, query + ' WHERE department = ?', (department,))
                 else:
-                    cursor.execute('SELECT * FROM faculty')
-                faculty = [dict(row) for row in cursor.fetchall()]
+                    faculty = stream_rows(conn, query)
                 
                 # Get total count of faculty
                 cursor.execute('SELECT COUNT(*) as total FROM faculty')
                 total = cursor.fetchone()['total']
                 
-                return jsonify({
+                return rows_response({
                     'faculty': faculty,
                     'total': total
                 })
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+def bulk_import_file():
+    # The uploaded CSV and whether rows with errors are skipped instead of failing the import
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return None, False
+    return request.files['file'], request.args.get('skip_invalid') == '1'
+
+def invalid_rows(df, errors):
+    return df.index.isin([error['row'] for error in errors])
+
+@app.route('/api/faculty/bulk', methods=['POST'])
+def bulk_import_faculty():
+    file, skip_invalid = bulk_import_file()
+    if file is None:
+        return jsonify({'error': 'No file provided'}), 400
+
+    try:
+        df = read_csv_frame(file, FACULTY_COLUMNS)
+        errors = validate_faculty(df)
+        with get_db() as conn:
+            errors += check_faculty_conflicts(conn, df[~invalid_rows(df, errors)])
+        if errors and not skip_invalid:
+            return jsonify({'error': 'Validation failed', 'inserted': 0, 'errors': sort_errors(errors)}), 400
+        df = df[~invalid_rows(df, errors)]
+
+        # Hash every password across the hashing pool's workers before taking the write path
+        password_hashes = get_password_pool().hash_many(df['password'].tolist())
+
+        def insert_all(cursor):
+            # Re-check inside the transaction in case another import got there first
+            conflicts = check_faculty_conflicts(cursor.connection, df)
+            if conflicts:
+                return conflicts, None
+            count = insert_faculty(cursor, df, password_hashes)
+            return [], ACTIVITY_LOG.record(cursor, 'Faculty Imported', f"{count} faculty added")
+
+        conflicts, activity = run_write(insert_all) if len(df) else ([], None)
+        if conflicts:
+            return jsonify({'error': 'Validation failed', 'inserted': 0,
+                            'errors': sort_errors(errors + conflicts)}), 409
+        if activity:
+            announce_activity(activity)
+            publish_event('faculty_imported', {'count': len(df)})
+        return jsonify({
+            'message': f'{len(df)} faculty imported',
+            'inserted': len(df),
+            'errors': sort_errors(errors)
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except (HasherBusy, WriteQueueFull) as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error in bulk_import_faculty: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/faculty/<faculty_id>', methods=['PUT', 'DELETE'])
 def manage_single_faculty(faculty_id):
     if request.method == 'DELETE':
         try:
             with get_db() as conn:
                 cursor = conn.cursor()
-                cursor.execute('DELETE FROM faculty WHERE faculty_id = ?', (faculty_id,))
-                if cursor.rowcount == 0:
+                cursor.execute('SELECT name, department FROM faculty WHERE faculty_id = ?', (faculty_id,))
+                faculty = cursor.fetchone()
+                if not faculty:
                     return jsonify({'error': 'Faculty not found'}), 404
+                cursor.execute('DELETE FROM faculty WHERE faculty_id = ?', (faculty_id,))
+                activity = ACTIVITY_LOG.record(
+                    cursor, 'Faculty Removed', f"{faculty['name']} removed from {faculty['department']}"
+                )
                 conn.commit()
+                announce_activity(activity)
+                publish_event('faculty_deleted', {'faculty_id': faculty_id})
                 return jsonify({'message': 'Faculty deleted successfully'})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -972,7 +1482,15 @@ def manage_single_faculty(faculty_id):
                 if cursor.rowcount == 0:
                     return jsonify({'error': 'Faculty not found'}), 404
                 
+                activity = ACTIVITY_LOG.record(
+                    cursor, 'Faculty Updated',
+                    f"{faculty_id} updated ({', '.join(field.split(' ')[0] for field in update_fields)})"
+                )
                 conn.commit()
+                announce_activity(activity)
+                updated = {field: data[field] for field in ['name', 'email', 'department', 'designation'] if field in data}
+                updated['faculty_id'] = faculty_id
+                publish_event('faculty_updated', updated)
                 return jsonify({'message': 'Faculty updated successfully'})
         except sqlite3.IntegrityError as e:
             return jsonify({'error': 'Email already exists'}), 400
@@ -991,22 +1509,35 @@ def manage_section_mapping():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
 
-        try:
-            with get_db() as conn:
-                cursor = conn.cursor()
-                # First verify faculty exists
-                cursor.execute('SELECT id FROM faculty WHERE faculty_id = ?', (data['faculty_id'],))
-                if not cursor.fetchone():
-                    return jsonify({'error': 'Faculty not found'}), 404
+        def insert_mapping(cursor):
+            # First verify faculty exists
+            cursor.execute('SELECT name FROM faculty WHERE faculty_id = ?', (data['faculty_id'],))
+            faculty = cursor.fetchone()
+            if not faculty:
+                return None
 
-                cursor.execute('''
-                    INSERT INTO section_mapping 
-                    (faculty_id, department, semester, section, subject_code, subject_name, academic_year)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (data['faculty_id'], data['department'], data['semester'],
-                     data['section'], data['subject_code'], data['subject_name'], data['academic_year']))
-                conn.commit()
-                return jsonify({'message': 'Section mapping added successfully'})
+            cursor.execute('''
+                INSERT INTO section_mapping 
+                (faculty_id, department, semester, section, subject_code, subject_name, academic_year)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (data['faculty_id'], data['department'], data['semester'],
+                 data['section'], data['subject_code'], data['subject_name'], data['academic_year']))
+            return ACTIVITY_LOG.record(
+                cursor, 'Subject Mapped',
+                f"{faculty['name']} mapped to {data['subject_name']} ({data['department']} {data['semester']} sem)"
+            )
+
+        try:
+            activity = run_write(insert_mapping)
+            if not activity:
+                return jsonify({'error': 'Faculty not found'}), 404
+            announce_activity(activity)
+            publish_event('section_mapping_added', {
+                field: data[field] for field in required_fields
+            })
+            return jsonify({'message': 'Section mapping added successfully'})
+        except WriteQueueFull as e:
+            return jsonify({'error': str(e)}), 503
         except sqlite3.IntegrityError as e:
             return jsonify({'error': 'Section mapping already exists'}), 400
         except Exception as e:
@@ -1018,7 +1549,6 @@ def manage_section_mapping():
         
         try:
             with get_db() as conn:
-                cursor = conn.cursor()
                 query = '''
                     SELECT sm.*, f.name as faculty_name
                     FROM section_mapping sm
@@ -1037,21 +1567,76 @@ def manage_section_mapping():
                     query += ' AND sm.semester = ?'
                     params.append(semester)
                 
-                cursor.execute(query, params)
-                mappings = [dict(row) for row in cursor.fetchall()]
-                return jsonify({'section_mappings': mappings})
+                mappings = stream_rows(conn, query, params)
+                return rows_response({'section_mappings': mappings})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/section-mapping/bulk', methods=['POST'])
+def bulk_import_section_mappings():
+    file, skip_invalid = bulk_import_file()
+    if file is None:
+        return jsonify({'error': 'No file provided'}), 400
+
+    try:
+        df = read_csv_frame(file, MAPPING_COLUMNS)
+        errors = validate_mappings(df)
+        if errors and not skip_invalid:
+            return jsonify({'error': 'Validation failed', 'inserted': 0, 'errors': sort_errors(errors)}), 400
+
+        def insert_all(cursor):
+            # Faculty existence and uniqueness are checked set-wise in the same transaction as the insert
+            valid = df[~invalid_rows(df, errors)]
+            conflicts = check_mapping_conflicts(cursor.connection, valid)
+            if conflicts and not skip_invalid:
+                return conflicts, 0, None
+            valid = valid[~invalid_rows(valid, conflicts)]
+            if valid.empty:
+                return conflicts, 0, None
+            count = insert_mappings(cursor, valid)
+            return conflicts, count, ACTIVITY_LOG.record(cursor, 'Subjects Mapped', f"{count} section mappings added")
+
+        conflicts, count, activity = run_write(insert_all)
+        errors = sort_errors(errors + conflicts)
+        if conflicts and not skip_invalid:
+            return jsonify({'error': 'Validation failed', 'inserted': 0, 'errors': errors}), 400
+        if activity:
+            announce_activity(activity)
+            publish_event('section_mappings_imported', {'count': count})
+        return jsonify({
+            'message': f'{count} section mappings imported',
+            'inserted': count,
+            'errors': errors
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error in bulk_import_section_mappings: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/section-mapping/<int:mapping_id>', methods=['DELETE'])
 def delete_section_mapping(mapping_id):
     try:
         with get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute('DELETE FROM section_mapping WHERE id = ?', (mapping_id,))
-            if cursor.rowcount == 0:
+            cursor.execute('''
+                SELECT subject_name, department, semester, section
+                FROM section_mapping
+                WHERE id = ?
+            ''', (mapping_id,))
+            mapping = cursor.fetchone()
+            if not mapping:
                 return jsonify({'error': 'Section mapping not found'}), 404
+            cursor.execute('DELETE FROM section_mapping WHERE id = ?', (mapping_id,))
+            activity = ACTIVITY_LOG.record(
+                cursor, 'Mapping Removed',
+                f"{mapping['subject_name']} unmapped from {mapping['department']} {mapping['semester']} sem section {mapping['section']}"
+            )
             conn.commit()
+            announce_activity(activity)
+            publish_event('section_mapping_deleted', {'id': mapping_id})
             return jsonify({'message': 'Section mapping deleted successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1068,62 +1653,104 @@ def faculty_login():
     try:
         with get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM faculty WHERE faculty_id = ?', (faculty_id,))
+            cursor.execute(queries.FACULTY_BY_ID, (faculty_id,))
             faculty = cursor.fetchone()
             
-            if faculty:
-                # Verify password
-                password_hash = hashlib.sha256(password.encode()).hexdigest()
-                if password_hash == faculty['password_hash']:
-                    return jsonify({
-                        'message': 'Login successful',
-                        'faculty': {
-                            'faculty_id': faculty['faculty_id'],
-                            'name': faculty['name'],
-                            'email': faculty['email'],
-                            'department': faculty['department'],
-                            'designation': faculty['designation']
-                        }
-                    })
-                else:
-                    return jsonify({'error': 'Invalid password'}), 401
+        if faculty:
+            # Verify password in the hashing pool, with the connection already closed
+            pool = get_password_pool()
+            stored_hash = faculty['password_hash']
+            if pool.verify(password, stored_hash):
+                # Transparently migrate legacy/outdated hashes on successful login
+                if pool.needs_rehash(stored_hash):
+                    new_hash = pool.hash(password)
+                    upgrade_password_hash(faculty_id, stored_hash, new_hash)
+                    pool.remember(password, new_hash)
+                
+                # Cache the faculty's sections in the token so authorization needs no queries
+                with get_db() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT DISTINCT subject_code, department, semester, section
+                        FROM section_mapping
+                        WHERE faculty_id = ?
+                    ''', (faculty_id,))
+                    scope = [tuple(row) for row in cursor.fetchall()]
+                token, claims = SESSION_TOKENS.issue(faculty['faculty_id'], scope)
+                return jsonify({
+                    'message': 'Login successful',
+                    'token': token,
+                    'expires_at': claims['exp'],
+                    'faculty': {
+                        'faculty_id': faculty['faculty_id'],
+                        'name': faculty['name'],
+                        'email': faculty['email'],
+                        'department': faculty['department'],
+                        'designation': faculty['designation']
+                    }
+                })
             else:
-                return jsonify({'error': 'Invalid faculty ID'}), 401
+                return jsonify({'error': 'Invalid password'}), 401
+        else:
+            return jsonify({'error': 'Invalid faculty ID'}), 401
+    except HasherBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/auth/logout', methods=['POST'])
+def logout():
+    if g.session is None:
+        return jsonify({'error': 'Authentication required'}), 401
+    if not SESSION_TOKENS.revoke(g.session):
+        print(f"Revocation list full ({SESSION_TOKENS.max_revoked} live entries); logout of {g.session['sub']} refused")
+        return jsonify({'error': 'Too many revoked sessions, please try again later'}), 503
+    return jsonify({'message': 'Logged out successfully'})
+
+def upgrade_password_hash(faculty_id, old_hash, new_hash):
+    # Only replace the hash that was verified, in case the password changed meanwhile
+    def replace_hash(cursor):
+        cursor.execute('''
+            UPDATE faculty SET password_hash = ?
+            WHERE faculty_id = ? AND password_hash = ?
+        ''', (new_hash, faculty_id, old_hash))
+        return cursor.rowcount
+    try:
+        if run_write(replace_hash):
+            print(f"Upgraded password hash for faculty {faculty_id}")
+    except Exception as e:
+        print(f"Error upgrading password hash for faculty {faculty_id}: {str(e)}")
+
 @app.route('/api/faculty/<faculty_id>/subjects', methods=['GET'])
 def get_faculty_subjects(faculty_id):
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT DISTINCT
-                    sm.subject_code as code,
-                    sm.subject_name as name,
-                    sm.semester,
-                    sm.department,
-                    sm.section
-                FROM section_mapping sm
-                WHERE sm.faculty_id = ?
-                AND sm.academic_year = (
-                    SELECT MAX(academic_year) 
-                    FROM section_mapping 
-                    WHERE faculty_id = ?
+            # subject_id (the row's position) is for the frontend
+            subjects = fetch_rows(conn, '''
+                SELECT *, CAST(ROW_NUMBER() OVER () AS TEXT) as subject_id
+                FROM (
+                    SELECT DISTINCT
+                        sm.subject_code as code,
+                        sm.subject_name as name,
+                        sm.semester,
+                        sm.department,
+                        sm.section
+                    FROM section_mapping sm
+                    WHERE sm.faculty_id = ?
+                    AND sm.academic_year = (
+                        SELECT MAX(academic_year) 
+                        FROM section_mapping 
+                        WHERE faculty_id = ?
+                    )
                 )
             ''', (faculty_id, faculty_id))
             
-            subjects = [dict(row) for row in cursor.fetchall()]
-            
-            # Add subject_id for frontend
-            for i, subject in enumerate(subjects):
-                subject['subject_id'] = str(i + 1)
-            
-            return jsonify({'subjects': subjects})
+            return rows_response({'subjects': subjects})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/faculty/<faculty_id>/reports', methods=['GET'])
+@coalesced(REPORT_FLIGHT, finish=query_budget_response)
 def get_faculty_reports(faculty_id):
     try:
         subject_filter = request.args.get('subject', 'all')
@@ -1172,33 +1799,30 @@ def get_faculty_reports(faculty_id):
                 if stats_row:
                     stats = dict(stats_row)
                     
-                    # Get student-wise attendance details
-                    cursor.execute('''
+                    # Get student-wise attendance details from the cached summaries
+                    student_details = fetch_rows(conn, '''
                         SELECT 
                             s.USN,
                             s.Name,
-                            COUNT(DISTINCT a.Date) as classes_attended,
-                            (SELECT COUNT(DISTINCT Date) FROM attendance 
-                             WHERE subject_code = ? AND department = ? AND semester = ?) as total_classes,
-                            ROUND(CAST(COUNT(CASE WHEN a.Present = 1 THEN 1 END) AS FLOAT) / 
-                                  CAST(COUNT(DISTINCT a.Date) AS FLOAT) * 100, 2) as attendance_percentage
+                            COALESCE(SUM(sm.classes_held), 0) as classes_attended,
+                            ? as total_classes,
+                            ROUND(CAST(SUM(sm.classes_attended) AS FLOAT) / 
+                                  CAST(SUM(sm.classes_held) AS FLOAT) * 100, 2) as attendance_percentage
                         FROM students s
-                        LEFT JOIN attendance a ON s.USN = a.USN 
-                            AND a.subject_code = ? 
-                            AND a.department = ? 
-                            AND a.semester = ?
+                        LEFT JOIN attendance_summary sm ON s.USN = sm.USN 
+                            AND sm.subject_code = ? 
+                            AND sm.department = ? 
+                            AND sm.semester = ?
                         WHERE s.department = ?
                             AND s.semester = ?
                         GROUP BY s.USN, s.Name
                         ORDER BY s.USN
                     ''', (
-                        subject_data['subject_code'], subject_data['department'], subject_data['semester'],
+                        stats['total_classes'] or 0,
                         subject_data['subject_code'], subject_data['department'], subject_data['semester'],
                         subject_data['department'], subject_data['semester']
                     ))
                     
-                    student_details = [dict(row) for row in cursor.fetchall()]
-                    
                     # Get dates when attendance was marked
                     cursor.execute('''
                         SELECT DISTINCT Date
@@ -1223,37 +1847,155 @@ def get_faculty_reports(faculty_id):
                         'attendance_dates': dates
                     })
             
-            return jsonify({'reports': reports})
+            return rows_response({'reports': reports})
     except Exception as e:
         print(f"Error in get_faculty_reports: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def fetch_faculty_sections(conn, faculty_id):
+    return {'sections': fetch_rows(conn, '''
+        SELECT 
+            sm.id,
+            sm.subject_code,
+            sm.subject_name,
+            sm.section,
+            sm.department,
+            sm.semester
+        FROM section_mapping sm
+        WHERE sm.faculty_id = ?
+        AND sm.academic_year = (
+            SELECT MAX(academic_year) 
+            FROM section_mapping 
+            WHERE faculty_id = ?
+        )
+        ORDER BY sm.subject_code, sm.section
+    ''', (faculty_id, faculty_id))}
+
 @app.route('/api/faculty/<faculty_id>/sections', methods=['GET'])
 def get_faculty_sections(faculty_id):
+    try:
+        with get_db() as conn:
+            return rows_response(fetch_faculty_sections(conn, faculty_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def compact_json(payload):
+    # Minified JSON; compression is negotiated by compress_response
+    return Response(json.dumps(payload, separators=(',', ':')), mimetype='application/json')
+
+def rows_response(payload, status=200):
+    """
+    Minified JSON of a payload holding Rows or RowStreams, encoded straight from
+    their tuples: keyed records by default, columns + value arrays with
+    ?shape=arrays. RowStreams are read here, so call it before the connection closes.
+    """
+    shape = request.args.get('shape', 'records')
+    if shape not in ROW_SHAPES:
+        return jsonify({'error': f"Shape must be one of: {', '.join(ROW_SHAPES)}"}), 400
+    return Response(encode_json(payload, shape), status=status, mimetype='application/json')
+
+@app.route('/api/faculty/<faculty_id>/sync', methods=['GET', 'POST'])
+def faculty_sync(faculty_id):
+    """
+    Offline sync for attendance clients.
+    GET ?since=<seq> returns roster/attendance deltas after seq (a full snapshot for seq 0).
+    POST uploads batches marked offline; each batch carries the seq it was based on,
+    and marks the server changed after that seq are conflicts (server wins by default).
+    """
+    if request.method == 'GET':
+        since = request.args.get('since', '0')
+        if not since.isdigit():
+            return jsonify({'error': 'since must be a sequence number'}), 400
+        try:
+            with get_db() as conn:
+                sections = fetch_faculty_sections(conn, faculty_id)['sections'].records()
+                payload = pull_changes(conn, sections, int(since), SYNC_ATTENDANCE_DAYS)
+            print(f"Sync pull for {faculty_id} since {since}: {len(payload['students']['rows'])} students, "
+                  f"{len(payload['attendance']['rows'])} attendance rows (full: {payload['full']})")
+            return compact_json(payload)
+        except Exception as e:
+            print(f"Error in sync pull: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('batches'), list):
+        return jsonify({'error': 'batches are required'}), 400
+    on_conflict = data.get('on_conflict', 'server_wins')
+    if on_conflict not in ('server_wins', 'client_wins'):
+        return jsonify({'error': "on_conflict must be 'server_wins' or 'client_wins'"}), 400
+
+    batches = []
+    for batch in data['batches']:
+        if not isinstance(batch, dict):
+            return jsonify({'error': 'Each batch must be an object'}), 400
+        missing = [field for field in ['subject_code', 'department', 'semester', 'section', 'date', 'base_seq', 'records']
+                   if field not in batch]
+        if missing:
+            return jsonify({'error': f"Missing required field in batch: {', '.join(missing)}"}), 400
+        if not isinstance(batch['records'], list) or not isinstance(batch['base_seq'], int):
+            return jsonify({'error': 'records must be a list and base_seq a number'}), 400
+        if not all(isinstance(r, dict) for r in batch['records']):
+            return jsonify({'error': 'Each record must be an object'}), 400
+        batches.append({
+            'key': (batch['subject_code'], batch['department'], str(batch['semester']), batch['section']),
+            'date': batch['date'],
+            'base_seq': batch['base_seq'],
+            'marks': [(r['USN'], 1 if r.get('present') else 0) for r in batch['records'] if 'USN' in r]
+        })
+
     try:
         with get_db() as conn:
             cursor = conn.cursor()
+            sections = fetch_faculty_sections(conn, faculty_id)['sections'].records()
+            assigned = {(s['subject_code'], s['department'], str(s['semester']), s['section']) for s in sections}
+            unassigned = [batch['key'] for batch in batches if batch['key'] not in assigned]
+            if unassigned:
+                return jsonify({'error': f"Sections not assigned to {faculty_id}: {unassigned}"}), 403
             cursor.execute('''
-                SELECT 
-                    sm.id,
-                    sm.subject_code,
-                    sm.subject_name,
-                    sm.section,
-                    sm.department,
-                    sm.semester
-                FROM section_mapping sm
-                WHERE sm.faculty_id = ?
-                AND sm.academic_year = (
-                    SELECT MAX(academic_year) 
-                    FROM section_mapping 
-                    WHERE faculty_id = ?
-                )
-                ORDER BY sm.subject_code, sm.section
-            ''', (faculty_id, faculty_id))
-            
-            sections = [dict(row) for row in cursor.fetchall()]
-            return jsonify({'sections': sections})
+                SELECT MAX(academic_year) AS academic_year FROM section_mapping WHERE faculty_id = ?
+            ''', (faculty_id,))
+            academic_year = cursor.fetchone()['academic_year']
+            usns = sorted({usn for batch in batches for usn, _ in batch['marks']})
+            cursor.execute(queries.EXISTING_USNS, (json_list(usns),))
+            missing_usns = set(usns) - {row['USN'] for row in cursor.fetchall()}
+            if missing_usns:
+                return jsonify({'error': f'Invalid USNs: {", ".join(sorted(missing_usns))}'}), 400
+
+        def apply_offline_batches(cursor):
+            results, alerts = [], []
+            for batch in batches:
+                server = attendance_changes(cursor, batch['key'], batch['base_seq'])
+                accepted, conflicts = [], []
+                for usn, present in batch['marks']:
+                    row_key = f"{usn}|{batch['date']}"
+                    if on_conflict == 'server_wins' and row_key in server and server[row_key] != present:
+                        conflicts.append({'USN': usn, 'client': present, 'server': server[row_key]})
+                    else:
+                        accepted.append((usn, present))
+                if accepted:
+                    alerts.extend(write_attendance_marks(cursor, batch['key'], batch['date'], academic_year,
+                                                         accepted, mode='edit'))
+                subject_code, department, semester, section = batch['key']
+                results.append({
+                    'subject_code': subject_code, 'department': department, 'semester': semester,
+                    'section': section, 'date': batch['date'],
+                    'accepted': len(accepted), 'conflicts': conflicts
+                })
+            activity = ACTIVITY_LOG.record(
+                cursor, 'Attendance Synced',
+                f"{sum(r['accepted'] for r in results)} offline attendance records from faculty {faculty_id}"
+            )
+            return results, alerts, activity, current_seq(cursor)
+
+        results, alerts, activity, seq = run_write(apply_offline_batches)
+        announce_activity(activity)
+        notify_alerts(alerts)
+        publish_event('attendance_synced', {'faculty_id': faculty_id, 'batches': len(results)})
+        return jsonify({'seq': seq, 'results': results})
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
+        print(f"Error in sync push: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/faculty/<faculty_id>/attendance-report', methods=['GET'])
@@ -1264,9 +2006,12 @@ def get_attendance_report(faculty_id):
     section = request.args.get('section')
     from_date = request.args.get('fromDate')
     to_date = request.args.get('toDate')
+    report_format = request.args.get('format', 'full')
     
     if not all([subject, department, semester, section, from_date, to_date]):
         return jsonify({'error': 'Missing required parameters'}), 400
+    if report_format not in REPORT_FORMATS:
+        return jsonify({'error': f"Format must be one of: {', '.join(REPORT_FORMATS)}"}), 400
     
     try:
         with get_db() as conn:
@@ -1292,66 +2037,46 @@ def get_attendance_report(faculty_id):
                     'message': 'No attendance records found for the selected date range'
                 })
             
-            # Get student attendance records with detailed attendance status for each date
+            # Held/attended in the range are differences of two running totals per student
+            counts = range_counts(conn, subject, department, semester, from_date, to_date)
+            
+            # Per-date marks for the grid
             cursor.execute('''
-                WITH StudentAttendance AS (
-                    SELECT 
-                        s.USN,
-                        s.Name,
-                        COUNT(CASE WHEN a.Present = 1 THEN 1 END) as classes_attended,
-                        COUNT(DISTINCT a.Date) as total_classes,
-                        ROUND(CAST(COUNT(CASE WHEN a.Present = 1 THEN 1 END) AS FLOAT) / 
-                              CAST(COUNT(DISTINCT a.Date) AS FLOAT) * 100, 2) as attendance_percentage
-                    FROM students s
-                    LEFT JOIN attendance a ON s.USN = a.USN 
-                        AND a.subject_code = ?
-                        AND a.department = ?
-                        AND a.semester = ?
-                        AND a.Date BETWEEN ? AND ?
-                    WHERE s.department = ?
-                        AND s.semester = ?
-                    GROUP BY s.USN, s.Name
-                )
-                SELECT 
-                    sa.*,
-                    GROUP_CONCAT(
-                        a.Date || ':' || CASE WHEN a.Present = 1 THEN '1' ELSE '0' END
-                    ) as attendance_dates
-                FROM StudentAttendance sa
-                LEFT JOIN attendance a ON sa.USN = a.USN 
-                    AND a.subject_code = ?
-                    AND a.department = ?
-                    AND a.semester = ?
-                    AND a.Date BETWEEN ? AND ?
-                GROUP BY sa.USN, sa.Name
-                ORDER BY sa.USN
-            ''', (
-                subject, department, semester, from_date, to_date,
-                department, semester,
-                subject, department, semester, from_date, to_date
-            ))
+                SELECT USN, Date, Present
+                FROM attendance
+                WHERE subject_code = ?
+                AND department = ?
+                AND semester = ?
+                AND Date BETWEEN ? AND ?
+            ''', (subject, department, semester, from_date, to_date))
+            marks = {}
+            for row in cursor.fetchall():
+                marks.setdefault(row['USN'], {})[row['Date']] = row['Present'] == 1
+            
+            cursor.execute('''
+                SELECT USN, Name
+                FROM students
+                WHERE department = ?
+                    AND semester = ?
+                ORDER BY USN
+            ''', (department, semester))
             
             records = []
             for row in cursor.fetchall():
-                attendance_dates = {}
-                if row['attendance_dates']:
-                    for date_status in row['attendance_dates'].split(','):
-                        if ':' in date_status:
-                            date, status = date_status.split(':')
-                            attendance_dates[date] = status == '1'
-                
-                records.append({
+                held, attended = counts.get(row['USN'], (0, 0))
+                records.append(encode_marks({
                     'USN': row['USN'],
                     'Name': row['Name'],
-                    'dates': attendance_dates,
-                    'classesAttended': row['classes_attended'],
-                    'totalClasses': row['total_classes'],
-                    'attendancePercentage': row['attendance_percentage']
-                })
+                    'dates': marks.get(row['USN'], {}),
+                    'classesAttended': attended,
+                    'totalClasses': held,
+                    'attendancePercentage': round(attended / held * 100, 2) if held else None
+                }, 'dates', dates, report_format))
             
             return jsonify({
                 'records': records,
-                'dates': dates
+                'dates': dates,
+                'format': report_format
             })
             
     except Exception as e:
@@ -1359,6 +2084,7 @@ def get_attendance_report(faculty_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/attendance-report', methods=['GET'])
+@coalesced(REPORT_FLIGHT, finish=query_budget_response)
 def get_admin_attendance_report():
     try:
         department = request.args.get('department')
@@ -1367,6 +2093,7 @@ def get_admin_attendance_report():
         subject = request.args.get('subject')
         from_date = request.args.get('fromDate')
         to_date = request.args.get('toDate')
+        report_format = request.args.get('format', 'full')
 
         print(f"\nDebug - Received parameters:")
         print(f"Department: {department}")
@@ -1379,20 +2106,20 @@ def get_admin_attendance_report():
         if not all([department, academic_year, semester, subject, from_date, to_date]):
             print("Missing required parameters")
             return jsonify({'error': 'Missing required parameters'}), 400
+        if report_format not in REPORT_FORMATS:
+            return jsonify({'error': f"Format must be one of: {', '.join(REPORT_FORMATS)}"}), 400
 
-        with get_db() as conn:
+        with get_report_db() as conn:
             cursor = conn.cursor()
 
             # Get all students in the department and semester
             print("\nFetching students...")
-            cursor.execute('''
+            students = fetch_rows(conn, '''
                 SELECT USN, Name
                 FROM students
                 WHERE department = ? AND semester = ?
                 ORDER BY USN
             ''', (department, semester))
-            
-            students = [dict(row) for row in cursor.fetchall()]
             print(f"Found {len(students)} students")
 
             if not students:
@@ -1418,64 +2145,50 @@ def get_admin_attendance_report():
 
             if not dates:
                 print("No attendance records found for the given date range")
-                return jsonify({
+                return rows_response({
                     'students': students,
                     'dates': [],
                     'message': 'No attendance records found for the selected date range'
                 })
 
-            # For each student, get their attendance records
-            print("\nProcessing attendance records for each student...")
+            # Fetch every student's marks in one pass instead of two queries per student
+            print("\nProcessing attendance records...")
+            cursor.execute('''
+                SELECT a.USN, a.Date, a.Present
+                FROM attendance a
+                JOIN students s ON s.USN = a.USN
+                WHERE s.department = ? AND s.semester = ?
+                AND a.subject_code = ?
+                AND a.Date BETWEEN ? AND ?
+            ''', (department, semester, subject, from_date, to_date))
+            
+            marks_by_usn = {}
+            for usn, marked_date, present in cursor.fetchall():
+                marks_by_usn.setdefault(usn, {})[marked_date] = bool(present)
+            
             processed_students = []
-            for student in students:
-                # Get total classes and attended classes
-                cursor.execute('''
-                    SELECT 
-                        COUNT(DISTINCT Date) as total_classes,
-                        COUNT(CASE WHEN Present = 1 THEN 1 END) as classes_attended
-                    FROM attendance
-                    WHERE USN = ?
-                    AND subject_code = ?
-                    AND Date BETWEEN ? AND ?
-                ''', (student['USN'], subject, from_date, to_date))
-                
-                attendance_stats = dict(cursor.fetchone())
-
-                # Get date-wise attendance
-                cursor.execute('''
-                    SELECT Date, Present
-                    FROM attendance
-                    WHERE USN = ?
-                    AND subject_code = ?
-                    AND Date BETWEEN ? AND ?
-                ''', (student['USN'], subject, from_date, to_date))
-                
-                attendance_records = cursor.fetchall()
-                
-                # Calculate attendance percentage
-                total = attendance_stats['total_classes'] or 0
-                attended = attendance_stats['classes_attended'] or 0
+            for usn, name in students:
+                marks = marks_by_usn.get(usn, {})
+                total = len(marks)
+                attended = sum(1 for present in marks.values() if present)
                 
                 # Create processed student record with camelCase keys
-                processed_student = {
-                    'usn': student['USN'],
-                    'name': student['Name'],
+                processed_students.append(encode_marks({
+                    'usn': usn,
+                    'name': name,
                     'totalClasses': total,
                     'classesAttended': attended,
                     'attendancePercentage': round((attended / total * 100), 2) if total > 0 else 0,
-                    'attendance': {
-                        record['Date']: bool(record['Present'])
-                        for record in attendance_records
-                    }
-                }
-                processed_students.append(processed_student)
+                    'attendance': marks
+                }, 'attendance', dates, report_format))
 
             print("\nSending response:")
             print(f"Total students: {len(processed_students)}")
             print(f"Total dates: {len(dates)}")
             return jsonify({
                 'students': processed_students,
-                'dates': dates
+                'dates': dates,
+                'format': report_format
             })
 
     except Exception as e:
@@ -1484,6 +2197,118 @@ def get_admin_attendance_report():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/roster-rollover', methods=['POST'])
+def roster_rollover():
+    data = request.get_json(silent=True) or {}
+    from_academic_year = data.get('from_academic_year')
+    to_academic_year = data.get('to_academic_year')
+    sections = data.get('sections') or {}
+    
+    if not from_academic_year or not to_academic_year:
+        return jsonify({'error': 'from_academic_year and to_academic_year are required'}), 400
+    if not isinstance(sections, dict) or not all(isinstance(v, str) and v for v in sections.values()):
+        return jsonify({'error': 'sections must map old section names to new ones'}), 400
+    try:
+        final_semester = int(data.get('final_semester', 8))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'final_semester must be a number'}), 400
+    promote = data.get('promote', True)
+    if not isinstance(promote, bool):
+        return jsonify({'error': 'promote must be true or false'}), 400
+    
+    try:
+        def rollover(cursor):
+            result = rollover_roster(
+                cursor, from_academic_year, to_academic_year,
+                department=data.get('department'), semester=data.get('semester'),
+                promote=promote, final_semester=final_semester,
+                sections=sections
+            )
+            activity = ACTIVITY_LOG.record(
+                cursor, 'Roster Rolled Over',
+                f"{result['moved']} students moved from {from_academic_year} to {to_academic_year}, "
+                f"{result['graduated']} graduated"
+            )
+            return result, activity
+        
+        result, activity = run_write(rollover)
+        print(f"Roster rollover {result['id']}: {result}")
+        announce_activity(activity)
+        publish_event('roster_rolled_over', result)
+        return jsonify(result)
+    except WriteQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error in roster_rollover: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/shortage-report', methods=['GET'])
+def get_shortage_report():
+    try:
+        threshold = float(request.args.get('threshold', ATTENDANCE_THRESHOLD))
+    except ValueError:
+        return jsonify({'error': 'Threshold must be a number'}), 400
+
+    if not 0 <= threshold <= 100:
+        return jsonify({'error': 'Threshold must be between 0 and 100'}), 400
+
+    filters = {
+        'academic_year': request.args.get('academicYear'),
+        'department': request.args.get('department'),
+        'semester': request.args.get('semester'),
+        'section': request.args.get('section')
+    }
+
+    try:
+        with get_report_db() as conn:
+            report = compute_shortage_report(conn, threshold, filters)
+        print(f"Shortage report: {report['shortage_count']} of {report['students_evaluated']} students below {threshold}%")
+        return jsonify(report)
+    except Exception as e:
+        print(f"Error in get_shortage_report: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    filters = {
+        'department': request.args.get('department'),
+        'semester': request.args.get('semester'),
+        'section': request.args.get('section'),
+        'subject_code': request.args.get('subject_code'),
+        'USN': request.args.get('usn'),
+        'alert_type': request.args.get('type')
+    }
+    since_id = request.args.get('since_id', '0')
+    limit = request.args.get('limit', '100')
+    if not since_id.isdigit() or not limit.isdigit():
+        return jsonify({'error': 'since_id and limit must be numbers'}), 400
+
+    try:
+        with get_db() as conn:
+            alerts = list_alerts(conn, filters, int(since_id), min(int(limit), 1000))
+        return jsonify({'alerts': alerts})
+    except Exception as e:
+        print(f"Error in get_alerts: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/analytics-export', methods=['POST'])
+def run_analytics_export():
+    data = request.get_json(silent=True) or {}
+    file_format = data.get('format', 'parquet').lower()
+
+    try:
+        summary = export_attendance(report_database(), ANALYTICS_EXPORT_DIR, file_format)
+        print(f"Analytics export completed: {summary}")
+        return jsonify({
+            'message': 'Analytics export completed',
+            'summary': summary
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in run_analytics_export: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/attendance/report/download', methods=['POST', 'OPTIONS'])
 def download_attendance_report():
     if request.method == 'OPTIONS':
@@ -1513,138 +2338,19 @@ def download_attendance_report():
 
         # Get attendance data from database
         with get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Get all dates between start_date and end_date
-            cursor.execute('''
-                SELECT DISTINCT Date 
-                FROM attendance 
-                WHERE subject_code = ? 
-                AND department = ? 
-                AND semester = ? 
-                AND section = ?
-                AND Date BETWEEN ? AND ?
-                ORDER BY Date
-            ''', (subject, department, semester, section, start_date, end_date))
-            
-            dates = [row['Date'] for row in cursor.fetchall()]
+            dates, df = section_report_frame(conn, (subject, department, semester, section), start_date, end_date)
             
             if not dates:
                 return jsonify({'error': 'No attendance records found for the selected period'}), 404
             
-            # Get student attendance records
-            cursor.execute('''
-                SELECT s.USN, s.Name, 
-                       GROUP_CONCAT(CASE WHEN a.Present = 1 THEN 'P' ELSE 'A' END) as attendance_string,
-                       SUM(CASE WHEN a.Present = 1 THEN 1 ELSE 0 END) as classes_attended,
-                       COUNT(a.Present) as total_classes
-                FROM students s
-                LEFT JOIN attendance a ON s.USN = a.USN 
-                    AND a.Date BETWEEN ? AND ?
-                    AND a.subject_code = ?
-                    AND a.department = ?
-                    AND a.semester = ?
-                    AND a.section = ?
-                WHERE s.department = ?
-                    AND s.semester = ?
-                    AND s.section = ?
-                GROUP BY s.USN, s.Name
-                ORDER BY s.USN
-            ''', (start_date, end_date, subject, department, semester, section,
-                  department, semester, section))
-            
-            records = cursor.fetchall()
-            
-            if not records:
+            if df.empty:
                 return jsonify({'error': 'No students found in the selected section'}), 404
-            
-            # Create DataFrame for export
-            df_data = []
-            for record in records:
-                attendance_list = record['attendance_string'].split(',') if record['attendance_string'] else []
-                student_data = {
-                    'USN': record['USN'],
-                    'Name': record['Name']
-                }
-                
-                # Add attendance for each date
-                for i, date in enumerate(dates):
-                    student_data[date] = attendance_list[i] if i < len(attendance_list) else '-'
-                
-                # Add summary columns
-                student_data['Total Classes'] = record['total_classes']
-                student_data['Classes Attended'] = record['classes_attended']
-                student_data['Attendance %'] = round((record['classes_attended'] / record['total_classes'] * 100), 2) if record['total_classes'] > 0 else 0
-                
-                df_data.append(student_data)
-            
-            df = pd.DataFrame(df_data)
 
         # Prepare the file
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        if file_format == 'csv':
-            # Handle CSV format
-            output = io.BytesIO()
-            df.to_csv(output, index=False, encoding='utf-8')
-            output.seek(0)
-            
-            filename = f'attendance_report_{subject}_{section}_{timestamp}.csv'
-            mimetype = 'text/csv'
-        else:
-            # Handle Excel format
-            output = io.BytesIO()
-            
-            # Create Excel writer with xlsxwriter engine
-            workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-            worksheet = workbook.add_worksheet('Attendance Report')
-            
-            # Define formats
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'align': 'center',
-                'bg_color': '#D9D9D9',
-                'border': 1
-            })
-            
-            present_format = workbook.add_format({
-                'bg_color': '#C6EFCE',
-                'align': 'center'
-            })
-            
-            absent_format = workbook.add_format({
-                'bg_color': '#FFC7CE',
-                'align': 'center'
-            })
-            
-            # Write headers
-            for col_num, column in enumerate(df.columns):
-                worksheet.write(0, col_num, column, header_format)
-                worksheet.set_column(col_num, col_num, 15)
-            
-            # Write data
-            for row_num, row in enumerate(df.values, 1):
-                for col_num, value in enumerate(row):
-                    if col_num >= 2 and col_num < len(dates) + 2:  # Only format attendance columns
-                        if value == 'P':
-                            worksheet.write(row_num, col_num, value, present_format)
-                        elif value == 'A':
-                            worksheet.write(row_num, col_num, value, absent_format)
-                        else:
-                            worksheet.write(row_num, col_num, value)
-                    else:
-                        worksheet.write(row_num, col_num, value)
-            
-            # Close workbook
-            workbook.close()
-            
-            # Prepare file for sending
-            output.seek(0)
-            
-            filename = f'attendance_report_{subject}_{section}_{timestamp}.xlsx'
-            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        content, extension, mimetype = render_report(df, dates, file_format)
+        output = io.BytesIO(content)
+        filename = f'attendance_report_{subject}_{section}_{timestamp}.{extension}'
         
         # Send file with proper MIME type and filename
         response = send_file(
@@ -1667,263 +2373,296 @@ def download_attendance_report():
         traceback.print_exc()  # Print full traceback for debugging
         return jsonify({'error': f'Failed to generate report download: {str(e)}'}), 500
 
+@app.route('/api/admin/report-bundles', methods=['POST'])
+def start_report_bundle():
+    data = request.get_json(silent=True) or {}
+    start_date = data.get('start_date')
+    end_date = data.get('end_date')
+    file_format = data.get('format', 'csv').lower()
+    
+    if not start_date or not end_date:
+        return jsonify({'error': 'start_date and end_date are required'}), 400
+    
+    try:
+        # Every mapped section, optionally narrowed down
+        query = '''
+            SELECT DISTINCT subject_code, department, semester, section
+            FROM section_mapping
+            WHERE 1=1
+        '''
+        params = []
+        for field, column in [('academicYear', 'academic_year'), ('department', 'department'),
+                              ('semester', 'semester'), ('subject', 'subject_code')]:
+            if data.get(field):
+                query += f' AND {column} = ?'
+                params.append(data[field])
+        
+        db_path = report_database()
+        with get_db() as conn:
+            sections = [tuple(row) for row in conn.execute(query + ' ORDER BY 1, 2, 3, 4', params).fetchall()]
+            if not sections:
+                return jsonify({'error': 'No sections match the selected filters'}), 404
+        
+        status = REPORT_BUNDLES.start(db_path, sections, start_date, end_date, file_format)
+        print(f"Report bundle {status['job_id']} started for {len(sections)} sections")
+        return jsonify(status), 202
+    except BundleBusy as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error in start_report_bundle: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/report-bundles/<job_id>', methods=['GET'])
+def get_report_bundle(job_id):
+    try:
+        status = REPORT_BUNDLES.status(job_id)
+        if status is None:
+            return jsonify({'error': 'Report bundle not found'}), 404
+        return jsonify(status)
+    except Exception as e:
+        print(f"Error in get_report_bundle: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/report-bundles/<job_id>/download', methods=['GET'])
+def download_report_bundle(job_id):
+    archive_path = REPORT_BUNDLES.archive_path(job_id)
+    if archive_path is None:
+        return jsonify({'error': 'Report bundle not found or not finished'}), 404
+    return send_file(
+        os.path.abspath(archive_path),
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f'attendance_reports_{job_id}.zip'
+    )
+
+def fetch_monthly_attendance_stats(conn):
+    cursor = conn.cursor()
+    # Get total classes for the current month
+    cursor.execute('''
+        SELECT COUNT(DISTINCT Date || subject_code || department || semester || section) as total_classes
+        FROM attendance
+        WHERE strftime('%Y-%m', Date) = strftime('%Y-%m', 'now')
+    ''')
+    result = cursor.fetchone()
+    return {
+        'total_classes': result['total_classes'] if result else 0
+    }
+
 @app.route('/api/attendance/stats/monthly', methods=['GET'])
 def get_monthly_attendance_stats():
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            # Get total classes for the current month
-            cursor.execute('''
-                SELECT COUNT(DISTINCT Date || subject_code || department || semester || section) as total_classes
-                FROM attendance
-                WHERE strftime('%Y-%m', Date) = strftime('%Y-%m', 'now')
-            ''')
-            result = cursor.fetchone()
-            return jsonify({
-                'total_classes': result['total_classes'] if result else 0
-            })
+            return jsonify(fetch_monthly_attendance_stats(conn))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def fetch_weekly_reports_stats(conn):
+    cursor = conn.cursor()
+    # Get total reports generated in the last 7 days
+    cursor.execute('''
+        SELECT COUNT(*) as total_reports
+        FROM (
+            SELECT DISTINCT Date, subject_code, department, semester, section
+            FROM attendance
+            WHERE Date >= date('now', '-7 days')
+            GROUP BY Date, subject_code, department, semester, section
+        )
+    ''')
+    result = cursor.fetchone()
+    return {
+        'total_reports': result['total_reports'] if result else 0
+    }
+
 @app.route('/api/reports/stats/weekly', methods=['GET'])
 def get_weekly_reports_stats():
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            # Get total reports generated in the last 7 days
-            cursor.execute('''
-                SELECT COUNT(*) as total_reports
-                FROM (
-                    SELECT DISTINCT Date, subject_code, department, semester, section
-                    FROM attendance
-                    WHERE Date >= date('now', '-7 days')
-                    GROUP BY Date, subject_code, department, semester, section
-                )
-            ''')
-            result = cursor.fetchone()
-            return jsonify({
-                'total_reports': result['total_reports'] if result else 0
-            })
+            return jsonify(fetch_weekly_reports_stats(conn))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def fetch_all_subjects(conn):
+    cursor = conn.cursor()
+    # Get total unique subjects from section mappings
+    cursor.execute('''
+        SELECT COUNT(DISTINCT subject_code) as total_subjects
+        FROM section_mapping
+        WHERE academic_year = (
+            SELECT MAX(academic_year)
+            FROM section_mapping
+        )
+    ''')
+    result = cursor.fetchone()
+    return {
+        'total': result['total_subjects'] if result else 0,
+        'subjects': list(DEPARTMENT_SUBJECTS.values())
+    }
+
 @app.route('/api/subjects/all', methods=['GET'])
 def get_all_subjects():
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            # Get total unique subjects from section mappings
-            cursor.execute('''
-                SELECT COUNT(DISTINCT subject_code) as total_subjects
-                FROM section_mapping
-                WHERE academic_year = (
-                    SELECT MAX(academic_year)
-                    FROM section_mapping
-                )
-            ''')
-            result = cursor.fetchone()
-            return jsonify({
-                'total': result['total_subjects'] if result else 0,
-                'subjects': list(DEPARTMENT_SUBJECTS.values())
-            })
+            return jsonify(fetch_all_subjects(conn))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def fetch_recent_activities(conn, limit=5):
+    return {'activities': ACTIVITY_LOG.recent(conn, limit)}
+
 @app.route('/api/activities/recent', methods=['GET'])
 def get_recent_activities():
+    try:
+        limit = int(request.args.get('limit', 5))
+    except ValueError:
+        return jsonify({'error': 'Limit must be a number'}), 400
+
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Get recent faculty additions
-            cursor.execute('''
-                SELECT 
-                    'Faculty Added' as type,
-                    name || ' added to ' || department as description,
-                    datetime(joining_date) as timestamp
-                FROM faculty
-                ORDER BY joining_date DESC
-                LIMIT 3
-            ''')
-            faculty_activities = [dict(row) for row in cursor.fetchall()]
-            
-            # Get recent attendance markings
-            cursor.execute('''
-                SELECT DISTINCT
-                    'Attendance Marked' as type,
-                    sm.subject_name || ' for ' || a.department || ' ' || a.semester || ' sem' as description,
-                    datetime(a.Date) as timestamp
-                FROM attendance a
-                JOIN section_mapping sm ON 
-                    a.subject_code = sm.subject_code 
-                    AND a.department = sm.department 
-                    AND a.semester = sm.semester
-                ORDER BY a.Date DESC
-                LIMIT 3
-            ''')
-            attendance_activities = [dict(row) for row in cursor.fetchall()]
-            
-            # Get recent section mappings
-            cursor.execute('''
-                SELECT 
-                    'Subject Mapped' as type,
-                    f.name || ' mapped to ' || sm.subject_name || ' (' || sm.department || ' ' || sm.semester || ' sem)' as description,
-                    datetime('now', '-' || sm.id || ' minutes') as timestamp
-                FROM section_mapping sm
-                JOIN faculty f ON sm.faculty_id = f.faculty_id
-                ORDER BY sm.id DESC
-                LIMIT 3
-            ''')
-            mapping_activities = [dict(row) for row in cursor.fetchall()]
-            
-            # Combine all activities and sort by timestamp
-            all_activities = faculty_activities + attendance_activities + mapping_activities
-            sorted_activities = sorted(all_activities, key=lambda x: x['timestamp'], reverse=True)
-            
-            return jsonify({
-                'activities': sorted_activities[:5]  # Return only the 5 most recent activities
-            })
+            return jsonify(fetch_recent_activities(conn, limit))
     except Exception as e:
         print(f"Error in get_recent_activities: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def fetch_faculty_dashboard_stats(conn, faculty_id):
+    cursor = conn.cursor()
+
+    # Get faculty details
+    print("Getting faculty details...")
+    cursor.execute('''
+        SELECT name, department
+        FROM faculty
+        WHERE faculty_id = ?
+    ''', (faculty_id,))
+    faculty = cursor.fetchone()
+    if not faculty:
+        print(f"Faculty not found: {faculty_id}")
+        return None
+
+    print(f"Found faculty: {dict(faculty)}")
+
+    # Get total subjects for current academic year
+    print("Getting total subjects...")
+    cursor.execute('''
+        SELECT COUNT(DISTINCT subject_code) as total_subjects
+        FROM section_mapping
+        WHERE faculty_id = ?
+        AND academic_year = (
+            SELECT MAX(academic_year) FROM section_mapping
+        )
+    ''', (faculty_id,))
+    total_subjects = cursor.fetchone()['total_subjects']
+    print(f"Total subjects: {total_subjects}")
+
+    # Get today's classes
+    today = datetime.now().strftime('%Y-%m-%d')
+    print(f"Getting today's classes for {today}...")
+    todays_classes = fetch_rows(conn, '''
+        SELECT sm.subject_name, sm.department, sm.semester, sm.section,
+            CASE 
+                WHEN EXISTS (
+                    SELECT 1 FROM attendance a
+                    WHERE a.subject_code = sm.subject_code 
+                    AND a.department = sm.department
+                    AND a.semester = sm.semester
+                    AND a.section = sm.section
+                    AND a.Date = ?
+                ) THEN 'Completed'
+                ELSE 'Pending'
+            END as status
+        FROM section_mapping sm
+        WHERE sm.faculty_id = ?
+        AND sm.academic_year = (
+            SELECT MAX(academic_year) FROM section_mapping
+        )
+    ''', (today, faculty_id))
+    print(f"Today's classes: {todays_classes}")
+
+    # Get attendance marked stats (default to 0 if no records)
+    print("Getting attendance stats...")
+    cursor.execute('''
+        SELECT 
+            COUNT(DISTINCT a.Date || a.subject_code || a.department || a.semester || a.section) as total,
+            COUNT(DISTINCT CASE WHEN a.Date = ? THEN a.Date || a.subject_code || a.department || a.semester || a.section END) as today
+        FROM attendance a
+        JOIN section_mapping sm ON 
+            a.subject_code = sm.subject_code 
+            AND a.department = sm.department
+            AND a.semester = sm.semester
+            AND a.section = sm.section
+        WHERE sm.faculty_id = ?
+        AND strftime('%Y-%m', a.Date) = strftime('%Y-%m', 'now')
+    ''', (today, faculty_id))
+    result = cursor.fetchone()
+    attendance_marked = {'total': result['total'], 'today': result['today']} if result else {'total': 0, 'today': 0}
+    print(f"Attendance stats: {attendance_marked}")
+
+    # Get subject-wise attendance percentage (default to empty list if no records)
+    print("Getting subject-wise attendance...")
+    subject_attendance = fetch_rows(conn, '''
+        WITH SubjectAttendance AS (
+            SELECT 
+                s.subject_code,
+                SUM(s.classes_attended) * 100.0 / SUM(s.classes_held) as attendance_percentage
+            FROM attendance_summary s
+            JOIN section_mapping sm ON 
+                s.subject_code = sm.subject_code 
+                AND s.department = sm.department
+                AND s.semester = sm.semester
+                AND s.section = sm.section
+            WHERE sm.faculty_id = ?
+            GROUP BY s.subject_code
+        )
+        SELECT subject_code as subject, ROUND(attendance_percentage, 1) as attendance
+        FROM SubjectAttendance
+    ''', (faculty_id,))
+    print(f"Subject attendance: {subject_attendance}")
+
+    # Get recent classes with attendance stats (default to empty list if no records)
+    print("Getting recent classes...")
+    recent_classes = fetch_rows(conn, '''
+        WITH RecentClasses AS (
+            SELECT 
+                a.subject_code || ' - ' || a.department || a.semester || a.section as name,
+                a.Date,
+                COUNT(CASE WHEN a.Present = 1 THEN 1 END) as present,
+                COUNT(CASE WHEN a.Present = 0 THEN 1 END) as absent
+            FROM attendance a
+            JOIN section_mapping sm ON 
+                a.subject_code = sm.subject_code 
+                AND a.department = sm.department
+                AND a.semester = sm.semester
+                AND a.section = sm.section
+            WHERE sm.faculty_id = ?
+            GROUP BY a.subject_code, a.department, a.semester, a.section, a.Date
+            ORDER BY a.Date DESC
+            LIMIT 5
+        )
+        SELECT name, present, absent
+        FROM RecentClasses
+    ''', (faculty_id,))
+    print(f"Recent classes: {recent_classes}")
+
+    response_data = {
+        'faculty_name': faculty['name'],
+        'department': faculty['department'],
+        'total_subjects': total_subjects,
+        'todays_classes': todays_classes,
+        'attendance_marked': attendance_marked,
+        'subject_attendance': subject_attendance,
+        'recent_classes': recent_classes
+    }
+    print(f"Sending response: {response_data}")
+    return response_data
+
 @app.route('/api/faculty/<faculty_id>/dashboard', methods=['GET'])
 def get_faculty_dashboard_stats(faculty_id):
     try:
         print(f"\nFetching dashboard stats for faculty: {faculty_id}")
         with get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Get faculty details
-            print("Getting faculty details...")
-            cursor.execute('''
-                SELECT name, department
-                FROM faculty
-                WHERE faculty_id = ?
-            ''', (faculty_id,))
-            faculty = cursor.fetchone()
-            if not faculty:
-                print(f"Faculty not found: {faculty_id}")
-                return jsonify({'error': 'Faculty not found'}), 404
-            
-            print(f"Found faculty: {dict(faculty)}")
-            
-            # Get total subjects for current academic year
-            print("Getting total subjects...")
-            cursor.execute('''
-                SELECT COUNT(DISTINCT subject_code) as total_subjects
-                FROM section_mapping
-                WHERE faculty_id = ?
-                AND academic_year = (
-                    SELECT MAX(academic_year) FROM section_mapping
-                )
-            ''', (faculty_id,))
-            total_subjects = cursor.fetchone()['total_subjects']
-            print(f"Total subjects: {total_subjects}")
-            
-            # Get today's classes
-            today = datetime.now().strftime('%Y-%m-%d')
-            print(f"Getting today's classes for {today}...")
-            cursor.execute('''
-                SELECT sm.subject_name, sm.department, sm.semester, sm.section,
-                    CASE 
-                        WHEN EXISTS (
-                            SELECT 1 FROM attendance a
-                            WHERE a.subject_code = sm.subject_code 
-                            AND a.department = sm.department
-                            AND a.semester = sm.semester
-                            AND a.section = sm.section
-                            AND a.Date = ?
-                        ) THEN 'Completed'
-                        ELSE 'Pending'
-                    END as status
-                FROM section_mapping sm
-                WHERE sm.faculty_id = ?
-                AND sm.academic_year = (
-                    SELECT MAX(academic_year) FROM section_mapping
-                )
-            ''', (today, faculty_id))
-            todays_classes = [dict(row) for row in cursor.fetchall()]
-            print(f"Today's classes: {todays_classes}")
-            
-            # Get attendance marked stats (default to 0 if no records)
-            print("Getting attendance stats...")
-            cursor.execute('''
-                SELECT 
-                    COUNT(DISTINCT a.Date || a.subject_code || a.department || a.semester || a.section) as total,
-                    COUNT(DISTINCT CASE WHEN a.Date = ? THEN a.Date || a.subject_code || a.department || a.semester || a.section END) as today
-                FROM attendance a
-                JOIN section_mapping sm ON 
-                    a.subject_code = sm.subject_code 
-                    AND a.department = sm.department
-                    AND a.semester = sm.semester
-                    AND a.section = sm.section
-                WHERE sm.faculty_id = ?
-                AND strftime('%Y-%m', a.Date) = strftime('%Y-%m', 'now')
-            ''', (today, faculty_id))
-            result = cursor.fetchone()
-            attendance_marked = {'total': result['total'], 'today': result['today']} if result else {'total': 0, 'today': 0}
-            print(f"Attendance stats: {attendance_marked}")
-            
-            # Get subject-wise attendance percentage (default to empty list if no records)
-            print("Getting subject-wise attendance...")
-            cursor.execute('''
-                WITH SubjectAttendance AS (
-                    SELECT 
-                        a.subject_code,
-                        COUNT(CASE WHEN a.Present = 1 THEN 1 END) * 100.0 / COUNT(*) as attendance_percentage
-                    FROM attendance a
-                    JOIN section_mapping sm ON 
-                        a.subject_code = sm.subject_code 
-                        AND a.department = sm.department
-                        AND a.semester = sm.semester
-                        AND a.section = sm.section
-                    WHERE sm.faculty_id = ?
-                    GROUP BY a.subject_code
-                )
-                SELECT subject_code as subject, ROUND(attendance_percentage, 1) as attendance
-                FROM SubjectAttendance
-            ''', (faculty_id,))
-            subject_attendance = [dict(row) for row in cursor.fetchall()]
-            print(f"Subject attendance: {subject_attendance}")
-            
-            # Get recent classes with attendance stats (default to empty list if no records)
-            print("Getting recent classes...")
-            cursor.execute('''
-                WITH RecentClasses AS (
-                    SELECT 
-                        a.subject_code || ' - ' || a.department || a.semester || a.section as name,
-                        a.Date,
-                        COUNT(CASE WHEN a.Present = 1 THEN 1 END) as present,
-                        COUNT(CASE WHEN a.Present = 0 THEN 1 END) as absent
-                    FROM attendance a
-                    JOIN section_mapping sm ON 
-                        a.subject_code = sm.subject_code 
-                        AND a.department = sm.department
-                        AND a.semester = sm.semester
-                        AND a.section = sm.section
-                    WHERE sm.faculty_id = ?
-                    GROUP BY a.subject_code, a.department, a.semester, a.section, a.Date
-                    ORDER BY a.Date DESC
-                    LIMIT 5
-                )
-                SELECT name, present, absent
-                FROM RecentClasses
-            ''', (faculty_id,))
-            recent_classes = [dict(row) for row in cursor.fetchall()]
-            print(f"Recent classes: {recent_classes}")
-            
-            response_data = {
-                'faculty_name': faculty['name'],
-                'department': faculty['department'],
-                'total_subjects': total_subjects,
-                'todays_classes': todays_classes,
-                'attendance_marked': attendance_marked,
-                'subject_attendance': subject_attendance,
-                'recent_classes': recent_classes
-            }
-            print(f"Sending response: {response_data}")
-            return jsonify(response_data)
+            response_data = fetch_faculty_dashboard_stats(conn, faculty_id)
+        if response_data is None:
+            return jsonify({'error': 'Faculty not found'}), 404
+        return rows_response(response_data)
             
     except Exception as e:
         print(f"Error in get_faculty_dashboard_stats: {str(e)}")
@@ -1932,8 +2671,16 @@ def get_faculty_dashboard_stats(faculty_id):
         return jsonify({'error': 'Failed to fetch dashboard data'}), 500
 
 # Initialize database when the app starts
-init_db()
+# Spawned password hashing workers re-import the main script as __mp_main__;
+# they only hash passwords and must not set up the database
+if __name__ != '__mp_main__':
+    bootstrap()
 
 if __name__ == '__main__':
     verify_database()  # Verify database structure before starting the app
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server; use gunicorn (see gunicorn.conf.py) for production
+    app.run(
+        debug=os.environ.get('FLASK_DEBUG', '0') == '1',
+        port=int(os.environ.get('PORT', 5000)),
+        threaded=True
+    )
\ No newline at end of file
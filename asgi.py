@@ -0,0 +1,294 @@
+# ASGI entry point for high-concurrency serving, e.g.
+#   uvicorn asgi:application --workers 4 --limit-concurrency 4000
+#
+# Connections are owned by the event loop, so idle keep-alive/polling clients
+# don't pin a thread. Read-mostly dashboard endpoints are served natively: their
+# queries run on a bounded thread pool and many requests are in flight at once.
+# Every other route falls through to the Flask app, which runs on a second
+# bounded thread pool, so memory stays flat regardless of the connection count.
+# Server-sent events only reach clients of the worker that served the write, so
+# run --workers 1 when dashboards use /api/events/stream.
+import asyncio
+import io
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import api
+from events import KEEP_ALIVE_FRAME, RESYNC_FRAME, format_sse
+from rows import encode_json
+
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 8))
+ASYNC_WSGI_THREADS = int(os.environ.get('ASYNC_WSGI_THREADS', 16))
+
+_db_executor = ThreadPoolExecutor(max_workers=ASYNC_DB_THREADS, thread_name_prefix='async-db')
+_wsgi_executor = ThreadPoolExecutor(max_workers=ASYNC_WSGI_THREADS, thread_name_prefix='async-wsgi')
+
+
+def _query(fetch, *args):
+    with api.get_db() as conn:
+        return fetch(conn, *args)
+
+
+async def run_query(fetch, *args):
+    # Run a blocking sqlite3 fetch function on the bounded database pool
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, _query, fetch, *args)
+
+
+async def health_live(match, params):
+    return 200, {'status': 'ok', 'pid': os.getpid()}
+
+
+async def health_ready(match, params):
+    if not api.APP_READY:
+        return 503, {'status': 'starting'}
+    await run_query(lambda conn: conn.execute('SELECT 1').fetchone())
+    return 200, {'status': 'ready', 'pid': os.getpid()}
+
+
+async def departments(match, params):
+    return 200, list(api.DEPARTMENT_SUBJECTS.keys())
+
+
+async def monthly_stats(match, params):
+    return 200, await run_query(api.fetch_monthly_attendance_stats)
+
+
+async def weekly_stats(match, params):
+    return 200, await run_query(api.fetch_weekly_reports_stats)
+
+
+async def all_subjects(match, params):
+    return 200, await run_query(api.fetch_all_subjects)
+
+
+async def recent_activities(match, params):
+    limit = params.get('limit', ['5'])[0]
+    if not limit.isdigit():
+        return 400, {'error': 'Limit must be a number'}
+    return 200, await run_query(api.fetch_recent_activities, int(limit))
+
+
+async def faculty_sections(match, params):
+    return 200, await run_query(api.fetch_faculty_sections, match.group('faculty_id'))
+
+
+async def faculty_dashboard(match, params):
+    data = await run_query(api.fetch_faculty_dashboard_stats, match.group('faculty_id'))
+    if data is None:
+        return 404, {'error': 'Faculty not found'}
+    return 200, data
+
+
+# GET routes served natively by the event loop
+NATIVE_ROUTES = [
+    (re.compile(r'^/api/health/live$'), health_live),
+    (re.compile(r'^/api/health/ready$'), health_ready),
+    (re.compile(r'^/api/departments$'), departments),
+    (re.compile(r'^/api/attendance/stats/monthly$'), monthly_stats),
+    (re.compile(r'^/api/reports/stats/weekly$'), weekly_stats),
+    (re.compile(r'^/api/subjects/all$'), all_subjects),
+    (re.compile(r'^/api/activities/recent$'), recent_activities),
+    (re.compile(r'^/api/faculty/(?P<faculty_id>[^/]+)/sections$'), faculty_sections),
+    (re.compile(r'^/api/faculty/(?P<faculty_id>[^/]+)/dashboard$'), faculty_dashboard),
+]
+
+
+async def event_stream(scope, receive, send):
+    """
+    Native SSE stream: each subscriber costs a mailbox and a coroutine, not a thread.
+    The event bus wakes the coroutine from the publishing thread via a listener.
+    """
+    params = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    headers = dict(scope.get('headers', []))
+    topics = [t for t in params.get('topics', [''])[0].split(',') if t]
+    last_event_id = headers.get(b'last-event-id', b'').decode() or params.get('lastEventId', [''])[0]
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else None
+
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+    subscription = api.EVENT_BUS.subscribe(topics or None, last_event_id)
+    subscription.listeners.append(lambda: loop.call_soon_threadsafe(wakeup.set))
+    if last_event_id is not None:
+        wakeup.set()
+
+    # Consume the (empty) request body; the next receive() only completes on disconnect
+    await read_body(receive)
+    disconnected = asyncio.ensure_future(receive())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                (b'access-control-allow-origin', b'*'),
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+        while not disconnected.done():
+            waiter = asyncio.ensure_future(wakeup.wait())
+            await asyncio.wait({waiter, disconnected}, timeout=api.SSE_HEARTBEAT,
+                               return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            wakeup.clear()
+
+            frames = []
+            if subscription.overflowed:
+                subscription.overflowed = False
+                frames.append(RESYNC_FRAME)
+            event = subscription.get_nowait()
+            while event is not None:
+                frames.append(format_sse(event))
+                event = subscription.get_nowait()
+            if not frames:
+                frames.append(KEEP_ALIVE_FRAME)
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': ''.join(frames).encode(), 'more_body': True})
+    finally:
+        api.EVENT_BUS.unsubscribe(subscription)
+        disconnected.cancel()
+
+
+def authorize(scope, match):
+    # Same token checks as the Flask before_request hook, for natively served routes
+    authorization = dict(scope.get('headers', [])).get(b'authorization', b'').decode('latin-1')
+    try:
+        session = api.session_from_header(authorization)
+    except api.TokenError as e:
+        return str(e), 401
+    if 'faculty_id' in match.groupdict():
+        return api.faculty_access_error(session, match.group('faculty_id'))
+    return None
+
+
+async def send_json(send, status, payload):
+    # Rows in the payload (faculty sections, dashboard lists) are encoded from their tuples
+    body = encode_json(payload)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*'),
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+
+def build_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            key = 'CONTENT_TYPE'
+        elif name == 'CONTENT_LENGTH':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = f'HTTP_{name}'
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def run_wsgi(environ):
+    # Runs on the WSGI pool: call the Flask app and buffer its response
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    result = api.app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], body
+
+
+async def call_wsgi(scope, receive, send):
+    body = await read_body(receive)
+    loop = asyncio.get_running_loop()
+    status, headers, content = await loop.run_in_executor(_wsgi_executor, run_wsgi, build_environ(scope, body))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _db_executor.shutdown(wait=False)
+            _wsgi_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    if scope['method'] == 'GET' and scope['path'] == '/api/events/stream':
+        await event_stream(scope, receive, send)
+        return
+
+    if scope['method'] == 'GET':
+        for pattern, handler in NATIVE_ROUTES:
+            match = pattern.match(scope['path'])
+            if match:
+                params = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+                error = authorize(scope, match)
+                if error:
+                    await send_json(send, error[1], {'error': error[0]})
+                    return
+                try:
+                    status, payload = await handler(match, params)
+                except Exception as e:
+                    print(f"Error in {handler.__name__}: {str(e)}")
+                    status, payload = 500, {'error': str(e)}
+                await send_json(send, status, payload)
+                return
+
+    await call_wsgi(scope, receive, send)
@@ -0,0 +1,121 @@
+import sqlite3
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Columns identifying one class stream: a subject taught to one section
+SECTION_KEY = ['subject_code', 'department', 'semester', 'section', 'AcademicYear']
+
+
+def load_attendance_frame(conn: sqlite3.Connection, filters: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Load the attendance history needed for institution-wide aggregation in a single query.
+    filters may contain academic_year, department, semester and section.
+    """
+    filters = filters or {}
+    return pd.read_sql_query('''
+        SELECT USN, subject_code, department, semester, section, AcademicYear, Date, Present
+        FROM attendance
+        WHERE (? IS NULL OR AcademicYear = ?)
+        AND (? IS NULL OR LOWER(department) = LOWER(?))
+        AND (? IS NULL OR semester = ?)
+        AND (? IS NULL OR section = ?)
+    ''', conn, params=(
+        filters.get('academic_year'), filters.get('academic_year'),
+        filters.get('department'), filters.get('department'),
+        filters.get('semester'), filters.get('semester'),
+        filters.get('section'), filters.get('section'),
+    ))
+
+
+def compute_student_percentages(attendance: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute per-student, per-subject attendance percentages in one vectorized pass.
+
+    Classes held is the number of distinct dates attendance was taken for the
+    student's section, so a missing record counts as an absence.
+    """
+    columns = SECTION_KEY + ['USN', 'classes_held', 'classes_attended', 'attendance_percentage']
+    if attendance.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Factorize the section key once and group on integer codes instead of strings
+    section_codes, sections = pd.factorize(pd.MultiIndex.from_frame(attendance[SECTION_KEY]))
+    date_codes = pd.factorize(attendance['Date'])[0]
+
+    # Classes held per section: number of distinct (section, date) pairs
+    held_pairs = np.unique(section_codes.astype(np.int64) * (date_codes.max() + 1) + date_codes)
+    classes_held = np.bincount(held_pairs // (date_codes.max() + 1), minlength=len(sections))
+
+    # Attended / marked counts per (section, student)
+    student_codes, students = pd.factorize(attendance['USN'])
+    pair_codes, pairs = pd.factorize(
+        pd.MultiIndex.from_arrays([section_codes, student_codes])
+    )
+    present = attendance['Present'].astype(bool).to_numpy()
+    attended = np.bincount(pair_codes, weights=present, minlength=len(pairs)).astype(np.int64)
+
+    pair_sections = pairs.get_level_values(0).to_numpy()
+    pair_students = pairs.get_level_values(1).to_numpy()
+    held = classes_held[pair_sections]
+
+    result = pd.DataFrame(list(sections[pair_sections]), columns=SECTION_KEY)
+    result['USN'] = students[pair_students]
+    result['classes_held'] = held
+    result['classes_attended'] = attended
+    result['attendance_percentage'] = np.round(attended / np.maximum(held, 1) * 100, 2)
+    return result[columns]
+
+
+def compute_shortage_report(conn: sqlite3.Connection, threshold: float,
+                            filters: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Find every student below the attendance threshold in any subject.
+    Returns per-subject shortage rows and a per-student summary.
+    """
+    percentages = compute_student_percentages(load_attendance_frame(conn, filters))
+    if percentages.empty:
+        return {
+            'threshold': threshold,
+            'students_evaluated': 0,
+            'shortage_count': 0,
+            'shortages': [],
+            'students': []
+        }
+
+    names = pd.read_sql_query('SELECT USN, Name FROM students', conn)
+    subjects = pd.read_sql_query('''
+        SELECT DISTINCT subject_code, department, semester, section, academic_year AS AcademicYear, subject_name
+        FROM section_mapping
+    ''', conn)
+    percentages = percentages.merge(names, on='USN', how='left')
+    percentages = percentages.merge(subjects, on=SECTION_KEY, how='left')
+    percentages['Name'] = percentages['Name'].fillna('')
+    percentages['subject_name'] = percentages['subject_name'].fillna(percentages['subject_code'])
+
+    shortages = percentages[percentages['attendance_percentage'] < threshold]
+    shortages = shortages.sort_values(['department', 'semester', 'section', 'USN', 'subject_code'])
+
+    # Per-student summary across all of their subjects
+    totals = percentages.groupby('USN', sort=True).agg(
+        Name=('Name', 'first'),
+        department=('department', 'first'),
+        semester=('semester', 'first'),
+        section=('section', 'first'),
+        classes_held=('classes_held', 'sum'),
+        classes_attended=('classes_attended', 'sum'),
+    )
+    totals['overall_percentage'] = np.round(
+        totals['classes_attended'] / totals['classes_held'].clip(lower=1) * 100, 2
+    )
+    totals['subjects_in_shortage'] = shortages.groupby('USN').size().reindex(totals.index, fill_value=0)
+    flagged = totals[totals['subjects_in_shortage'] > 0].reset_index()
+
+    return {
+        'threshold': threshold,
+        'students_evaluated': int(len(totals)),
+        'shortage_count': int(len(flagged)),
+        'shortages': shortages.to_dict('records'),
+        'students': flagged.to_dict('records')
+    }
@@ -0,0 +1,295 @@
+import argparse
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# A summary key identifies one class stream: (subject_code, department, semester, section)
+SummaryKey = Tuple[str, str, str, str]
+
+
+def create_summary_tables(cursor: sqlite3.Cursor) -> None:
+    """Create the cached per-student percentages and running totals."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_summary (
+            subject_code TEXT NOT NULL,
+            department TEXT NOT NULL,
+            semester TEXT NOT NULL,
+            section TEXT NOT NULL,
+            USN TEXT NOT NULL,
+            classes_held INTEGER NOT NULL,
+            classes_attended INTEGER NOT NULL,
+            attendance_percentage REAL NOT NULL,
+            PRIMARY KEY (subject_code, department, semester, section, USN)
+        )
+    ''')
+    # Running totals per student and marked day: any date range's counts are the
+    # difference of two rows, whatever the length of the range
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_prefix (
+            subject_code TEXT NOT NULL,
+            department TEXT NOT NULL,
+            semester TEXT NOT NULL,
+            section TEXT NOT NULL,
+            USN TEXT NOT NULL,
+            Date TEXT NOT NULL,
+            held_cum INTEGER NOT NULL,
+            attended_cum INTEGER NOT NULL,
+            PRIMARY KEY (subject_code, department, semester, section, USN, Date)
+        ) WITHOUT ROWID
+    ''')
+
+
+_PREFIX_SELECT = '''
+    SELECT
+        subject_code, department, semester, section, USN, Date,
+        COUNT(*) OVER running,
+        SUM(CASE WHEN Present = 1 THEN 1 ELSE 0 END) OVER running
+    FROM attendance
+    {where}
+    WINDOW running AS (
+        PARTITION BY subject_code, department, semester, section, USN
+        ORDER BY Date ROWS UNBOUNDED PRECEDING
+    )
+'''
+
+
+def rebuild_prefix(cursor: sqlite3.Cursor, key: Optional[SummaryKey] = None) -> None:
+    """Recompute the running totals of one class stream (or of all of them)."""
+    if key is None:
+        cursor.execute('DELETE FROM attendance_prefix')
+        cursor.execute('INSERT INTO attendance_prefix ' + _PREFIX_SELECT.format(where=''))
+        return
+    cursor.execute('''
+        DELETE FROM attendance_prefix
+        WHERE subject_code = ? AND department = ? AND semester = ? AND section = ?
+    ''', key)
+    cursor.execute('INSERT INTO attendance_prefix ' + _PREFIX_SELECT.format(
+        where='WHERE subject_code = ? AND department = ? AND semester = ? AND section = ?'
+    ), key)
+
+
+def recompute_keys(cursor: sqlite3.Cursor, keys: Iterable[SummaryKey]) -> int:
+    """
+    Recompute cached percentages and running totals for the given class streams
+    from raw attendance. Returns the number of streams recomputed.
+    """
+    count = 0
+    for key in keys:
+        rebuild_prefix(cursor, key)
+        cursor.execute('''
+            DELETE FROM attendance_summary
+            WHERE subject_code = ? AND department = ? AND semester = ? AND section = ?
+        ''', key)
+        cursor.execute('''
+            INSERT INTO attendance_summary
+            (subject_code, department, semester, section, USN, classes_held, classes_attended, attendance_percentage)
+            SELECT
+                subject_code, department, semester, section, USN,
+                COUNT(*),
+                COUNT(CASE WHEN Present = 1 THEN 1 END),
+                ROUND(CAST(COUNT(CASE WHEN Present = 1 THEN 1 END) AS FLOAT) / COUNT(*) * 100, 2)
+            FROM attendance
+            WHERE subject_code = ? AND department = ? AND semester = ? AND section = ?
+            GROUP BY USN
+        ''', key)
+        count += 1
+    return count
+
+
+def apply_marks(cursor: sqlite3.Cursor, key: SummaryKey, date: str,
+                marks: Iterable[Tuple[str, bool]]) -> List[Tuple[str, int, int, int, int]]:
+    """
+    Fold newly inserted (USN, present) marks of one class stream on date into
+    the cached counters and running totals, a few index lookups per mark.
+
+    Returns (USN, old_held, old_attended, new_held, new_attended) per mark.
+    The percentage is rounded by SQLite so it matches a full recomputation.
+    """
+    changes = []
+    for usn, present in marks:
+        cursor.execute('''
+            SELECT classes_held, classes_attended FROM attendance_summary
+            WHERE subject_code = ? AND department = ? AND semester = ? AND section = ? AND USN = ?
+        ''', (*key, usn))
+        row = cursor.fetchone()
+        held, attended = (row[0], row[1]) if row else (0, 0)
+        new_held, new_attended = held + 1, attended + (1 if present else 0)
+        cursor.execute('''
+            INSERT INTO attendance_summary
+            (subject_code, department, semester, section, USN, classes_held, classes_attended, attendance_percentage)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ROUND(CAST(? AS FLOAT) / ? * 100, 2))
+            ON CONFLICT (subject_code, department, semester, section, USN) DO UPDATE SET
+                classes_held = excluded.classes_held,
+                classes_attended = excluded.classes_attended,
+                attendance_percentage = excluded.attendance_percentage
+        ''', (*key, usn, new_held, new_attended, new_attended, new_held))
+        _insert_prefix(cursor, key, usn, date, 1 if present else 0)
+        changes.append((usn, held, attended, new_held, new_attended))
+    return changes
+
+
+def _insert_prefix(cursor: sqlite3.Cursor, key: SummaryKey, usn: str, date: str, present: int) -> None:
+    # Running totals up to the previous marked day, plus this mark
+    cursor.execute('''
+        SELECT held_cum, attended_cum FROM attendance_prefix
+        WHERE subject_code = ? AND department = ? AND semester = ? AND section = ? AND USN = ? AND Date < ?
+        ORDER BY Date DESC LIMIT 1
+    ''', (*key, usn, date))
+    row = cursor.fetchone()
+    held, attended = (row[0], row[1]) if row else (0, 0)
+    cursor.execute('''
+        INSERT INTO attendance_prefix
+        (subject_code, department, semester, section, USN, Date, held_cum, attended_cum)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (*key, usn, date, held + 1, attended + present))
+    # Only a backdated mark has later days to shift; marking the latest day touches none
+    cursor.execute('''
+        UPDATE attendance_prefix
+        SET held_cum = held_cum + 1, attended_cum = attended_cum + ?
+        WHERE subject_code = ? AND department = ? AND semester = ? AND section = ? AND USN = ? AND Date > ?
+    ''', (present, *key, usn, date))
+
+
+def range_counts(conn, subject_code: str, department: str, semester: str,
+                 from_date: str, to_date: str, section: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+    """
+    (classes_held, classes_attended) per USN between from_date and to_date
+    (inclusive) for a subject, summed over its sections (or one section).
+    Each student costs two running-total lookups, independent of the range length.
+    """
+    query = '''
+        SELECT
+            k.USN,
+            COALESCE(hi.held_cum, 0) - COALESCE(lo.held_cum, 0),
+            COALESCE(hi.attended_cum, 0) - COALESCE(lo.attended_cum, 0)
+        FROM attendance_summary k
+        LEFT JOIN attendance_prefix hi
+            ON hi.subject_code = k.subject_code AND hi.department = k.department
+            AND hi.semester = k.semester AND hi.section = k.section AND hi.USN = k.USN
+            AND hi.Date = (
+                SELECT MAX(Date) FROM attendance_prefix p
+                WHERE p.subject_code = k.subject_code AND p.department = k.department
+                AND p.semester = k.semester AND p.section = k.section AND p.USN = k.USN
+                AND p.Date <= ?
+            )
+        LEFT JOIN attendance_prefix lo
+            ON lo.subject_code = k.subject_code AND lo.department = k.department
+            AND lo.semester = k.semester AND lo.section = k.section AND lo.USN = k.USN
+            AND lo.Date = (
+                SELECT MAX(Date) FROM attendance_prefix p
+                WHERE p.subject_code = k.subject_code AND p.department = k.department
+                AND p.semester = k.semester AND p.section = k.section AND p.USN = k.USN
+                AND p.Date < ?
+            )
+        WHERE k.subject_code = ? AND k.department = ? AND k.semester = ?
+    '''
+    params = [to_date, from_date, subject_code, department, semester]
+    if section is not None:
+        query += ' AND k.section = ?'
+        params.append(section)
+    counts = {}
+    for usn, held, attended in conn.execute(query, params).fetchall():
+        total_held, total_attended = counts.get(usn, (0, 0))
+        counts[usn] = (total_held + held, total_attended + attended)
+    return counts
+
+
+def stream_counters(cursor: sqlite3.Cursor, key: SummaryKey) -> Dict[str, Tuple[int, int]]:
+    """Cached (classes_held, classes_attended) per USN for one class stream."""
+    cursor.execute('''
+        SELECT USN, classes_held, classes_attended FROM attendance_summary
+        WHERE subject_code = ? AND department = ? AND semester = ? AND section = ?
+    ''', key)
+    return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+
+def rebuild_all(cursor: sqlite3.Cursor) -> int:
+    """Drop the cache and recompute every class stream from raw attendance."""
+    rebuild_prefix(cursor)
+    cursor.execute('DELETE FROM attendance_summary')
+    cursor.execute('''
+        INSERT INTO attendance_summary
+        (subject_code, department, semester, section, USN, classes_held, classes_attended, attendance_percentage)
+        SELECT
+            subject_code, department, semester, section, USN,
+            COUNT(*),
+            COUNT(CASE WHEN Present = 1 THEN 1 END),
+            ROUND(CAST(COUNT(CASE WHEN Present = 1 THEN 1 END) AS FLOAT) / COUNT(*) * 100, 2)
+        FROM attendance
+        GROUP BY subject_code, department, semester, section, USN
+    ''')
+    cursor.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT DISTINCT subject_code, department, semester, section FROM attendance_summary
+        )
+    ''')
+    return cursor.fetchone()[0]
+
+
+def verify(conn) -> List[SummaryKey]:
+    """
+    Compare cached values and running totals against a fresh aggregate of raw
+    attendance. Returns the class streams whose cached rows differ.
+    """
+    rows = conn.execute('''
+        WITH fresh AS (
+            SELECT
+                subject_code, department, semester, section, USN,
+                COUNT(*) AS classes_held,
+                COUNT(CASE WHEN Present = 1 THEN 1 END) AS classes_attended,
+                ROUND(CAST(COUNT(CASE WHEN Present = 1 THEN 1 END) AS FLOAT) / COUNT(*) * 100, 2) AS attendance_percentage
+            FROM attendance
+            GROUP BY subject_code, department, semester, section, USN
+        ),
+        cached AS (
+            SELECT subject_code, department, semester, section, USN,
+                   classes_held, classes_attended, attendance_percentage
+            FROM attendance_summary
+        ),
+        diff AS (
+            SELECT * FROM (SELECT * FROM fresh EXCEPT SELECT * FROM cached)
+            UNION ALL
+            SELECT * FROM (SELECT * FROM cached EXCEPT SELECT * FROM fresh)
+        ),
+        fresh_prefix AS ({prefix}),
+        prefix_diff AS (
+            SELECT * FROM (SELECT * FROM fresh_prefix EXCEPT SELECT * FROM attendance_prefix)
+            UNION ALL
+            SELECT * FROM (SELECT * FROM attendance_prefix EXCEPT SELECT * FROM fresh_prefix)
+        )
+        SELECT DISTINCT d.subject_code, d.department, d.semester, d.section
+        FROM diff d
+        UNION
+        SELECT DISTINCT d.subject_code, d.department, d.semester, d.section
+        FROM prefix_diff d
+        ORDER BY 1, 2, 3, 4
+    '''.format(prefix=_PREFIX_SELECT.format(where=''))).fetchall()
+    return [tuple(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain cached attendance percentages')
+    parser.add_argument('command', choices=['rebuild', 'verify'])
+    parser.add_argument('--db', default='attendance.db', help='Path to the SQLite database')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        create_summary_tables(conn.cursor())
+        if args.command == 'rebuild':
+            count = rebuild_all(conn.cursor())
+            conn.commit()
+            print(f"Rebuilt summaries for {count} class streams")
+        else:
+            mismatched = verify(conn)
+            if mismatched:
+                print(f"{len(mismatched)} class streams differ from raw attendance:")
+                for key in mismatched:
+                    print("  " + " / ".join(key))
+                raise SystemExit(1)
+            print("Cached summaries match raw attendance")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
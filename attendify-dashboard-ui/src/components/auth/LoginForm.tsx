@@ -62,6 +62,8 @@ const LoginForm = () => {
         localStorage.setItem('faculty', JSON.stringify(data.faculty));
         // Store faculty ID separately for easy access
         localStorage.setItem('facultyId', data.faculty.faculty_id);
+        // Session token for authenticated API calls (cleared on logout)
+        localStorage.setItem('token', data.token);
 
         // Clear sensitive data
         setPassword("");
@@ -48,6 +48,7 @@ const ManageStudents = () => {
   const [uploadProgress, setUploadProgress] = useState(0);
   const [previewData, setPreviewData] = useState<Student[]>([]);
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
+  const [uploadToken, setUploadToken] = useState<string | null>(null);
   const [dragActive, setDragActive] = useState(false);
   const [validationErrors, setValidationErrors] = useState<string[]>([]);
   const [sectionMappings, setSectionMappings] = useState<SectionMapping[]>([]);
@@ -125,6 +126,7 @@ const ManageStudents = () => {
 
     setSelectedFile(file);
     setPreviewData([]); // Clear previous preview
+    setUploadToken(null);
     setValidationErrors([]); // Clear previous errors
     setLoading(true);
 
@@ -156,6 +158,7 @@ const ManageStudents = () => {
       }
 
       setPreviewData(data.students || []);
+      setUploadToken(data.upload_token || null);
       setValidationErrors([]);
     } catch (error) {
       console.error('Error during file upload:', error);
@@ -177,7 +180,12 @@ const ManageStudents = () => {
 
     try {
       const formData = new FormData();
-      formData.append('file', selectedFile);
+      // The previewed file is already staged on the server; send it again only without a token
+      if (uploadToken) {
+        formData.append('upload_token', uploadToken);
+      } else {
+        formData.append('file', selectedFile);
+      }
       formData.append('section_mapping_id', selectedMapping);
 
       const response = await fetch('http://localhost:5000/api/upload-students', {
@@ -203,6 +211,7 @@ const ManageStudents = () => {
 
       // Reset states
       setSelectedFile(null);
+      setUploadToken(null);
       setPreviewData([]);
       setValidationErrors([]);
       setUploadProgress(100);
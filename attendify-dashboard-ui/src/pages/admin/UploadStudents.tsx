@@ -26,6 +26,7 @@ interface PreviewData {
 const UploadStudents = () => {
   const { toast } = useToast();
   const [file, setFile] = useState<File | null>(null);
+  const [uploadToken, setUploadToken] = useState<string | null>(null);
   const [previewData, setPreviewData] = useState<PreviewData[]>([]);
   const [loading, setLoading] = useState(false);
   const [sectionMappingId, setSectionMappingId] = useState("");
@@ -49,6 +50,7 @@ const UploadStudents = () => {
     }
 
     setLoading(true);
+    setUploadToken(null);
     const formData = new FormData();
     formData.append("file", selectedFile);
     formData.append("section_mapping_id", sectionMappingId);
@@ -68,6 +70,7 @@ const UploadStudents = () => {
       // Handle successful preview
       if (data.students && Array.isArray(data.students)) {
         setPreviewData(data.students);
+        setUploadToken(data.upload_token || null);
         toast({
           title: "Success",
           description: `Preview loaded with ${data.students.length} students`,
@@ -103,7 +106,12 @@ const UploadStudents = () => {
 
     setLoading(true);
     const formData = new FormData();
-    formData.append("file", file);
+    // The previewed file is already staged on the server; send it again only without a token
+    if (uploadToken) {
+      formData.append("upload_token", uploadToken);
+    } else {
+      formData.append("file", file);
+    }
     formData.append("section_mapping_id", sectionMappingId);
 
     try {
@@ -120,6 +128,7 @@ const UploadStudents = () => {
 
       // Clear the form and preview on successful upload
       setFile(null);
+      setUploadToken(null);
       setPreviewData([]);
       setSectionMappingId("");
       
@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from file_lock import file_lock
+
+
+class TokenError(Exception):
+    """Raised when a session token is malformed, forged, expired or revoked."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class SessionTokens:
+    """
+    Stateless signed session tokens: base64url(JSON claims) + '.' + base64url(HMAC-SHA256).
+
+    Validating a token needs no database access: the signature and expiry are
+    checked, then the token id is looked up in an in-memory LRU of revoked
+    tokens. The faculty's sections are carried in the claims ('scope'), so
+    authorization checks cost no queries either.
+
+    The revocation list is per process and in memory: a logout only holds in
+    the process that served it, until that process restarts. Entries are
+    dropped once the token they revoke has expired anyway; a list full of
+    live revocations refuses new ones rather than forgetting old ones.
+    """
+
+    def __init__(self, secret: bytes, ttl: float = 8 * 3600, max_revoked: int = 10000):
+        self.secret = secret
+        self.ttl = ttl
+        self.max_revoked = max_revoked
+        self._revoked = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self.secret, payload.encode('ascii'), hashlib.sha256).digest())
+
+    def issue(self, subject: str, scope: Iterable[Tuple[str, str, str, str]]) -> Tuple[str, Dict]:
+        now = int(time.time())
+        claims = {
+            'sub': subject,
+            'jti': _b64encode(os.urandom(12)),
+            'iat': now,
+            'exp': now + int(self.ttl),
+            'scope': [list(key) for key in scope]
+        }
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        return f"{payload}.{self._sign(payload)}", claims
+
+    def verify(self, token: str) -> Dict:
+        if not token.isascii():
+            raise TokenError('Malformed token')
+        try:
+            payload, signature = token.split('.')
+        except ValueError:
+            raise TokenError('Malformed token')
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            raise TokenError('Invalid token signature')
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise TokenError('Malformed token')
+        if claims.get('exp', 0) < time.time():
+            raise TokenError('Token expired')
+        with self._lock:
+            if claims.get('jti') in self._revoked:
+                raise TokenError('Token revoked')
+        return claims
+
+    def revoke(self, claims: Dict) -> bool:
+        """Revoke a verified token; False if the list is full of revocations still in force."""
+        now = time.time()
+        with self._lock:
+            # Drop entries for tokens that have expired on their own
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at < now]:
+                del self._revoked[jti]
+            if len(self._revoked) >= self.max_revoked and claims['jti'] not in self._revoked:
+                return False
+            self._revoked[claims['jti']] = claims['exp']
+            return True
+
+
+def shared_secret(path: str, lock_path: str) -> bytes:
+    """
+    The signing key kept in path, generated on first use. Every server process
+    reads the same file under the lock, so all of them sign and verify with the
+    one key whichever started first, and tokens survive restarts.
+    """
+    with file_lock(lock_path):
+        try:
+            with open(path, 'rb') as f:
+                secret = f.read().strip()
+        except FileNotFoundError:
+            secret = b''
+        if not secret:
+            secret = os.urandom(32).hex().encode('ascii')
+            tmp_path = path + '.tmp'
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(secret)
+            os.replace(tmp_path, path)
+    return secret
+
+
+def in_scope(claims: Dict, subject_code: str, department: str, semester, section: str) -> bool:
+    """True if the token's cached sections include the given class stream."""
+    wanted = [str(subject_code), str(department), str(semester), str(section)]
+    return any([str(part) for part in key] == wanted for key in claims.get('scope', []))
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if authorization and authorization.lower().startswith('bearer '):
+        return authorization[7:].strip() or None
+    return None
@@ -0,0 +1,79 @@
+"""
+Login throughput benchmark for the password hashing subsystem.
+
+    python benchmarks/bench_login.py --logins 200 --workers 1 2 4
+
+Reports verifications per second for the legacy sha256 digests, scrypt in the
+calling thread (one core), scrypt through the hashing pool for each worker
+count (with the per-core rate), and cached re-verifications.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import HashingPool, LegacySha256Verifier, VerificationCache, default_hasher  # noqa: E402
+
+
+def timed(fn, count):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return count / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark faculty login password verification')
+    parser.add_argument('--logins', type=int, default=200, help='Verifications per measurement')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1],
+                        help='Hashing pool sizes to measure')
+    parser.add_argument('--threads', type=int, default=32, help='Concurrent request threads')
+    args = parser.parse_args()
+
+    hasher = default_hasher()
+    legacy = LegacySha256Verifier()
+    passwords = [f'password-{i}' for i in range(args.logins)]
+    legacy_hashes = [hashlib.sha256(p.encode()).hexdigest() for p in passwords]
+    print(f"cores: {os.cpu_count()}, scrypt n={hasher.preferred.n} r={hasher.preferred.r} p={hasher.preferred.p}")
+
+    rate = timed(lambda: [legacy.verify(p, h) for p, h in zip(passwords, legacy_hashes)], args.logins)
+    print(f"legacy sha256, in thread:          {rate:10.1f} logins/s")
+
+    sample = passwords[:max(1, args.logins // 10)]
+    sample_hashes = [hasher.hash(p) for p in sample]
+    rate = timed(lambda: [hasher.verify(p, h) for p, h in zip(sample, sample_hashes)], len(sample))
+    print(f"scrypt, in thread (1 core):        {rate:10.1f} logins/s")
+
+    # Cycle the sample so every pool measurement verifies args.logins passwords
+    burst_passwords = [sample[i % len(sample)] for i in range(args.logins)]
+    burst_hashes = [sample_hashes[i % len(sample)] for i in range(args.logins)]
+    for workers in args.workers:
+        pool = HashingPool(hasher, max_workers=workers, max_pending=args.threads)
+        try:
+            pool.verify(sample[0], sample_hashes[0])  # start the worker processes
+            with ThreadPoolExecutor(args.threads) as requests:
+                def burst():
+                    list(requests.map(pool.verify, burst_passwords, burst_hashes))
+                rate = timed(burst, args.logins)
+            print(f"scrypt, pool of {workers:2d} workers:       {rate:10.1f} logins/s "
+                  f"({rate / workers:.1f} per core)")
+        finally:
+            pool.close()
+
+    pool = HashingPool(hasher, max_workers=1, cache=VerificationCache(max_size=len(sample)))
+    try:
+        for p, h in zip(sample, sample_hashes):
+            pool.verify(p, h)
+        rate = timed(lambda: [pool.verify(p, h) for p, h in zip(sample * 10, sample_hashes * 10)],
+                     len(sample) * 10)
+        print(f"scrypt, cached re-verification:    {rate:10.1f} logins/s")
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+List endpoint serialization benchmark.
+
+    python benchmarks/bench_rows.py --rows 50000
+
+Fills a scratch database with a student roster, then fetches and serializes
+all of it the old way (sqlite3.Row, a dict per row, json.dumps as jsonify
+does it), through rows.fetch_rows (tuples) and through rows.stream_rows
+(encoded batch by batch from the cursor, as keyed records and as column +
+value arrays), each serialized by rows.encode_json. Reports the best time
+and the peak memory traced while building the response body, in total and
+excluding the body itself.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rows import encode_json, fetch_rows, stream_rows  # noqa: E402
+
+QUERY = 'SELECT * FROM students ORDER BY USN'
+
+
+def build_database(path, count):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE students (
+            USN TEXT PRIMARY KEY, Name TEXT, Department TEXT, Semester TEXT,
+            Section TEXT, AcademicYear TEXT, Attended INTEGER, Percentage REAL
+        )
+    ''')
+    conn.executemany('INSERT INTO students VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [
+        (f'3PG{22 + i // 1000 % 78:02d}CS{i % 1000:03d}', f'Student {i}', 'cse', '5', 'ABC'[i % 3], '2024-25',
+         i % 40, None if i % 7 == 0 else round(i % 100 * 0.97, 2))
+        for i in range(count)
+    ])
+    conn.commit()
+    return conn
+
+
+def dict_rows(conn):
+    conn.row_factory = sqlite3.Row
+    try:
+        students = [dict(row) for row in conn.execute(QUERY).fetchall()]
+        # Flask's jsonify defaults: sorted keys, compact separators
+        return json.dumps({'students': students}, sort_keys=True, separators=(',', ':'))
+    finally:
+        conn.row_factory = None
+
+
+def tuple_rows(conn, shape):
+    return encode_json({'students': fetch_rows(conn, QUERY)}, shape)
+
+
+def streamed_rows(conn, shape):
+    return encode_json({'students': stream_rows(conn, QUERY)}, shape)
+
+
+def measure(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    body = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark list endpoint serialization')
+    parser.add_argument('--rows', type=int, default=50000, help='Students in the scratch database')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = build_database(os.path.join(directory, 'bench.db'), args.rows)
+        cases = [
+            ('dict(row) + json', lambda: dict_rows(conn)),
+            ('fetch_rows', lambda: tuple_rows(conn, 'records')),
+            ('stream_rows', lambda: streamed_rows(conn, 'records')),
+            ('stream_rows arrays', lambda: streamed_rows(conn, 'arrays')),
+        ]
+        results = [(name, *measure(fn, args.repeat)) for name, fn in cases]
+        conn.close()
+
+    print(f"rows: {args.rows}")
+    _, base_time, base_peak, base_size = results[0]
+    for name, elapsed, peak, size in results:
+        working = peak - size
+        print(f"{name:18} {elapsed * 1000:7.1f} ms  body {size / 1e6:5.1f} MB  "
+              f"peak {peak / 1e6:6.1f} MB  excluding body {working / 1e6:6.1f} MB  "
+              f"({(base_peak - base_size) / working:4.1f}x less, {base_time / elapsed:4.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Student upload parsing benchmark.
+
+    python benchmarks/bench_student_import.py --rows 50000
+
+Builds a student sheet (with a few extra columns, as exported sheets usually
+have) as XLSX and CSV, then times reading + validating it the old way
+(pd.read_excel / pd.read_csv of the whole file) against the streaming chunked
+reader used by the upload endpoints.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+import xlsxwriter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_import import read_student_upload, validate_student_data  # noqa: E402
+
+MAPPING = {'department': 'cse', 'semester': '5', 'section': 'A', 'academic_year': '2024-25'}
+HEADER = ['USN', 'Name', 'Department', 'Semester', 'AcademicYear', 'Email', 'Phone', 'Address']
+
+
+def build_rows(count):
+    # USNs stay unique up to 78k rows: the year digits advance every 1000 students
+    return [[f'3PG{22 + i // 1000 % 78:02d}CS{i % 1000:03d}', f'Student {i}', 'CSE', 5, '2024-25',
+             f'student{i}@example.edu', f'98{i:08d}', f'{i} College Road, Belagavi']
+            for i in range(count)]
+
+
+def build_xlsx(rows):
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, HEADER)
+    for i, row in enumerate(rows, 1):
+        worksheet.write_row(i, 0, row)
+    workbook.close()
+    return output.getvalue()
+
+
+def build_csv(rows):
+    return pd.DataFrame(rows, columns=HEADER).to_csv(index=False).encode('utf-8')
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def old_path(data, filename):
+    file = io.BytesIO(data)
+    if filename.endswith('.csv'):
+        df = pd.read_csv(file, dtype=str)
+    else:
+        df = pd.read_excel(file, engine='openpyxl', dtype=str)
+    return validate_student_data(df, MAPPING)
+
+
+def new_path(data, filename, chunk_size):
+    return read_student_upload(io.BytesIO(data), filename, MAPPING, chunk_size)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark student upload parsing')
+    parser.add_argument('--rows', type=int, default=50000, help='Rows in the generated sheet')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per streamed chunk')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    files = [('students.xlsx', build_xlsx(rows)), ('students.csv', build_csv(rows))]
+
+    # The validators print their findings; keep the report readable
+    results = []
+    stdout = sys.stdout
+    try:
+        sys.stdout = open(os.devnull, 'w')
+        for filename, data in files:
+            old = timed(lambda: old_path(data, filename), args.repeat)
+            new = timed(lambda: new_path(data, filename, args.chunk_size), args.repeat)
+            results.append((filename, len(data), old, new))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"rows: {args.rows}, chunk size: {args.chunk_size}")
+    for filename, size, old, new in results:
+        print(f"{filename:14} {size / 1e6:6.1f} MB   whole file: {old:7.2f}s   streamed: {new:7.2f}s   "
+              f"({old / new:4.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
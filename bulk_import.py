@@ -0,0 +1,145 @@
+import json
+import sqlite3
+from typing import Dict, List
+
+import pandas as pd
+
+FACULTY_COLUMNS = ['faculty_id', 'name', 'email', 'department', 'designation', 'joining_date', 'password']
+MAPPING_COLUMNS = ['faculty_id', 'department', 'semester', 'section', 'subject_code', 'subject_name', 'academic_year']
+
+# Columns identifying a section mapping (its UNIQUE constraint)
+MAPPING_KEY = ['department', 'semester', 'section', 'subject_code', 'academic_year']
+
+# Read exactly as given: passwords are stored as typed, like POST /api/faculty does
+UNSTRIPPED_COLUMNS = {'password'}
+
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+CHUNK_SIZE = 5000
+
+
+def read_csv_frame(file, columns: List[str], chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Read the given columns of an uploaded CSV as strings, chunk by chunk,
+    stripped except for UNSTRIPPED_COLUMNS. The index is the file line number
+    of each row.
+    """
+    chunks = []
+    reader = pd.read_csv(file, dtype=str, keep_default_na=False,
+                         usecols=lambda column: column.strip() in columns, chunksize=chunk_size)
+    with reader:
+        for chunk in reader:
+            chunk.columns = [column.strip() for column in chunk.columns]
+            missing = [column for column in columns if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)}")
+            chunks.append(chunk[columns].apply(
+                lambda values: values if values.name in UNSTRIPPED_COLUMNS else values.str.strip()
+            ))
+    df = pd.concat(chunks) if chunks else pd.DataFrame(columns=columns)
+    df.index = df.index + 2
+    return df
+
+
+def _add(errors: List[Dict], rows, field: str, message: str) -> None:
+    errors.extend({'row': int(row), 'field': field, 'error': message} for row in rows)
+
+
+def _validate_required(df: pd.DataFrame, errors: List[Dict]) -> None:
+    for column in df.columns:
+        _add(errors, df.index[df[column] == ''], column, f'{column} is required')
+
+
+def _validate_unique_in_file(df: pd.DataFrame, columns: List[str], field: str, errors: List[Dict]) -> None:
+    duplicated = df.duplicated(subset=columns, keep='first') & (df[columns] != '').all(axis=1)
+    _add(errors, df.index[duplicated], field, f'Duplicate {field} in file')
+
+
+def validate_faculty(df: pd.DataFrame) -> List[Dict]:
+    """Per-row errors of a faculty import that need no database access."""
+    errors = []
+    _validate_required(df, errors)
+    filled = df['email'] != ''
+    _add(errors, df.index[filled & ~df['email'].str.match(EMAIL_PATTERN)], 'email', 'Invalid email address')
+    filled = df['joining_date'] != ''
+    dates = pd.to_datetime(df['joining_date'], format='%Y-%m-%d', errors='coerce')
+    _add(errors, df.index[filled & dates.isna()], 'joining_date', 'joining_date must be YYYY-MM-DD')
+    _validate_unique_in_file(df, ['faculty_id'], 'faculty_id', errors)
+    _validate_unique_in_file(df, ['email'], 'email', errors)
+    return errors
+
+
+def validate_mappings(df: pd.DataFrame) -> List[Dict]:
+    """Per-row errors of a section mapping import that need no database access."""
+    errors = []
+    _validate_required(df, errors)
+    filled = df['semester'] != ''
+    _add(errors, df.index[filled & ~df['semester'].str.fullmatch(r'[1-8]')], 'semester',
+         'semester must be between 1 and 8')
+    _validate_unique_in_file(df, MAPPING_KEY, 'section', errors)
+    return errors
+
+
+def _rows_json(df: pd.DataFrame, columns: List[str]) -> str:
+    # [[line, value, ...], ...] for json_each
+    return json.dumps([[int(row), *values] for row, values in zip(df.index, df[columns].values.tolist())])
+
+
+def check_faculty_conflicts(conn, df: pd.DataFrame) -> List[Dict]:
+    """Rows whose faculty_id or email is already taken, found with one query each."""
+    errors = []
+    for field in ('faculty_id', 'email'):
+        rows = conn.execute(f'''
+            SELECT json_extract(j.value, '$[0]')
+            FROM json_each(?) j
+            JOIN faculty f ON f.{field} = json_extract(j.value, '$[1]')
+        ''', (_rows_json(df, [field]),)).fetchall()
+        _add(errors, [row[0] for row in rows], field, f'{field} already exists')
+    return errors
+
+
+def check_mapping_conflicts(conn, df: pd.DataFrame) -> List[Dict]:
+    """Rows naming unknown faculty or an already mapped section, found with one query each."""
+    errors = []
+    rows = conn.execute('''
+        SELECT json_extract(j.value, '$[0]')
+        FROM json_each(?) j
+        WHERE NOT EXISTS (
+            SELECT 1 FROM faculty f WHERE f.faculty_id = json_extract(j.value, '$[1]')
+        )
+    ''', (_rows_json(df, ['faculty_id']),)).fetchall()
+    _add(errors, [row[0] for row in rows], 'faculty_id', 'Faculty not found')
+    rows = conn.execute('''
+        SELECT json_extract(j.value, '$[0]')
+        FROM json_each(?) j
+        JOIN section_mapping sm
+            ON sm.department = json_extract(j.value, '$[1]')
+            AND sm.semester = json_extract(j.value, '$[2]')
+            AND sm.section = json_extract(j.value, '$[3]')
+            AND sm.subject_code = json_extract(j.value, '$[4]')
+            AND sm.academic_year = json_extract(j.value, '$[5]')
+    ''', (_rows_json(df, MAPPING_KEY),)).fetchall()
+    _add(errors, [row[0] for row in rows], 'section', 'Section mapping already exists')
+    return errors
+
+
+def sort_errors(errors: List[Dict]) -> List[Dict]:
+    return sorted(errors, key=lambda error: (error['row'], error['field']))
+
+
+def insert_faculty(cursor: sqlite3.Cursor, df: pd.DataFrame, password_hashes: List[str]) -> int:
+    cursor.executemany('''
+        INSERT INTO faculty (faculty_id, name, email, department, designation, joining_date, password_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(*values, password_hash) for values, password_hash
+          in zip(df[FACULTY_COLUMNS[:-1]].itertuples(index=False, name=None), password_hashes)])
+    return len(df)
+
+
+def insert_mappings(cursor: sqlite3.Cursor, df: pd.DataFrame) -> int:
+    cursor.executemany('''
+        INSERT INTO section_mapping
+        (faculty_id, department, semester, section, subject_code, subject_name, academic_year)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', list(df[MAPPING_COLUMNS].itertuples(index=False, name=None)))
+    return len(df)
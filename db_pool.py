@@ -0,0 +1,56 @@
+import sqlite3
+import threading
+from typing import List, Optional
+
+import query_budget
+from query_budget import BudgetConnection, QueryBudget
+
+
+class ConnectionPool:
+    """
+    Read connections of one process, kept open between requests.
+
+    A connection handed out again still has its compiled statements in
+    sqlite3's statement cache (cached_statements of them, least recently used
+    evicted first), so a route's fixed SQL is compiled once per connection
+    rather than once per request. At most max_idle connections are kept;
+    extra ones opened under load are closed when returned.
+    """
+
+    def __init__(self, database: str, max_idle: int = 8, cached_statements: int = 512):
+        self.database = database
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._idle: List[BudgetConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, budget: Optional[QueryBudget] = None) -> BudgetConnection:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = query_budget.connect(self.database, check_same_thread=False,
+                                        cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        conn.set_budget(budget)
+        return conn
+
+    def release(self, conn: BudgetConnection) -> None:
+        conn.set_budget(None)
+        try:
+            # Whatever the request left uncommitted is discarded, as closing did before
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
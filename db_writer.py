@@ -0,0 +1,145 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+from typing import Callable, List, Tuple
+
+
+class WriteQueueFull(Exception):
+    """Raised when the write queue is saturated and a job cannot be accepted in time."""
+
+
+class WriteQueue:
+    """
+    Serializes all writes of a process through one dedicated writer thread.
+
+    Jobs are callables taking a cursor. The writer drains pending jobs into a
+    single transaction (group commit): each job runs inside its own SAVEPOINT,
+    so a failing job is rolled back on its own without affecting the rest of
+    the batch, and the whole batch is made durable with one COMMIT. Results
+    (or exceptions) are delivered through futures once the batch has committed.
+
+    Jobs must not call commit()/rollback() themselves.
+    """
+
+    def __init__(self, database: str, max_batch: int = 64, max_delay: float = 0.005,
+                 max_pending: int = 1024, busy_timeout: int = 5000, cached_statements: int = 128):
+        self.database = database
+        self.cached_statements = cached_statements
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.busy_timeout = busy_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Callable[[sqlite3.Cursor], object], timeout: float = 1.0) -> Future:
+        """Queue a job; raises WriteQueueFull if it cannot be queued within timeout."""
+        if self._stopped.is_set():
+            raise RuntimeError('Write queue is closed')
+        future = Future()
+        try:
+            self._queue.put((job, future), timeout=timeout)
+        except queue.Full:
+            raise WriteQueueFull('Too many pending writes, please retry')
+        return future
+
+    def execute(self, job: Callable[[sqlite3.Cursor], object], timeout: float = 30.0):
+        """
+        Queue a job and wait for its committed result.
+
+        A job still queued after timeout is cancelled (the writer skips it) and
+        WriteQueueFull is raised; one the writer has already started is waited for,
+        so a caller is never told a write failed that then commits.
+        """
+        future = self.submit(job)
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeout:
+            if future.cancel():
+                raise WriteQueueFull('Write timed out waiting in the queue, please retry')
+            return future.result()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions and savepoints are managed explicitly below
+        conn = sqlite3.connect(self.database, isolation_level=None, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout)}')
+        return conn
+
+    def _next_batch(self) -> List[Tuple[Callable, Future]]:
+        # Block for the first job, then collect whatever else arrives within max_delay
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                batch = self._next_batch()
+                jobs = [(job, future) for job, future in batch if job is not None]
+                if jobs:
+                    self._run_batch(conn, jobs)
+                if len(jobs) < len(batch):
+                    break
+        finally:
+            conn.close()
+
+    def _run_batch(self, conn: sqlite3.Connection, jobs: List[Tuple[Callable, Future]]) -> None:
+        outcomes = []
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+        except sqlite3.Error as e:
+            for _, future in jobs:
+                future.set_exception(e)
+            return
+
+        for job, future in jobs:
+            if not future.set_running_or_notify_cancel():
+                continue
+            cursor.execute('SAVEPOINT write_job')
+            try:
+                result = job(cursor)
+                cursor.execute('RELEASE write_job')
+                outcomes.append((future, result, None))
+            except Exception as e:
+                cursor.execute('ROLLBACK TO write_job')
+                cursor.execute('RELEASE write_job')
+                outcomes.append((future, None, e))
+
+        try:
+            cursor.execute('COMMIT')
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            for future, _, _ in outcomes:
+                future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
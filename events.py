@@ -0,0 +1,130 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class Subscription:
+    """
+    One subscriber's bounded mailbox. When a slow client falls too far behind,
+    the oldest events are dropped and the client is told to resync.
+    """
+
+    def __init__(self, topics: Optional[Iterable[str]] = None, max_pending: int = 256):
+        self.topics = set(topics) if topics else None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+        # Callbacks run after every put(); the ASGI stream uses one to wake its event loop
+        self.listeners = []
+
+    def wants(self, event_type: str) -> bool:
+        return self.topics is None or event_type in self.topics
+
+    def put(self, event: Tuple[int, str, Dict]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+            try:
+                self._queue.get_nowait()
+                self._queue.put_nowait(event)
+            except (queue.Empty, queue.Full):
+                pass
+        for listener in self.listeners:
+            listener()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[int, str, Dict]]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self) -> Optional[Tuple[int, str, Dict]]:
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """
+    In-process publish/subscribe bus for live dashboard updates.
+
+    Every event gets a monotonically increasing id; the newest events are kept
+    in a replay buffer so reconnecting clients (Last-Event-ID) can catch up.
+    """
+
+    def __init__(self, replay_size: int = 500):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers: List[Subscription] = []
+
+    def publish(self, event_type: str, data: Dict) -> int:
+        with self._lock:
+            event = (self._next_id, event_type, data)
+            self._next_id += 1
+            self._replay.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if subscription.wants(event_type):
+                subscription.put(event)
+        return event[0]
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None,
+                  last_event_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(topics)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._replay:
+                    if event[0] > last_event_id and subscription.wants(event[1]):
+                        subscription.put(event)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+# Sent to a subscriber whose mailbox overflowed; it carries no id so the
+# client's Last-Event-ID stays on the last event it actually received
+RESYNC_FRAME = 'event: resync\ndata: {"reason":"client fell behind"}\n\n'
+
+KEEP_ALIVE_FRAME = ': keep-alive\n\n'
+
+
+def format_sse(event: Tuple[int, str, Dict]) -> str:
+    """Encode an event in text/event-stream format."""
+    event_id, event_type, data = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def stream_events(bus: EventBus, subscription: Subscription, heartbeat: float = 15.0):
+    """
+    Generator yielding SSE frames for a subscription until the client disconnects.
+    Sends a comment line every heartbeat seconds so proxies keep the connection open.
+    """
+    try:
+        yield 'retry: 3000\n\n'
+        last_write = time.monotonic()
+        while True:
+            event = subscription.get(timeout=heartbeat)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield RESYNC_FRAME
+            if event is not None:
+                yield format_sse(event)
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write >= heartbeat:
+                yield KEEP_ALIVE_FRAME
+                last_write = time.monotonic()
+    finally:
+        bus.unsubscribe(subscription)
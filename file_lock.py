@@ -0,0 +1,48 @@
+import os
+from contextlib import contextmanager
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+def _lock(fd: int, blocking: bool) -> bool:
+    try:
+        if os.name == 'nt':
+            mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+            msvcrt.locking(fd, mode, 1)
+        else:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            fcntl.flock(fd, flags)
+        return True
+    except OSError:
+        if blocking:
+            raise
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if os.name == 'nt':
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """
+    Hold an exclusive inter-process lock on path for the duration of the block.
+    Yields True when the lock was acquired; with blocking=False it yields False
+    instead of waiting when another process holds the lock.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    acquired = False
+    try:
+        acquired = _lock(fd, blocking)
+        yield acquired
+    finally:
+        if acquired:
+            _unlock(fd)
+        os.close(fd)
@@ -0,0 +1,35 @@
+# Production server configuration.
+#   gunicorn -c gunicorn.conf.py wsgi:application
+# Every setting can be overridden through the environment variables below.
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+# One process per core by default, each with a small thread pool for I/O-bound requests
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WORKER_THREADS', 4))
+
+# Import the app (schema setup + subject catalogue warmup) once in the master,
+# then fork workers that share the warmed state copy-on-write
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('KEEPALIVE', 5))
+
+# Recycle workers periodically so long-running processes don't accumulate memory
+max_requests = int(os.environ.get('MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.environ.get('ACCESS_LOG', '-')
+errorlog = os.environ.get('ERROR_LOG', '-')
+
+
+def when_ready(server):
+    server.log.info(f"Serving with {workers} workers x {threads} threads on {bind}")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker spawned (pid: {worker.pid})")
@@ -0,0 +1,232 @@
+import functools
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from flask import g, jsonify, make_response, request
+
+NEW = 'new'
+REPLAY = 'replay'
+MISMATCH = 'mismatch'
+IN_PROGRESS = 'in_progress'
+
+# Responses worth replaying; auth failures and overload responses are retried for real
+_UNCACHEABLE_STATUSES = {401, 403, 429}
+
+
+class Replay(Exception):
+    """
+    Raised by save() when another process already committed a response for the
+    request's Idempotency-Key; the write job is rolled back and the stored
+    response is replayed instead.
+    """
+
+    def __init__(self, fingerprint: str, response: tuple):
+        super().__init__('Idempotency-Key was already used')
+        self.fingerprint = fingerprint
+        self.response = response
+
+
+def create_idempotency_table(cursor: sqlite3.Cursor) -> None:
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            body BLOB NOT NULL,
+            status INTEGER NOT NULL,
+            content_type TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+
+
+def prune_idempotency_keys(cursor: sqlite3.Cursor, ttl: float) -> int:
+    cursor.execute('DELETE FROM idempotency_keys WHERE created_at < ?', (time.time() - ttl,))
+    return cursor.rowcount
+
+
+class _Entry:
+    __slots__ = ('fingerprint', 'done', 'response', 'expires_at')
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.response = None
+        self.expires_at = None
+
+
+class IdempotencyCache:
+    """
+    Responses keyed by client-supplied Idempotency-Key.
+
+    A view that writes saves its response in the idempotency_keys table from
+    inside its write job (see pending() and save()), so the key is committed
+    with the changes it made, and a retry served by any process finds it. An
+    in-memory LRU in front of the table replays repeats without a query, and
+    a concurrent duplicate in the same process waits for the first request to
+    finish. Entries expire after ttl.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 24 * 3600, wait_timeout: float = 30.0,
+                 connect: Optional[Callable] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        # Context manager factory yielding a database connection, for lookups
+        self.connect = connect
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[tuple]]:
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires_at is not None and entry.expires_at < time.monotonic():
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    self._entries[key] = _Entry(fingerprint)
+                    self._evict()
+                    return NEW, None
+                if entry.fingerprint != fingerprint:
+                    return MISMATCH, None
+                if entry.done.is_set():
+                    self._entries.move_to_end(key)
+                    return REPLAY, entry.response
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not entry.done.wait(remaining):
+                return IN_PROGRESS, None
+
+    def lookup(self, key: str) -> Optional[Tuple[str, tuple]]:
+        """(fingerprint, response) committed for key by any process, or None."""
+        if self.connect is None:
+            return None
+        with self.connect() as conn:
+            row = conn.execute('''
+                SELECT fingerprint, body, status, content_type
+                FROM idempotency_keys
+                WHERE key = ? AND created_at >= ?
+            ''', (key, time.time() - self.ttl)).fetchone()
+        return (row[0], (row[1], row[2], row[3])) if row else None
+
+    def pending(self, payload, status: int = 200) -> Optional[tuple]:
+        """
+        The JSON response a view is about to return, to be passed to save() in its
+        write job; None when the request carries no Idempotency-Key.
+        """
+        request_key = g.get('idempotency')
+        if request_key is None:
+            return None
+        response = jsonify(payload)
+        return request_key + (response.get_data(), status, response.content_type)
+
+    def save(self, cursor: sqlite3.Cursor, pending: Optional[tuple]) -> None:
+        """
+        Store a pending response inside the caller's write transaction. Raises
+        Replay if the key was committed meanwhile, so the job's changes are rolled back.
+        """
+        if pending is None:
+            return
+        key, fingerprint, body, status, content_type = pending
+        now = time.time()
+        cursor.execute('''
+            INSERT INTO idempotency_keys (key, fingerprint, body, status, content_type, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                fingerprint = excluded.fingerprint, body = excluded.body, status = excluded.status,
+                content_type = excluded.content_type, created_at = excluded.created_at
+            WHERE idempotency_keys.created_at < ?
+        ''', (key, fingerprint, body, status, content_type, now, now - self.ttl))
+        if cursor.rowcount == 0:
+            cursor.execute('SELECT fingerprint, body, status, content_type FROM idempotency_keys WHERE key = ?',
+                           (key,))
+            row = cursor.fetchone()
+            raise Replay(row[0], (row[1], row[2], row[3]))
+
+    def complete(self, key: str, response: tuple) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.response = response
+                entry.expires_at = time.monotonic() + self.ttl
+                entry.done.set()
+
+    def abandon(self, key: str) -> None:
+        # Forget a failed attempt so the client's retry runs again
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.done.set()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_size:
+            _, entry = self._entries.popitem(last=False)
+            entry.done.set()
+
+
+def _replay(cached: tuple):
+    body, status, content_type = cached
+    response = make_response(body, status)
+    response.content_type = content_type
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _mismatch():
+    return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+
+
+def idempotent(cache: IdempotencyCache):
+    """
+    Decorator making a Flask view safe to retry: requests carrying an
+    Idempotency-Key header run the view at most once per key and body.
+    The view saves its response with cache.pending() and cache.save() in its
+    write job, and lets Replay propagate.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if not key:
+                return view(*args, **kwargs)
+
+            fingerprint = hashlib.sha256(
+                request.method.encode() + b' ' + request.path.encode() + b'\n' + request.get_data()
+            ).hexdigest()
+            state, cached = cache.begin(key, fingerprint)
+            if state == REPLAY:
+                return _replay(cached)
+            if state == MISMATCH:
+                return _mismatch()
+            if state == IN_PROGRESS:
+                return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+
+            try:
+                # Not seen by this process: another one may have served it already
+                stored = cache.lookup(key)
+                if stored is None:
+                    g.idempotency = (key, fingerprint)
+                    response = make_response(view(*args, **kwargs))
+            except Replay as e:
+                stored = (e.fingerprint, e.response)
+            except Exception:
+                cache.abandon(key)
+                raise
+            if stored is not None:
+                stored_fingerprint, cached = stored
+                if stored_fingerprint != fingerprint:
+                    cache.abandon(key)
+                    return _mismatch()
+                cache.complete(key, cached)
+                return _replay(cached)
+            if response.status_code >= 500 or response.status_code in _UNCACHEABLE_STATUSES:
+                cache.abandon(key)
+            else:
+                cache.complete(key, (response.get_data(), response.status_code, response.content_type))
+            return response
+        return wrapper
+    return decorator
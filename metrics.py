@@ -0,0 +1,27 @@
+import threading
+from typing import Dict, List
+
+
+class Metrics:
+    """
+    In-process counters, keyed by name and labels, exposed as JSON by
+    /api/metrics. Values are per server process.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = sorted(self._counters.items())
+        return [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in items]
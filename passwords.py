@@ -0,0 +1,256 @@
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+
+class HasherBusy(Exception):
+    """Raised when the password hashing pool is saturated."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+class ScryptHasher:
+    """
+    Salted, memory-hard scrypt hashes encoded as
+    scrypt$<n>$<r>$<p>$<salt>$<hash> (base64 without padding).
+    """
+
+    algorithm = 'scrypt'
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, salt_size: int = 16, key_size: int = 32):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_size = salt_size
+        self.key_size = key_size
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int, key_size: int) -> bytes:
+        # OpenSSL needs headroom above the 128 * n * r bytes scrypt itself uses
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=key_size)
+
+    def identify(self, encoded: str) -> bool:
+        return encoded.startswith(self.algorithm + '$')
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(self.salt_size)
+        key = self._derive(password, salt, self.n, self.r, self.p, self.key_size)
+        return f"{self.algorithm}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(key)}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            _, n, r, p, salt, key = encoded.split('$')
+            expected = _b64decode(key)
+            derived = self._derive(password, _b64decode(salt), int(n), int(r), int(p), len(expected))
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived, expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        try:
+            _, n, r, p, _, _ = encoded.split('$')
+        except ValueError:
+            return True
+        return (int(n), int(r), int(p)) != (self.n, self.r, self.p)
+
+
+class LegacySha256Verifier:
+    """
+    Checks the unsalted hex sha256 digests written by earlier versions. Only
+    recognises and verifies them: new hashes are never written in this format,
+    and a verified one is always upgraded.
+    """
+
+    algorithm = 'sha256'
+
+    def identify(self, encoded: str) -> bool:
+        return len(encoded) == 64 and all(c in '0123456789abcdef' for c in encoded)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), encoded)
+
+
+class PasswordHasher:
+    """
+    Hashes new passwords with the preferred hasher and verifies stored hashes
+    with whichever registered hasher recognises their format, so old hashes
+    keep working and can be upgraded on the next successful login. Legacy
+    formats only need identify() and verify().
+    """
+
+    def __init__(self, preferred, legacy: Optional[List] = None):
+        self.preferred = preferred
+        self.hashers = [preferred] + list(legacy or [])
+
+    def _identify(self, encoded: str):
+        for hasher in self.hashers:
+            if hasher.identify(encoded):
+                return hasher
+        return None
+
+    def hash(self, password: str) -> str:
+        return self.preferred.hash(password)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        hasher = self._identify(encoded or '')
+        return hasher is not None and hasher.verify(password, encoded)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        hasher = self._identify(encoded or '')
+        return hasher is not self.preferred or hasher.needs_rehash(encoded)
+
+
+def default_hasher() -> PasswordHasher:
+    return PasswordHasher(
+        ScryptHasher(
+            n=int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14)),
+            r=int(os.environ.get('PASSWORD_SCRYPT_R', 8)),
+            p=int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+        ),
+        legacy=[LegacySha256Verifier()]
+    )
+
+
+# Worker-process side of the pool; the hasher is handed over once per worker
+_worker_hasher = None
+
+
+def _init_worker(hasher: PasswordHasher) -> None:
+    global _worker_hasher
+    _worker_hasher = hasher
+
+
+def _hash_in_worker(password: str) -> str:
+    return _worker_hasher.hash(password)
+
+
+def _verify_in_worker(password: str, encoded: str) -> bool:
+    return _worker_hasher.verify(password, encoded)
+
+
+class VerificationCache:
+    """
+    Remembers recently verified (hash, password) pairs so repeated logins skip
+    the KDF. Passwords are never stored: entries hold an HMAC of the password
+    under a random per-process key, and an entry only matches the exact stored
+    hash it was verified against, so a password change invalidates it.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, password: str) -> bytes:
+        return hmac.new(self._key, password.encode('utf-8'), hashlib.sha256).digest()
+
+    def check(self, password: str, encoded: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(encoded)
+            if entry is None:
+                return False
+            digest, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[encoded]
+                return False
+            self._entries.move_to_end(encoded)
+        return hmac.compare_digest(digest, self._digest(password))
+
+    def add(self, password: str, encoded: str) -> None:
+        if self.max_size <= 0:
+            return
+        digest = self._digest(password)
+        with self._lock:
+            self._entries[encoded] = (digest, time.monotonic() + self.ttl)
+            self._entries.move_to_end(encoded)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class HashingPool:
+    """
+    Runs password hashing and verification in a bounded pool of worker
+    processes, so KDF work spreads over the cores and request threads only
+    wait on a future. At most max_pending operations are queued or running;
+    beyond that callers wait up to acquire_timeout and then get HasherBusy.
+
+    Workers are spawned (not forked), so creating the pool from a process
+    that already runs threads is safe.
+    """
+
+    def __init__(self, hasher: PasswordHasher, max_workers: int = 2, max_pending: int = 64,
+                 acquire_timeout: float = 5.0, cache: Optional[VerificationCache] = None):
+        self.hasher = hasher
+        self.acquire_timeout = acquire_timeout
+        self.cache = cache
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(hasher,)
+        )
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise HasherBusy('Too many concurrent logins, please retry')
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash_in_worker, password)
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        # A bulk import takes one slot and spreads its batch over all the workers,
+        # max_workers jobs at a time, so logins queue behind one window at most
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise HasherBusy('Too many concurrent logins, please retry')
+        try:
+            hashes = []
+            for start in range(0, len(passwords), self.max_workers):
+                window = passwords[start:start + self.max_workers]
+                hashes.extend(self._executor.map(_hash_in_worker, window))
+            return hashes
+        finally:
+            self._slots.release()
+
+    def verify(self, password: str, encoded: str) -> bool:
+        if self.cache is not None and self.cache.check(password, encoded):
+            return True
+        if self.hasher.preferred.identify(encoded or ''):
+            verified = self._run(_verify_in_worker, password, encoded)
+        else:
+            # Legacy digests are cheap; not worth a round trip to the pool
+            verified = self.hasher.verify(password, encoded)
+        if verified and self.cache is not None:
+            self.cache.add(password, encoded)
+        return verified
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return self.hasher.needs_rehash(encoded)
+
+    def remember(self, password: str, encoded: str) -> None:
+        # Seed the cache with a hash just computed for a known-good password
+        if self.cache is not None:
+            self.cache.add(password, encoded)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,61 @@
+import json
+from typing import Iterable
+
+# Named statements of the request hot paths (marking attendance, student
+# uploads, logins, sync). Their text never varies per call, so sqlite3 compiles
+# each once per connection and serves it from the connection's statement cache
+# afterwards. Lists are bound as one JSON array parameter (see json_list) and
+# joined through json_each rather than expanded into IN (?, ?, ...).
+
+SECTION_MAPPING_BY_ID = '''
+    SELECT department, semester, section, academic_year
+    FROM section_mapping
+    WHERE id = ?
+'''
+
+# Current academic year's mapping of one class (department, semester, subject, section)
+CLASS_SECTION_MAPPING = '''
+    SELECT academic_year, subject_name
+    FROM section_mapping
+    WHERE department = ?1
+    AND semester = ?2
+    AND subject_code = ?3
+    AND section = ?4
+    AND academic_year = (
+        SELECT MAX(academic_year)
+        FROM section_mapping
+        WHERE department = ?1
+        AND semester = ?2
+        AND subject_code = ?3
+        AND section = ?4
+    )
+'''
+
+FACULTY_BY_ID = 'SELECT * FROM faculty WHERE faculty_id = ?'
+
+# USNs of a JSON array that belong to a student
+EXISTING_USNS = '''
+    SELECT USN
+    FROM students
+    WHERE USN IN (SELECT value FROM json_each(?))
+'''
+
+INSERT_STUDENT = '''
+    INSERT INTO students (USN, Name, Department, Semester, Section, AcademicYear)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_ATTENDANCE = '''
+    INSERT INTO attendance (USN, Date, subject_code, Present, department, semester, section, AcademicYear)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+UPSERT_ATTENDANCE = INSERT_ATTENDANCE + '''
+    ON CONFLICT(USN, Date, subject_code, section) DO UPDATE SET
+        Present = excluded.Present
+'''
+
+
+def json_list(values: Iterable) -> str:
+    """Bind a list of values as one parameter, for json_each."""
+    return json.dumps(list(values))
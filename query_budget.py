@@ -0,0 +1,115 @@
+import sqlite3
+import time
+from typing import Optional
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request runs past its query time budget or query count."""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+class QueryBudget:
+    """
+    Limits on the database work of one request: a wall-clock deadline shared
+    by all its queries, enforced by sqlite3's progress handler (a running
+    statement is interrupted once the deadline passes), and a maximum number
+    of statements, which catches N+1 query loops.
+    """
+
+    def __init__(self, route: str, time_limit: Optional[float] = None, max_queries: Optional[int] = None,
+                 check_every: int = 1000):
+        self.route = route
+        self.time_limit = time_limit
+        self.deadline = time.monotonic() + time_limit if time_limit else None
+        self.max_queries = max_queries
+        self.check_every = check_every
+        self.queries = 0
+        self.exceeded = None  # (kind, message) once over budget
+
+    def _exceed(self, kind: str, message: str) -> QueryBudgetExceeded:
+        if self.exceeded is None:
+            self.exceeded = (kind, message)
+        return QueryBudgetExceeded(*self.exceeded)
+
+    def _out_of_time(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def _progress(self) -> int:
+        # Called by SQLite every check_every VM instructions; non-zero aborts the statement
+        if self._out_of_time():
+            self._exceed('time', f'Query time budget of {self.time_limit:g}s exceeded')
+            return 1
+        return 0
+
+    def attach(self, conn: sqlite3.Connection) -> None:
+        if self.deadline is not None:
+            conn.set_progress_handler(self._progress, self.check_every)
+
+    def before_query(self) -> None:
+        if self.exceeded is not None:
+            raise QueryBudgetExceeded(*self.exceeded)
+        self.queries += 1
+        if self.max_queries is not None and self.queries > self.max_queries:
+            raise self._exceed('queries', f'More than {self.max_queries} queries in one request')
+        if self._out_of_time():
+            raise self._exceed('time', f'Query time budget of {self.time_limit:g}s exceeded')
+
+    def after_error(self, error: sqlite3.OperationalError) -> None:
+        # The progress handler aborted the statement: report it as a budget overrun
+        if self.exceeded is not None and 'interrupted' in str(error):
+            raise QueryBudgetExceeded(*self.exceeded) from error
+
+
+class BudgetCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        budget = self.connection.budget
+        if budget is None:
+            return super().execute(sql, parameters)
+        budget.before_query()
+        try:
+            return super().execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            budget.after_error(e)
+            raise
+
+    def executemany(self, sql, seq_of_parameters):
+        budget = self.connection.budget
+        if budget is None:
+            return super().executemany(sql, seq_of_parameters)
+        budget.before_query()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except sqlite3.OperationalError as e:
+            budget.after_error(e)
+            raise
+
+
+class BudgetConnection(sqlite3.Connection):
+    """Connection whose statements count against (and are cut off by) a QueryBudget, if it has one."""
+
+    budget: Optional[QueryBudget] = None
+
+    def set_budget(self, budget: Optional[QueryBudget]) -> None:
+        # Reused (pooled) connections switch budgets between requests
+        self.set_progress_handler(None, 0)
+        self.budget = budget
+        if budget is not None:
+            budget.attach(self)
+
+    def cursor(self, factory=BudgetCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database: str, budget: Optional[QueryBudget] = None, **kwargs) -> BudgetConnection:
+    conn = sqlite3.connect(database, factory=BudgetConnection, **kwargs)
+    conn.set_budget(budget)
+    return conn
@@ -0,0 +1,45 @@
+import base64
+from typing import Dict, List, Tuple
+
+# Report formats accepted by the attendance grid endpoints (?format=...)
+REPORT_FORMATS = ('full', 'compact', 'bitset')
+
+PRESENT, ABSENT, NOT_MARKED = '1', '0', '-'
+
+
+def mark_string(dates: List[str], marks: Dict[str, bool]) -> str:
+    """
+    One character per date in dates: '1' present, '0' absent, '-' not marked.
+    Replaces the {date: bool} map of the full format.
+    """
+    return ''.join(
+        NOT_MARKED if date not in marks else (PRESENT if marks[date] else ABSENT)
+        for date in dates
+    )
+
+
+def mark_bitsets(dates: List[str], marks: Dict[str, bool]) -> Tuple[str, str]:
+    """
+    Base64 bitsets (bit i = dates[i], least significant bit first) of the dates
+    the student was present on and the dates they were marked at all.
+    """
+    present = bytearray((len(dates) + 7) // 8)
+    marked = bytearray((len(dates) + 7) // 8)
+    for i, date in enumerate(dates):
+        if date in marks:
+            marked[i >> 3] |= 1 << (i & 7)
+            if marks[date]:
+                present[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(present)).decode('ascii'), base64.b64encode(bytes(marked)).decode('ascii')
+
+
+def encode_marks(record: Dict, marks_key: str, dates: List[str], report_format: str) -> Dict:
+    """Replace record[marks_key] ({date: bool}) with the requested compact encoding."""
+    marks = record.pop(marks_key)
+    if report_format == 'compact':
+        record['marks'] = mark_string(dates, marks)
+    elif report_format == 'bitset':
+        record['present'], record['marked'] = mark_bitsets(dates, marks)
+    else:
+        record[marks_key] = marks
+    return record
@@ -0,0 +1,299 @@
+import io
+import json
+import multiprocessing
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import xlsxwriter
+
+from attendance_summary import range_counts
+
+SectionKey = Tuple[str, str, str, str]  # (subject_code, department, semester, section)
+
+EXCEL_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_JOB_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+class BundleBusy(Exception):
+    """Raised when the maximum number of bundle exports is already running."""
+
+
+def section_report_frame(conn, key: SectionKey, start_date: str, end_date: str):
+    """
+    Attendance grid of one section between two dates: one row per student with
+    P/A/- per marked date and the range totals. Returns (dates, DataFrame),
+    with no dates if nothing was marked and an empty frame if the section has
+    no students. The section's cached summary must be current.
+    """
+    subject, department, semester, section = key
+    cursor = conn.cursor()
+
+    # Get all dates between start_date and end_date
+    cursor.execute('''
+        SELECT DISTINCT Date
+        FROM attendance
+        WHERE subject_code = ?
+        AND department = ?
+        AND semester = ?
+        AND section = ?
+        AND Date BETWEEN ? AND ?
+        ORDER BY Date
+    ''', (subject, department, semester, section, start_date, end_date))
+    dates = [row[0] for row in cursor.fetchall()]
+    if not dates:
+        return dates, pd.DataFrame()
+
+    # Totals are differences of two running totals per student
+    counts = range_counts(conn, subject, department, semester, start_date, end_date, section)
+
+    # Per-date marks for the grid
+    cursor.execute('''
+        SELECT USN, Date, Present
+        FROM attendance
+        WHERE subject_code = ?
+        AND department = ?
+        AND semester = ?
+        AND section = ?
+        AND Date BETWEEN ? AND ?
+    ''', (subject, department, semester, section, start_date, end_date))
+    marks = {}
+    for usn, date, present in cursor.fetchall():
+        marks.setdefault(usn, {})[date] = 'P' if present == 1 else 'A'
+
+    # Get students of the section
+    cursor.execute('''
+        SELECT USN, Name
+        FROM students
+        WHERE department = ?
+            AND semester = ?
+            AND section = ?
+        ORDER BY USN
+    ''', (department, semester, section))
+
+    df_data = []
+    for usn, name in cursor.fetchall():
+        student_marks = marks.get(usn, {})
+        student_data = {
+            'USN': usn,
+            'Name': name
+        }
+
+        # Add attendance for each date
+        for date in dates:
+            student_data[date] = student_marks.get(date, '-')
+
+        # Add summary columns
+        total_classes, classes_attended = counts.get(usn, (0, 0))
+        student_data['Total Classes'] = total_classes
+        student_data['Classes Attended'] = classes_attended
+        student_data['Attendance %'] = round((classes_attended / total_classes * 100), 2) if total_classes > 0 else 0
+
+        df_data.append(student_data)
+
+    return dates, pd.DataFrame(df_data)
+
+
+def render_report(df: pd.DataFrame, dates: List[str], file_format: str) -> Tuple[bytes, str, str]:
+    """Render a report grid as CSV or Excel. Returns (content, file extension, mimetype)."""
+    output = io.BytesIO()
+    if file_format == 'csv':
+        df.to_csv(output, index=False, encoding='utf-8')
+        return output.getvalue(), 'csv', 'text/csv'
+
+    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    worksheet = workbook.add_worksheet('Attendance Report')
+
+    # Define formats
+    header_format = workbook.add_format({
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'align': 'center',
+        'bg_color': '#D9D9D9',
+        'border': 1
+    })
+
+    present_format = workbook.add_format({
+        'bg_color': '#C6EFCE',
+        'align': 'center'
+    })
+
+    absent_format = workbook.add_format({
+        'bg_color': '#FFC7CE',
+        'align': 'center'
+    })
+
+    # Write headers
+    for col_num, column in enumerate(df.columns):
+        worksheet.write(0, col_num, column, header_format)
+        worksheet.set_column(col_num, col_num, 15)
+
+    # Write data
+    for row_num, row in enumerate(df.values, 1):
+        for col_num, value in enumerate(row):
+            if col_num >= 2 and col_num < len(dates) + 2:  # Only format attendance columns
+                if value == 'P':
+                    worksheet.write(row_num, col_num, value, present_format)
+                elif value == 'A':
+                    worksheet.write(row_num, col_num, value, absent_format)
+                else:
+                    worksheet.write(row_num, col_num, value)
+            else:
+                worksheet.write(row_num, col_num, value)
+
+    workbook.close()
+    return output.getvalue(), 'xlsx', EXCEL_MIMETYPE
+
+
+def build_section_report(db_path: str, key: SectionKey, start_date: str, end_date: str,
+                         file_format: str) -> Tuple[SectionKey, Optional[str], Optional[bytes], Optional[str]]:
+    """
+    Worker-process entry point: render one section's report from its own
+    read-only connection. Returns (key, archive path, content, reason skipped).
+    """
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        dates, df = section_report_frame(conn, key, start_date, end_date)
+    finally:
+        conn.close()
+    if not dates:
+        return key, None, None, 'No attendance records found for the selected period'
+    if df.empty:
+        return key, None, None, 'No students found in the selected section'
+    content, extension, _ = render_report(df, dates, file_format)
+    subject, department, semester, section = key
+    return key, f'{department}/sem{semester}/{subject}_{section}.{extension}', content, None
+
+
+class ReportBundles:
+    """
+    Builds ZIP bundles of per-section attendance reports in the background.
+
+    Sections are rendered in parallel by a pool of spawned worker processes
+    (each opens its own read-only connection) and written into the archive on
+    disk as they finish. Job progress is kept in a JSON status file next to
+    the archive, so any server process can report it.
+    """
+
+    def __init__(self, out_dir: str, max_workers: Optional[int] = None, max_jobs: int = 1,
+                 keep_hours: float = 24.0):
+        self.out_dir = out_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.keep_hours = keep_hours
+        self._slots = threading.BoundedSemaphore(max_jobs)
+
+    def _path(self, job_id: str, suffix: str) -> Optional[str]:
+        if not job_id or not _JOB_ID_PATTERN.match(job_id):
+            return None
+        return os.path.join(self.out_dir, f'{job_id}{suffix}')
+
+    def _save_status(self, status: Dict) -> None:
+        # Write to a temporary file first so a reader never sees a truncated status
+        status_path = self._path(status['job_id'], '.json')
+        tmp_path = status_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp_path, status_path)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.keep_hours * 3600
+        for name in os.listdir(self.out_dir):
+            path = os.path.join(self.out_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        path = self._path(job_id, '.json')
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def archive_path(self, job_id: str) -> Optional[str]:
+        status = self.status(job_id)
+        if status is None or status['state'] != 'done':
+            return None
+        return self._path(job_id, '.zip')
+
+    def start(self, db_path: str, sections: List[SectionKey], start_date: str, end_date: str,
+              file_format: str) -> Dict:
+        """Queue a bundle of the given sections; returns the initial job status."""
+        if not self._slots.acquire(blocking=False):
+            raise BundleBusy('A report bundle export is already running, please retry later')
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            self._prune()
+            status = {
+                'job_id': secrets.token_urlsafe(12),
+                'state': 'running',
+                'total': len(sections),
+                'completed': 0,
+                'files': 0,
+                'skipped': [],
+                'failed': [],
+                'start_date': start_date,
+                'end_date': end_date,
+                'format': file_format,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'finished_at': None,
+                'error': None
+            }
+            self._save_status(status)
+            threading.Thread(
+                target=self._run, args=(status, db_path, sections, start_date, end_date, file_format),
+                name=f"report-bundle-{status['job_id']}", daemon=True
+            ).start()
+            return status
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _run(self, status, db_path, sections, start_date, end_date, file_format) -> None:
+        archive_path = self._path(status['job_id'], '.zip')
+        tmp_path = archive_path + '.tmp'
+        try:
+            workers = max(1, min(self.max_workers, len(sections)))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool, \
+                    zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+                futures = {
+                    pool.submit(build_section_report, db_path, key, start_date, end_date, file_format): key
+                    for key in sections
+                }
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        _, name, content, skipped = future.result()
+                        if content is not None:
+                            bundle.writestr(name, content)
+                            status['files'] += 1
+                        else:
+                            status['skipped'].append({'section': list(key), 'reason': skipped})
+                    except Exception as e:
+                        status['failed'].append({'section': list(key), 'error': str(e)})
+                    status['completed'] += 1
+                    self._save_status(status)
+            os.replace(tmp_path, archive_path)
+            status['state'] = 'done'
+        except Exception as e:
+            print(f"Report bundle {status['job_id']} failed: {str(e)}")
+            status['state'] = 'failed'
+            status['error'] = str(e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            status['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            self._save_status(status)
+            self._slots.release()
@@ -0,0 +1,112 @@
+import json
+import sqlite3
+from typing import Dict, Optional
+
+
+def create_roster_tables(cursor: sqlite3.Cursor) -> None:
+    """
+    Create the roster rollover log and the archive of the rosters they replaced.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS roster_rollovers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_academic_year TEXT NOT NULL,
+            to_academic_year TEXT NOT NULL,
+            department TEXT,
+            semester TEXT,
+            promoted INTEGER NOT NULL,
+            sections TEXT,
+            archived INTEGER NOT NULL DEFAULT 0,
+            moved INTEGER NOT NULL DEFAULT 0,
+            graduated INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS students_archive (
+            rollover_id INTEGER NOT NULL,
+            USN TEXT NOT NULL,
+            Name TEXT NOT NULL,
+            Department TEXT NOT NULL,
+            Semester TEXT NOT NULL,
+            Section TEXT NOT NULL,
+            AcademicYear TEXT NOT NULL,
+            PRIMARY KEY (rollover_id, USN)
+        )
+    ''')
+
+
+def rollover_roster(cursor: sqlite3.Cursor, from_academic_year: str, to_academic_year: str,
+                    department: Optional[str] = None, semester: Optional[str] = None,
+                    promote: bool = True, final_semester: int = 8,
+                    sections: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Move a cohort of students to the next academic year with a handful of
+    set-based statements, whatever the cohort size:
+
+    - the current roster rows are copied to students_archive,
+    - with promote, students already in final_semester (or later) graduate and
+      leave the roster; everyone else moves up one semester,
+    - sections are renamed per the sections map ({old: new}, others unchanged),
+    - AcademicYear becomes to_academic_year.
+
+    Run it inside a single transaction. Returns the rollover record.
+    """
+    where = 'AcademicYear = ?'
+    params = [from_academic_year]
+    if department:
+        where += ' AND Department = ?'
+        params.append(department)
+    if semester:
+        where += ' AND Semester = ?'
+        params.append(str(semester))
+    sections_json = json.dumps(sections or {})
+
+    cursor.execute('''
+        INSERT INTO roster_rollovers
+        (from_academic_year, to_academic_year, department, semester, promoted, sections)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (from_academic_year, to_academic_year, department, semester, int(promote), sections_json))
+    rollover_id = cursor.lastrowid
+
+    # Snapshot of the roster being replaced
+    cursor.execute(f'''
+        INSERT INTO students_archive (rollover_id, USN, Name, Department, Semester, Section, AcademicYear)
+        SELECT ?, USN, Name, Department, Semester, Section, AcademicYear
+        FROM students
+        WHERE {where}
+    ''', [rollover_id, *params])
+    archived = cursor.rowcount
+
+    graduated = 0
+    if promote:
+        cursor.execute(f'''
+            DELETE FROM students
+            WHERE {where} AND CAST(Semester AS INTEGER) >= ?
+        ''', [*params, final_semester])
+        graduated = cursor.rowcount
+
+    cursor.execute(f'''
+        UPDATE students SET
+            Semester = CASE WHEN ? THEN CAST(CAST(Semester AS INTEGER) + 1 AS TEXT) ELSE Semester END,
+            Section = COALESCE((SELECT value FROM json_each(?) WHERE key = students.Section), Section),
+            AcademicYear = ?
+        WHERE {where}
+    ''', [int(promote), sections_json, to_academic_year, *params])
+    moved = cursor.rowcount
+
+    cursor.execute('''
+        UPDATE roster_rollovers SET archived = ?, moved = ?, graduated = ? WHERE id = ?
+    ''', (archived, moved, graduated, rollover_id))
+    return {
+        'id': rollover_id,
+        'from_academic_year': from_academic_year,
+        'to_academic_year': to_academic_year,
+        'department': department,
+        'semester': semester,
+        'promoted': promote,
+        'sections': sections or {},
+        'archived': archived,
+        'moved': moved,
+        'graduated': graduated
+    }
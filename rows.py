@@ -0,0 +1,194 @@
+import io
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Row shapes a query result can be serialized as
+ROW_SHAPES = ('records', 'arrays')
+
+# Rows fetched and encoded per batch, bounding what is held at once
+ENCODE_BATCH = 1000
+
+
+def _encode_value(value) -> str:
+    if value is None:
+        return 'null'
+    if type(value) is str:
+        return encode_basestring_ascii(value)
+    if type(value) is int:
+        return int.__repr__(value)
+    # Floats (incl. non-finite) and anything unusual: same output as json.dumps
+    return json.dumps(value)
+
+
+# Encoders for columns whose values in a batch all have one type; mapping a
+# C function over a column never enters the interpreter per value
+_COLUMN_ENCODERS = {
+    str: encode_basestring_ascii,
+    int: int.__repr__,
+    type(None): lambda value: 'null',
+}
+
+
+def _encode_column(values: Tuple) -> List[str]:
+    types = set(map(type, values))
+    encoder = _COLUMN_ENCODERS.get(types.pop()) if len(types) == 1 else None
+    return list(map(encoder or _encode_value, values))
+
+
+def _write_rows(columns: List[str], batches: Iterable[List[Tuple]], out: io.BytesIO, shape: str) -> int:
+    """Write row batches as JSON records or as columns + arrays; returns the row count."""
+    count = 0
+    if shape == 'arrays':
+        out.write(b'{"columns":' + json.dumps(columns).encode() + b',"rows":[')
+        for batch in batches:
+            if count:
+                out.write(b',')
+            # One C-level dumps per batch, without its enclosing brackets
+            out.write(json.dumps(batch, separators=(',', ':'))[1:-1].encode())
+            count += len(batch)
+        out.write(b']}')
+        return count
+
+    # '{"USN":%s,"Name":%s}' filled with each row's encoded values
+    template = '{' + ','.join(
+        encode_basestring_ascii(str(column)).replace('%', '%%') + ':%s' for column in columns
+    ) + '}'
+    out.write(b'[')
+    for batch in batches:
+        if count:
+            out.write(b',')
+        if columns:
+            # Encode column by column, then zip the encoded values back into rows
+            encoded = [_encode_column(values) for values in zip(*batch)]
+            out.write(','.join(map(template.__mod__, zip(*encoded))).encode())
+        else:
+            out.write(','.join('{}' for _ in batch).encode())
+        count += len(batch)
+    out.write(b']')
+    return count
+
+
+class Rows:
+    """
+    The result of one query: column names once, rows as plain tuples.
+
+    Serialized (by encode_json) straight from the tuples, as keyed records
+    ([{"col": value, ...}, ...], what dict(row) + jsonify produced) or as
+    {"columns": [...], "rows": [[...], ...]}, without a dict per row.
+    """
+
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, columns: Sequence[str], rows: List[Tuple]):
+        self.columns = list(columns)
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __bool__(self) -> bool:
+        return bool(self.rows)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return iter(self.rows)
+
+    def __repr__(self) -> str:
+        return f'Rows({self.columns}, {len(self.rows)} rows)'
+
+    def records(self) -> List[Dict]:
+        """The rows as dicts, for the few callers that need them."""
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+    def write_json(self, out: io.BytesIO, shape: str) -> None:
+        rows = self.rows
+        _write_rows(self.columns, (rows[i:i + ENCODE_BATCH] for i in range(0, len(rows), ENCODE_BATCH)), out, shape)
+
+
+class RowStream:
+    """
+    A query result serialized straight from its cursor, a batch at a time, so
+    the rows are never all held at once. Single use, and it has to be encoded
+    before its connection closes. The first batch is fetched up front, so an
+    empty result can be told apart; count is set once it has been written.
+    """
+
+    __slots__ = ('columns', 'count', '_cursor', '_first')
+
+    def __init__(self, cursor):
+        self.columns = [description[0] for description in cursor.description]
+        self.count = None
+        self._cursor = cursor
+        self._first = cursor.fetchmany(ENCODE_BATCH)
+
+    def __bool__(self) -> bool:
+        return bool(self._first)
+
+    def __repr__(self) -> str:
+        return f'RowStream({self.columns})'
+
+    def _batches(self) -> Iterator[List[Tuple]]:
+        batch, self._first = self._first, None
+        if batch is None:
+            raise RuntimeError('RowStream has already been written')
+        while batch:
+            yield batch
+            batch = self._cursor.fetchmany(ENCODE_BATCH)
+
+    def write_json(self, out: io.BytesIO, shape: str) -> None:
+        self.count = _write_rows(self.columns, self._batches(), out, shape)
+
+
+def _execute(conn, sql: str, params: Sequence):
+    # Plain tuples, whatever the connection's row_factory
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    return cursor
+
+
+def fetch_rows(conn, sql: str, params: Sequence = ()) -> Rows:
+    """Run a query and return its whole result as Rows."""
+    cursor = _execute(conn, sql, params)
+    return Rows([description[0] for description in cursor.description], cursor.fetchall())
+
+
+def stream_rows(conn, sql: str, params: Sequence = ()) -> RowStream:
+    """Run a query whose result only needs to be serialized, for large lists."""
+    return RowStream(_execute(conn, sql, params))
+
+
+def _write(value: Any, out: io.BytesIO, shape: str) -> None:
+    if isinstance(value, (Rows, RowStream)):
+        value.write_json(out, shape)
+    elif isinstance(value, dict):
+        out.write(b'{')
+        for i, (key, item) in enumerate(value.items()):
+            if i:
+                out.write(b',')
+            out.write(encode_basestring_ascii(str(key)).encode() + b':')
+            _write(item, out, shape)
+        out.write(b'}')
+    elif isinstance(value, (list, tuple)) and any(isinstance(item, (Rows, RowStream, dict, list, tuple))
+                                                  for item in value):
+        out.write(b'[')
+        for i, item in enumerate(value):
+            if i:
+                out.write(b',')
+            _write(item, out, shape)
+        out.write(b']')
+    else:
+        out.write(json.dumps(value, separators=(',', ':')).encode())
+
+
+def encode_json(payload: Any, shape: str = 'records') -> bytes:
+    """
+    Minified JSON of payload, with Rows and RowStream values (at any depth)
+    written straight from their tuples in the given shape.
+    """
+    if shape not in ROW_SHAPES:
+        raise ValueError(f"shape must be one of: {', '.join(ROW_SHAPES)}")
+    out = io.BytesIO()
+    _write(payload, out, shape)
+    return out.getvalue()
@@ -0,0 +1,91 @@
+import functools
+import threading
+from typing import Any, Callable, Hashable, Optional, Tuple
+from urllib.parse import urlencode
+
+from flask import make_response, request
+
+from metrics import Metrics
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller
+    runs the function, callers arriving while it runs wait for and share its
+    result (or exception). Nothing is cached once the call has finished.
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None):
+        self.metrics = metrics
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], label: str = '') -> Tuple[Any, bool]:
+        """Returns (result, shared), shared being True for callers that waited on another's call."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if self.metrics is not None:
+                self.metrics.incr('singleflight_coalesced_total', route=label)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        if self.metrics is not None:
+            self.metrics.incr('singleflight_executed_total', route=label)
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def coalesced(flight: SingleFlight, finish: Optional[Callable[[Any], Any]] = None):
+    """
+    Decorator sharing one execution of a GET view among identical concurrent
+    requests (same path and query parameters, in any order). Waiting requests
+    get the serialized response of the one that ran. finish, if given, is
+    applied to that response before it is shared, for after_request rewrites
+    the waiters must see as well.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            key = request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+
+            def render():
+                response = make_response(view(*args, **kwargs))
+                if finish is not None:
+                    response = finish(response)
+                return response.get_data(), response.status_code, response.content_type
+
+            (body, status, content_type), shared = flight.do(key, render, label=request.endpoint)
+            response = make_response(body, status)
+            response.content_type = content_type
+            if shared:
+                response.headers['X-Coalesced'] = 'true'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from file_lock import file_lock
+
+
+class SnapshotReplica:
+    """
+    Read-only copy of the database for heavy reports, so they do not share
+    the live file with the writer.
+
+    Every interval seconds the copy is remade with SQLite's online backup API:
+    one read snapshot of the live database (in WAL mode writers carry on
+    meanwhile) is copied into a temporary file, which then replaces the replica
+    atomically. Each server process runs a refresher thread; the one holding
+    the lock file does the copy and the others skip that round. Readers use
+    the replica only while it is at most max_age seconds old.
+    """
+
+    def __init__(self, database: str, path: str, interval: float = 60.0, max_age: float = 300.0):
+        self.database = database
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.lock_path = path + '.lock'
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def age(self) -> Optional[float]:
+        """Seconds since the replica's snapshot was taken, or None without a replica."""
+        try:
+            # The replica's mtime is set to the moment its snapshot was taken
+            return time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def fresh_path(self) -> Optional[str]:
+        """The replica file if it is within max_age, else None (read the live database)."""
+        age = self.age()
+        if age is None or age > self.max_age:
+            return None
+        return self.path
+
+    def refresh(self, force: bool = False) -> bool:
+        """Remake the replica unless another process is at it or did it recently. Returns True if remade."""
+        with file_lock(self.lock_path, blocking=False) as acquired:
+            if not acquired:
+                return False
+            age = self.age()
+            if not force and age is not None and age < self.interval / 2:
+                return False
+
+            tmp_path = self.path + '.tmp'
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            taken_at = time.time()
+            source = sqlite3.connect(self.database)
+            target = sqlite3.connect(tmp_path)
+            try:
+                # A single step: one consistent snapshot, never restarted by concurrent writes
+                source.backup(target)
+                # Readers open the replica read-only, without -wal/-shm files
+                target.execute('PRAGMA journal_mode=DELETE')
+            finally:
+                target.close()
+                source.close()
+            os.utime(tmp_path, (taken_at, taken_at))
+            os.replace(tmp_path, self.path)
+            return True
+
+    def start(self) -> None:
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snapshot-replica', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        delay = 0
+        while not self._stopped.wait(delay):
+            delay = self.interval
+            try:
+                started = time.monotonic()
+                if self.refresh():
+                    print(f"Replica {self.path} refreshed in {time.monotonic() - started:.2f}s")
+            except Exception as e:
+                print(f"Error refreshing replica {self.path}: {str(e)}")
+
+    def stop(self) -> None:
+        self._stopped.set()
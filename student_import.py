@@ -0,0 +1,246 @@
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import pandas as pd
+
+# Columns read from student upload sheets; any other columns are skipped
+STUDENT_COLUMNS = ['USN', 'Name', 'Department', 'Semester', 'AcademicYear']
+
+# Rows parsed and validated per chunk
+CHUNK_SIZE = 5000
+
+USN_PATTERN = r'^\d[A-Za-z]{2}\d{2}[A-Za-z]{2}\d{3}$'  # Pattern for format like 3PG22CS107
+
+
+def _missing_columns(header) -> List[str]:
+    present = set(str(column).strip() for column in header if column is not None)
+    return [column for column in STUDENT_COLUMNS if column not in present]
+
+
+def _iter_csv_chunks(file, chunk_size: int) -> Iterator[pd.DataFrame]:
+    reader = pd.read_csv(file, dtype=str, usecols=lambda column: column.strip() in STUDENT_COLUMNS,
+                         chunksize=chunk_size)
+    with reader:
+        for chunk in reader:
+            chunk.columns = [column.strip() for column in chunk.columns]
+            missing = _missing_columns(chunk.columns)
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)}")
+            yield chunk[STUDENT_COLUMNS]
+
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def _column_index(letters: str) -> int:
+    # 'C' -> 2, 'AA' -> 26
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def _first_sheet_path(archive: zipfile.ZipFile) -> str:
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    rel_id = workbook.find(f'{_MAIN_NS}sheets/{_MAIN_NS}sheet').get(f'{_REL_NS}id')
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(f'{_PACKAGE_REL_NS}Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            return target.lstrip('/') if target.startswith('/') else 'xl/' + target
+    raise ValueError('Workbook has no worksheets')
+
+
+def _shared_strings(archive: zipfile.ZipFile) -> List[str]:
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    # The string table is a fraction of the sheet's size; one C-level parse beats streaming it
+    table = ElementTree.fromstring(archive.read('xl/sharedStrings.xml'))
+    strings = []
+    for item in table.iter(f'{_MAIN_NS}si'):
+        text = item.find(f'{_MAIN_NS}t')
+        if text is not None and len(item) == 1:
+            strings.append(text.text or '')
+        else:
+            # Rich text keeps its runs in separate <r><t> elements
+            strings.append(''.join(t.text or '' for t in item.iter(f'{_MAIN_NS}t')))
+    return strings
+
+
+def _cell_value(cell, strings: List[str]) -> Optional[str]:
+    cell_type = cell.get('t')
+    if cell_type == 'inlineStr':
+        return ''.join(t.text or '' for t in cell.iter(f'{_MAIN_NS}t'))
+    value = cell.findtext(f'{_MAIN_NS}v')
+    if value is None:
+        return None
+    if cell_type == 's':
+        return strings[int(value)]
+    if cell_type in ('str', 'e'):
+        return value
+    if cell_type == 'b':
+        return 'True' if value == '1' else 'False'
+    # Numbers: whole numbers read as '5', like the cell shows them
+    number = float(value)
+    return str(int(number)) if number.is_integer() else value
+
+
+def _iter_xlsx_rows(file, pick_columns=None) -> Iterator[Tuple[int, Dict[int, str]]]:
+    """
+    Stream the first worksheet as (sheet row number, {column index: text}) per
+    row, parsing the sheet XML incrementally rather than loading a workbook
+    object model. Blank rows are usually absent from the XML, so the row
+    number comes from the row's r attribute.
+    pick_columns, if given, is called with the header row and returns the
+    column indexes worth decoding in the rows after it.
+    """
+    row_tag, cell_tag = f'{_MAIN_NS}row', f'{_MAIN_NS}c'
+    column_indexes = {}
+    columns = None
+    row_number = 0
+    with zipfile.ZipFile(file) as archive:
+        strings = _shared_strings(archive)
+        with archive.open(_first_sheet_path(archive)) as sheet:
+            for _, element in ElementTree.iterparse(sheet):
+                if element.tag != row_tag:
+                    continue
+                reference = element.get('r')
+                row_number = int(reference) if reference else row_number + 1
+                row = {}
+                for position, cell in enumerate(element.iter(cell_tag)):
+                    reference = cell.get('r')
+                    if reference:
+                        letters = reference.rstrip('0123456789')
+                        index = column_indexes.get(letters)
+                        if index is None:
+                            index = column_indexes[letters] = _column_index(letters)
+                    else:
+                        index = position
+                    if columns is None or index in columns:
+                        row[index] = _cell_value(cell, strings)
+                element.clear()
+                if pick_columns is not None:
+                    columns = set(pick_columns(row))
+                    pick_columns = None
+                yield row_number, row
+
+
+def _iter_xlsx_chunks(file, chunk_size: int) -> Iterator[pd.DataFrame]:
+    positions = []
+
+    def pick_columns(header):
+        names = {str(value).strip(): index for index, value in header.items() if value is not None}
+        missing = [column for column in STUDENT_COLUMNS if column not in names]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        positions.extend(names[column] for column in STUDENT_COLUMNS)
+        return positions
+
+    rows = _iter_xlsx_rows(file, pick_columns)
+    if next(rows, None) is None:
+        raise ValueError(f"Missing columns: {', '.join(STUDENT_COLUMNS)}")
+
+    values, index = [], []
+    for row_number, row in rows:
+        picked = [row.get(i) for i in positions]
+        if all(value is None for value in picked):
+            continue
+        values.append(picked)
+        # Index = sheet row - 2, so validation messages point at the sheet rows
+        index.append(row_number - 2)
+        if len(values) == chunk_size:
+            yield pd.DataFrame(values, columns=STUDENT_COLUMNS, index=index, dtype=object)
+            values, index = [], []
+    if values:
+        yield pd.DataFrame(values, columns=STUDENT_COLUMNS, index=index, dtype=object)
+
+
+def iter_student_chunks(file, filename: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Read a student upload (CSV or XLSX) as DataFrames of at most chunk_size
+    rows holding only STUDENT_COLUMNS as strings. Chunk indexes continue across
+    chunks, so row numbers in validation errors match the file.
+    """
+    if filename.lower().endswith('.csv'):
+        return _iter_csv_chunks(file, chunk_size)
+    return _iter_xlsx_chunks(file, chunk_size)
+
+
+def _rows(index) -> str:
+    return ', '.join(str(i + 2) for i in index)
+
+
+def validate_student_data(df, section_mapping=None):
+    errors = []
+
+    print(f"\nValidating rows {_rows(df.index[:1])}-{_rows(df.index[-1:])} ({len(df)} rows)")
+
+    # Check for empty values
+    for col in df.columns:
+        empty_rows = df[df[col].isna() | (df[col].astype(str).str.strip() == '')].index.tolist()
+        if empty_rows:
+            error_msg = f"Empty values in {col} at rows: {_rows(empty_rows)}"
+            print(error_msg)
+            errors.append(error_msg)
+
+    # Validate USN format
+    usns = df['USN'].astype(str).str.strip().str.upper()
+    invalid_usn_rows = df.index[~usns.str.match(USN_PATTERN)].tolist()
+    if invalid_usn_rows:
+        error_msg = f"Invalid USN format at rows: {_rows(invalid_usn_rows)}"
+        print(f"{error_msg} - Expected format: 3PG22CS107")
+        errors.append(error_msg)
+
+    # If section mapping is provided, validate against it
+    if section_mapping:
+        # Validate Department matches
+        invalid_dept = df[df['Department'].str.lower() != section_mapping['department'].lower()].index.tolist()
+        if invalid_dept:
+            error_msg = f"Department must be {section_mapping['department']} at rows: {_rows(invalid_dept)}"
+            print(error_msg)
+            errors.append(error_msg)
+
+        # Validate Semester matches
+        invalid_sem = df[df['Semester'].astype(str) != str(section_mapping['semester'])].index.tolist()
+        if invalid_sem:
+            error_msg = f"Semester must be {section_mapping['semester']} at rows: {_rows(invalid_sem)}"
+            print(error_msg)
+            errors.append(error_msg)
+
+        # Validate Academic Year matches
+        invalid_year = df[df['AcademicYear'] != section_mapping['academic_year']].index.tolist()
+        if invalid_year:
+            error_msg = f"Academic Year must be {section_mapping['academic_year']} at rows: {_rows(invalid_year)}"
+            print(error_msg)
+            errors.append(error_msg)
+
+    return errors
+
+
+def merge_row_errors(errors: List[str]) -> List[str]:
+    """Join per-chunk messages of the same kind ('<problem> at rows: ...') into one."""
+    merged: Dict[str, List[str]] = {}
+    for error in errors:
+        problem, sep, rows = error.partition(' at rows: ')
+        merged.setdefault(problem if sep else error, []).append(rows)
+    return [f"{problem} at rows: {', '.join(rows)}" if rows[0] else problem
+            for problem, rows in merged.items()]
+
+
+def read_student_upload(file, filename: str, section_mapping=None, chunk_size: int = CHUNK_SIZE):
+    """
+    Stream, validate and normalize a student upload chunk by chunk.
+    Returns (DataFrame of all rows, validation errors).
+    """
+    chunks, errors = [], []
+    for chunk in iter_student_chunks(file, filename, chunk_size):
+        errors.extend(validate_student_data(chunk, section_mapping))
+        chunk['Department'] = chunk['Department'].str.lower()
+        chunk['USN'] = chunk['USN'].str.upper()
+        chunks.append(chunk)
+    df = pd.concat(chunks) if chunks else pd.DataFrame(columns=STUDENT_COLUMNS)
+    print(f"\nValidation completed with {len(errors)} errors over {len(df)} rows")
+    return df, merge_row_errors(errors)
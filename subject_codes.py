@@ -1,5 +1,5 @@
 import re
-from typing import Dict, List, TypedDict
+from typing import Dict, List, Tuple, TypedDict
 
 class SubjectInfo(TypedDict):
     code: str
@@ -91,18 +91,32 @@ def parse_subject_codes(content: str) -> Dict[str, List[SubjectInfo]]:
                 
     return subjects_by_group
 
-def get_subjects_for_semester(semester: str, group: str, subjects_data: Dict[str, List[SubjectInfo]], scheme: str = "2022") -> List[SubjectInfo]:
+def subject_group_key(semester: str, group: str) -> str:
     """
-    Get subjects for a specific semester, group, and scheme
+    Key of a semester's subjects in the parsed data
     For semesters 1-2: Uses group parameter
     For semesters 3-8: Ignores group parameter
     """
     if semester in ['1', '2']:
-        group_key = f"{semester}_{group}"
-    else:
-        group_key = semester
-        
-    subjects = subjects_data.get(group_key, [])
+        return f"{semester}_{group}"
+    return semester
+
+def index_subjects(subjects_data: Dict[str, List[SubjectInfo]]) -> Dict[Tuple[str, str], List[SubjectInfo]]:
+    """
+    Subjects per (group key, scheme), in file order: what get_subjects_for_semester
+    returns for every semester/group and scheme, computed once
+    """
+    index = {}
+    for group_key, subjects in subjects_data.items():
+        for subject in subjects:
+            index.setdefault((group_key, subject['scheme']), []).append(subject)
+    return index
+
+def get_subjects_for_semester(semester: str, group: str, subjects_data: Dict[str, List[SubjectInfo]], scheme: str = "2022") -> List[SubjectInfo]:
+    """
+    Get subjects for a specific semester, group, and scheme
+    """
+    subjects = subjects_data.get(subject_group_key(semester, group), [])
     
     # Filter subjects by scheme
     return [subject for subject in subjects if subject['scheme'] == scheme] 
\ No newline at end of file
@@ -0,0 +1,245 @@
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+STUDENT_COLUMNS = ['USN', 'Name', 'department', 'semester', 'section']
+ATTENDANCE_COLUMNS = ['subject_code', 'department', 'semester', 'section', 'Date', 'USN', 'Present']
+
+
+def create_sync_schema(cursor: sqlite3.Cursor) -> None:
+    """
+    Create the change log feeding delta pulls and the triggers that fill it.
+
+    Every insert, update and delete of students, attendance and section
+    mappings appends a row carrying the new value, so a delta pull reads only
+    the log range after the client's sequence number, never whole rosters.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            op TEXT NOT NULL,
+            department TEXT NOT NULL,
+            semester TEXT NOT NULL,
+            section TEXT NOT NULL,
+            subject_code TEXT,
+            row_key TEXT NOT NULL,
+            value TEXT,
+            changed_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sync_log_section
+        ON sync_log (department, semester, section, seq)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+
+    # Students: row_key is the USN, value the name
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS sync_students_insert AFTER INSERT ON students
+        BEGIN
+            INSERT INTO sync_log (entity, op, department, semester, section, row_key, value)
+            VALUES ('student', 'upsert', NEW.Department, NEW.Semester, NEW.Section, NEW.USN, NEW.Name);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS sync_students_update AFTER UPDATE ON students
+        BEGIN
+            INSERT INTO sync_log (entity, op, department, semester, section, row_key, value)
+            SELECT 'student', 'delete', OLD.Department, OLD.Semester, OLD.Section, OLD.USN, NULL
+            WHERE OLD.USN IS NOT NEW.USN OR OLD.Department IS NOT NEW.Department
+               OR OLD.Semester IS NOT NEW.Semester OR OLD.Section IS NOT NEW.Section;
+            INSERT INTO sync_log (entity, op, department, semester, section, row_key, value)
+            VALUES ('student', 'upsert', NEW.Department, NEW.Semester, NEW.Section, NEW.USN, NEW.Name);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS sync_students_delete AFTER DELETE ON students
+        BEGIN
+            INSERT INTO sync_log (entity, op, department, semester, section, row_key, value)
+            VALUES ('student', 'delete', OLD.Department, OLD.Semester, OLD.Section, OLD.USN, NULL);
+        END
+    ''')
+
+    # Attendance: row_key is USN|Date within the subject stream, value the Present flag
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS sync_attendance_insert AFTER INSERT ON attendance
+        BEGIN
+            INSERT INTO sync_log (entity, op, department, semester, section, subject_code, row_key, value)
+            VALUES ('attendance', 'upsert', NEW.department, NEW.semester, NEW.section, NEW.subject_code,
+                    NEW.USN || '|' || NEW.Date, NEW.Present);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS sync_attendance_update AFTER UPDATE ON attendance
+        BEGIN
+            INSERT INTO sync_log (entity, op, department, semester, section, subject_code, row_key, value)
+            VALUES ('attendance', 'upsert', NEW.department, NEW.semester, NEW.section, NEW.subject_code,
+                    NEW.USN || '|' || NEW.Date, NEW.Present);
+        END
+    ''')
+    # A deleted mark's value is its academic year, which the analytics export partitions by;
+    # recreated so databases with the earlier trigger (value NULL) record it too
+    cursor.execute('DROP TRIGGER IF EXISTS sync_attendance_delete')
+    cursor.execute('''
+        CREATE TRIGGER sync_attendance_delete AFTER DELETE ON attendance
+        BEGIN
+            INSERT INTO sync_log (entity, op, department, semester, section, subject_code, row_key, value)
+            VALUES ('attendance', 'delete', OLD.department, OLD.semester, OLD.section, OLD.subject_code,
+                    OLD.USN || '|' || OLD.Date, OLD.AcademicYear);
+        END
+    ''')
+
+    # Section mappings: a newly assigned section is sent to the client in full
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS sync_mapping_insert AFTER INSERT ON section_mapping
+        BEGIN
+            INSERT INTO sync_log (entity, op, department, semester, section, subject_code, row_key, value)
+            VALUES ('mapping', 'upsert', NEW.department, NEW.semester, NEW.section, NEW.subject_code,
+                    NEW.id, NEW.faculty_id);
+        END
+    ''')
+
+
+def prune_sync_log(cursor: sqlite3.Cursor, keep_days: int) -> int:
+    """
+    Drop change-log entries older than keep_days. Clients whose sequence number
+    falls before the pruned range get a full snapshot on their next pull.
+    """
+    # changed_at is SQLite's datetime('now'), in UTC: compare in SQL, not with local time
+    cursor.execute("SELECT MAX(seq) FROM sync_log WHERE changed_at < datetime('now', ?)", (f'-{keep_days} days',))
+    pruned_seq = cursor.fetchone()[0]
+    if pruned_seq is None:
+        return 0
+    cursor.execute('DELETE FROM sync_log WHERE seq <= ?', (pruned_seq,))
+    deleted = cursor.rowcount
+    cursor.execute('''
+        INSERT INTO sync_state (name, value) VALUES ('pruned_seq', ?)
+        ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)
+    ''', (pruned_seq,))
+    return deleted
+
+
+def current_seq(conn) -> int:
+    row = conn.execute('SELECT MAX(seq) FROM sync_log').fetchone()
+    return row[0] or 0
+
+
+def pruned_seq(conn) -> int:
+    row = conn.execute("SELECT value FROM sync_state WHERE name = 'pruned_seq'").fetchone()
+    return row[0] if row else 0
+
+
+def _log_range(conn, class_section: Tuple[str, str, str], since: int, until: Optional[int] = None):
+    # Change-log entries of one class section in (since, until], oldest first
+    query = '''
+        SELECT entity, op, subject_code, row_key, value
+        FROM sync_log
+        WHERE department = ? AND semester = ? AND section = ? AND seq > ?
+    '''
+    params = [*class_section, since]
+    if until is not None:
+        query += ' AND seq <= ?'
+        params.append(until)
+    return conn.execute(query + ' ORDER BY seq', params).fetchall()
+
+
+def attendance_changes(conn, key: Tuple[str, str, str, str], since: int) -> Dict[str, Optional[int]]:
+    """
+    Latest server-side value per USN|Date of one class stream changed after since
+    (None for deleted marks). Used to detect conflicts with offline edits.
+    """
+    subject_code, department, semester, section = key
+    changes = {}
+    for entity, op, row_subject, row_key, value in _log_range(conn, (department, semester, section), since):
+        if entity == 'attendance' and row_subject == subject_code:
+            changes[row_key] = None if op == 'delete' else int(value)
+    return changes
+
+
+def _snapshot(conn, streams: List[Tuple[str, str, str, str]], since_date: str):
+    class_sections = sorted(set(key[1:] for key in streams))
+    students = []
+    for department, semester, section in class_sections:
+        students.extend(list(row) for row in conn.execute('''
+            SELECT USN, Name, Department, Semester, Section
+            FROM students
+            WHERE Department = ? AND Semester = ? AND Section = ?
+            ORDER BY USN
+        ''', (department, semester, section)))
+    attendance = []
+    for key in streams:
+        attendance.extend([*row[:6], int(row[6])] for row in conn.execute('''
+            SELECT subject_code, department, semester, section, Date, USN, Present
+            FROM attendance
+            WHERE subject_code = ? AND department = ? AND semester = ? AND section = ? AND Date >= ?
+            ORDER BY Date, USN
+        ''', (*key, since_date)))
+    return students, attendance
+
+
+def pull_changes(conn, sections: Iterable[Dict], since: int, attendance_days: int = 30) -> Dict:
+    """
+    Build a sync payload for a faculty member's sections.
+
+    With since = 0 (or a sequence number older than the pruned log) the client
+    gets a full snapshot: rosters plus the last attendance_days of attendance.
+    Otherwise only rows changed after since are returned, read from the change
+    log, plus full snapshots of sections assigned since then. Rows are sent as
+    column lists + value arrays to keep the payload small.
+    """
+    sections = list(sections)
+    streams = sorted(set((s['subject_code'], s['department'], s['semester'], s['section']) for s in sections))
+    seq = current_seq(conn)
+    since_date = (datetime.now() - timedelta(days=attendance_days)).strftime('%Y-%m-%d')
+    full = since <= 0 or since < pruned_seq(conn)
+
+    students, attendance = [], []
+    deleted_students, deleted_attendance = [], []
+    if full:
+        students, attendance = _snapshot(conn, streams, since_date)
+    else:
+        wanted = set(streams)
+        new_streams = []
+        for class_section in sorted(set(key[1:] for key in streams)):
+            latest_students, latest_attendance = {}, {}
+            for entity, op, subject_code, row_key, value in _log_range(conn, class_section, since, seq):
+                if entity == 'student':
+                    latest_students[row_key] = (op, value)
+                elif entity == 'attendance' and (subject_code, *class_section) in wanted:
+                    latest_attendance[(subject_code, row_key)] = (op, value)
+                elif entity == 'mapping' and (subject_code, *class_section) in wanted:
+                    new_streams.append((subject_code, *class_section))
+            for usn, (op, name) in sorted(latest_students.items()):
+                if op == 'delete':
+                    deleted_students.append([usn, *class_section])
+                else:
+                    students.append([usn, name, *class_section])
+            for (subject_code, row_key), (op, value) in sorted(latest_attendance.items()):
+                usn, date = row_key.split('|', 1)
+                if op == 'delete':
+                    deleted_attendance.append([subject_code, *class_section, date, usn])
+                else:
+                    attendance.append([subject_code, *class_section, date, usn, int(value)])
+        if new_streams:
+            new_students, new_attendance = _snapshot(conn, sorted(set(new_streams)), since_date)
+            known = set(row[0] for row in students)
+            students.extend(row for row in new_students if row[0] not in known)
+            attendance.extend(new_attendance)
+
+    return {
+        'seq': seq,
+        'full': full,
+        'sections': sections,
+        'students': {'columns': STUDENT_COLUMNS, 'rows': students},
+        'attendance': {'columns': ATTENDANCE_COLUMNS, 'rows': attendance},
+        'deleted': {
+            'students': deleted_students,
+            'attendance': deleted_attendance
+        }
+    }
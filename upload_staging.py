@@ -0,0 +1,108 @@
+import json
+import os
+import re
+import secrets
+import stat
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+_TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+
+class UploadStaging:
+    """
+    Validated, normalized upload batches parked between preview and commit.
+
+    Each batch is a JSON file named by a random token in a directory shared by
+    all worker processes, so the commit request may land on a different worker
+    than the preview. Batches expire after ttl seconds and at most max_entries
+    are kept; the oldest are dropped first.
+
+    Batches hold student records, so the directory must belong to this user and
+    be closed to everyone else; the default one in the temp directory is
+    created that way and checked, since another user could have made it first.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 64, ttl: float = 1800.0):
+        if directory is None:
+            user = os.getuid() if hasattr(os, 'getuid') else os.getlogin()
+            directory = os.path.join(tempfile.gettempdir(), f'attendance-upload-staging-{user}')
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._check_directory()
+
+    def _check_directory(self) -> None:
+        if os.name == 'nt':
+            return
+        info = os.lstat(self.directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+            raise RuntimeError(f"Upload staging directory {self.directory} is not a directory owned by this user; "
+                               f"set UPLOAD_STAGING_DIR to a private directory")
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            raise RuntimeError(f"Upload staging directory {self.directory} is accessible to other users; "
+                               f"chmod 700 it or set UPLOAD_STAGING_DIR to a private directory")
+
+    def _path(self, token: str) -> Optional[str]:
+        if not token or not _TOKEN_PATTERN.match(token):
+            return None
+        return os.path.join(self.directory, token + '.json')
+
+    def _entries(self) -> List[os.DirEntry]:
+        with os.scandir(self.directory) as entries:
+            return [entry for entry in entries if entry.name.endswith('.json') and entry.is_file()]
+
+    def _prune(self) -> None:
+        now = time.time()
+        live = []
+        for entry in self._entries():
+            try:
+                modified = entry.stat().st_mtime
+                if modified + self.ttl < now:
+                    os.remove(entry.path)
+                else:
+                    live.append((modified, entry.path))
+            except FileNotFoundError:
+                pass
+        live.sort()
+        for _, path in live[:max(0, len(live) - self.max_entries + 1)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stage(self, batch: Dict) -> str:
+        """Store a batch and return the token the commit request sends back."""
+        self._prune()
+        token = secrets.token_urlsafe(18)
+        path = self._path(token)
+        # Write then rename, so a concurrent reader never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(batch, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        return token
+
+    def get(self, token: str) -> Optional[Dict]:
+        """The staged batch, or None if the token is unknown or expired."""
+        path = self._path(token)
+        if path is None:
+            return None
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def discard(self, token: str) -> None:
+        path = self._path(token)
+        if path is not None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
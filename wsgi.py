@@ -0,0 +1,5 @@
+# WSGI entry point for production servers, e.g.
+#   gunicorn -c gunicorn.conf.py wsgi:application
+from api import app
+
+application = app